@@ -0,0 +1,42 @@
+"""Composite indexes and teacher double-booking guard on timetables
+
+Revision ID: 0001_timetable_indexes
+Revises:
+Create Date: 2026-10-18 00:00:00
+
+The base schema is created by Base.metadata.create_all on startup, so this
+revision only adds what older databases are missing and skips indexes that
+create_all has already built.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0001_timetable_indexes"
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _existing_indexes() -> set:
+    return {index["name"] for index in sa.inspect(op.get_bind()).get_indexes("timetables")}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    existing = _existing_indexes()
+    if "uq_timetables_teacher_day_slot" not in existing:
+        # Fails if the table already holds double-booked teachers; clear those rows first
+        op.create_index("uq_timetables_teacher_day_slot", "timetables", ["teacher_id", "day", "time_slot"],
+                        unique=True)
+    if "ix_timetables_class_day" not in existing:
+        op.create_index("ix_timetables_class_day", "timetables", ["class_id", "day"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_timetables_class_day", table_name="timetables")
+    op.drop_index("uq_timetables_teacher_day_slot", table_name="timetables")
@@ -0,0 +1,44 @@
+"""Generation job table
+
+Revision ID: 0002_generation_jobs
+Revises: 0001_timetable_indexes
+Create Date: 2026-10-18 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0002_generation_jobs"
+down_revision: Union[str, Sequence[str], None] = "0001_timetable_indexes"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if sa.inspect(op.get_bind()).has_table("generation_jobs"):
+        return
+    op.create_table(
+        "generation_jobs",
+        sa.Column("id", sa.String(), nullable=False),
+        sa.Column("school_id", sa.Integer(), sa.ForeignKey("schools.id"), nullable=True),
+        sa.Column("class_ids", sa.JSON(), nullable=True),
+        sa.Column("status", sa.String(), nullable=True),
+        sa.Column("progress", sa.JSON(), nullable=True),
+        sa.Column("result", sa.JSON(), nullable=True),
+        sa.Column("error", sa.Text(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_generation_jobs_id", "generation_jobs", ["id"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_generation_jobs_id", table_name="generation_jobs")
+    op.drop_table("generation_jobs")
@@ -0,0 +1,44 @@
+"""Generation cache table
+
+Revision ID: 0003_generation_cache
+Revises: 0002_generation_jobs
+Create Date: 2026-10-18 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0003_generation_cache"
+down_revision: Union[str, Sequence[str], None] = "0002_generation_jobs"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if sa.inspect(op.get_bind()).has_table("generation_cache"):
+        return
+    op.create_table(
+        "generation_cache",
+        sa.Column("fingerprint", sa.String(), nullable=False),
+        sa.Column("school_id", sa.Integer(), sa.ForeignKey("schools.id"), nullable=True),
+        sa.Column("scope", sa.String(), nullable=True),
+        sa.Column("timetables", sa.JSON(), nullable=True),
+        sa.Column("rows", sa.JSON(), nullable=True),
+        sa.Column("score", sa.Float(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.PrimaryKeyConstraint("fingerprint"),
+    )
+    op.create_index("ix_generation_cache_fingerprint", "generation_cache", ["fingerprint"])
+    op.create_index("ix_generation_cache_school_id", "generation_cache", ["school_id"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_generation_cache_school_id", table_name="generation_cache")
+    op.drop_index("ix_generation_cache_fingerprint", table_name="generation_cache")
+    op.drop_table("generation_cache")
@@ -0,0 +1,32 @@
+"""Regenerate flag on generation jobs
+
+Revision ID: 0004_generation_job_regenerate
+Revises: 0003_generation_cache
+Create Date: 2026-10-18 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0004_generation_job_regenerate"
+down_revision: Union[str, Sequence[str], None] = "0003_generation_cache"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    columns = {column["name"] for column in sa.inspect(op.get_bind()).get_columns("generation_jobs")}
+    if "regenerate" in columns:
+        return
+    op.add_column("generation_jobs", sa.Column("regenerate", sa.Boolean(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table("generation_jobs") as batch_op:
+        batch_op.drop_column("regenerate")
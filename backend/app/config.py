@@ -10,6 +10,17 @@ class Settings(BaseSettings):
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     
+    # Timetable generation: seconds spent improving soft constraints after a solve
+    OPTIMIZER_TIME_BUDGET: float = 1.0
+    REPAIR_OPTIMIZER_TIME_BUDGET: float = 0.2
+    # Processes that solve independent class groups of one generation side by side
+    SOLVER_MAX_WORKERS: int = 4
+    # Full generations race this many solver configurations when above 1;
+    # mode "first" anneals the first feasible result, "best" keeps the best score by the deadline
+    SOLVER_PORTFOLIO_SIZE: int = 1
+    SOLVER_PORTFOLIO_MODE: str = "best"
+    SOLVER_PORTFOLIO_DEADLINE: float = 5.0
+    
     # CORS
     ALLOWED_ORIGINS: list = ["http://localhost:3000", "http://localhost:3001"]
     
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Text, JSON
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Text, JSON, Float, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.database import Base
@@ -115,6 +115,11 @@ class TeacherClass(Base):
 
 class Timetable(Base):
     __tablename__ = "timetables"
+    __table_args__ = (
+        # A teacher can hold only one class per slot; also serves substitute/workload lookups
+        Index("uq_timetables_teacher_day_slot", "teacher_id", "day", "time_slot", unique=True),
+        Index("ix_timetables_class_day", "class_id", "day"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     class_id = Column(Integer, ForeignKey("classes.id"))
@@ -157,6 +162,33 @@ class Lab(Base):
     # Relationships
     class_obj = relationship("Class")
 
+class GenerationJob(Base):
+    __tablename__ = "generation_jobs"
+    
+    id = Column(String, primary_key=True, index=True)
+    school_id = Column(Integer, ForeignKey("schools.id"))
+    class_ids = Column(JSON)  # Empty list means every class of the school
+    regenerate = Column(Boolean, default=False)  # Skip the generation cache
+    status = Column(String, default="queued")  # queued, running, completed, failed
+    progress = Column(JSON)  # Latest solver counters and per-class status
+    result = Column(JSON)
+    error = Column(Text)
+    
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+class GenerationCache(Base):
+    __tablename__ = "generation_cache"
+    
+    fingerprint = Column(String, primary_key=True, index=True)  # Hash of every generation input
+    school_id = Column(Integer, ForeignKey("schools.id"), index=True)
+    scope = Column(String)  # Comma-separated class ids of the run
+    timetables = Column(JSON)
+    rows = Column(JSON)  # Timetable rows to write back on a hit
+    score = Column(Float)
+    
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
 class User(Base):
     __tablename__ = "users"
     
@@ -1,11 +1,16 @@
+import logging
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from typing import List
 from app.database import get_db
 from app.models import Teacher, School, TeacherSubject, TeacherClass, Subject, Class
 from app.schemas import TeacherCreate, TeacherUpdate, Teacher as TeacherSchema
+from app.services.timetable_service import TimetableService
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
+timetable_service = TimetableService()
 
 @router.post("/", response_model=TeacherSchema, status_code=status.HTTP_201_CREATED)
 def create_teacher(teacher: TeacherCreate, db: Session = Depends(get_db)):
@@ -88,6 +93,13 @@ def update_teacher(teacher_id: int, teacher_data: TeacherUpdate, db: Session = D
             detail="Teacher not found"
         )
     
+    # Classes whose timetables depend on this teacher's links, before and after the edit
+    affected_classes = {class_id for class_id, in db.query(TeacherClass.class_id).filter(
+        TeacherClass.teacher_id == teacher_id
+    ).all()}
+    if teacher_data.classes is not None:
+        affected_classes.update(teacher_data.classes)
+    
     # Update basic fields
     for field, value in teacher_data.dict(exclude_unset=True).items():
         if field not in ['subjects', 'classes']:
@@ -120,6 +132,15 @@ def update_teacher(teacher_id: int, teacher_data: TeacherUpdate, db: Session = D
             db.add(teacher_class)
     
     db.commit()
+    
+    # Repair only the affected classes; every other timetable stays as it is
+    if teacher_data.subjects is not None or teacher_data.classes is not None:
+        try:
+            timetable_service.repair_timetables(db, db_teacher.school_id, sorted(affected_classes))
+        except ValueError as e:
+            db.rollback()
+            logger.warning("Timetable repair after editing teacher %s failed: %s", teacher_id, e)
+    
     db.refresh(db_teacher)
     return db_teacher
 
@@ -1,13 +1,18 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from typing import List, Dict, Any
 from app.database import get_db
 from app.models import Timetable, Class, School, Teacher
-from app.schemas import TimetableGenerationRequest, TeacherWorkload, SubstituteTeacherRequest, SubstituteTeacherResponse
+from app.schemas import TimetableGenerationRequest, TeacherWorkload, SubstituteTeacherRequest, SubstituteTeacherResponse, GenerationJob
 from app.services.timetable_service import TimetableService
+from app.services.job_service import JobService
+from app.services.export_service import ExportService, EXPORT_FORMATS
 
 router = APIRouter()
 timetable_service = TimetableService()
+job_service = JobService()
+export_service = ExportService()
 
 @router.post("/generate", response_model=Dict[str, Any])
 def generate_timetables(request: TimetableGenerationRequest, db: Session = Depends(get_db)):
@@ -15,14 +20,18 @@ def generate_timetables(request: TimetableGenerationRequest, db: Session = Depen
     try:
         # For now, assume school_id = 1 (you can modify this based on your needs)
         school_id = 1
-        timetables = timetable_service.generate_timetables(
+        result = timetable_service.generate_timetables(
             db=db, 
             school_id=school_id, 
-            class_ids=request.class_ids
+            class_ids=request.class_ids,
+            regenerate=request.regenerate
         )
         return {
             "message": "Timetables generated successfully",
-            "timetables": timetables,
+            "timetables": result["timetables"],
+            "rows_written": result["rows_written"],
+            "score": result["score"],
+            "cached": result["cached"],
             "note": "Physical Education limited to 2 periods per week"
         }
     except ValueError as e:
@@ -36,6 +45,44 @@ def generate_timetables(request: TimetableGenerationRequest, db: Session = Depen
             detail=f"Failed to generate timetables: {str(e)}"
         )
 
+@router.post("/jobs", response_model=GenerationJob, status_code=status.HTTP_202_ACCEPTED)
+def submit_generation_job(request: TimetableGenerationRequest, school_id: int = 1, db: Session = Depends(get_db)):
+    """Queue timetable generation in the background and return the job"""
+    school = db.query(School).filter(School.id == school_id).first()
+    if not school:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="School not found"
+        )
+    
+    return job_service.submit(db, school_id, request.class_ids, regenerate=request.regenerate)
+
+@router.get("/jobs/{job_id}", response_model=GenerationJob)
+def get_generation_job(job_id: str, db: Session = Depends(get_db)):
+    """Get status, per-class progress and result of a generation job"""
+    job = job_service.get_job(db, job_id)
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Job not found"
+        )
+    return job
+
+@router.get("/jobs/{job_id}/events")
+def stream_generation_job(job_id: str, db: Session = Depends(get_db)):
+    """Stream job progress as Server-Sent Events until the job finishes"""
+    if not job_service.get_job(db, job_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Job not found"
+        )
+    
+    return StreamingResponse(
+        job_service.stream_events(job_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @router.get("/class/{class_id}", response_model=Dict[str, Any])
 def get_class_timetable(class_id: int, db: Session = Depends(get_db)):
     """Get timetable for a specific class"""
@@ -88,6 +135,20 @@ def get_teacher_workload(teacher_id: int, db: Session = Depends(get_db)):
             detail=str(e)
         )
 
+@router.get("/workloads", response_model=List[TeacherWorkload])
+def get_teacher_workloads(school_id: int, db: Session = Depends(get_db)):
+    """Get workload analysis for every teacher of a school"""
+    school = db.query(School).filter(School.id == school_id).first()
+    if not school:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="School not found"
+        )
+    
+    teacher_ids = [teacher_id for teacher_id, in db.query(Teacher.id).filter(Teacher.school_id == school_id).all()]
+    workloads = timetable_service.calculate_workloads(db, teacher_ids)
+    return list(workloads.values())
+
 @router.post("/substitute", response_model=List[SubstituteTeacherResponse])
 def find_substitute_teachers(request: SubstituteTeacherRequest, db: Session = Depends(get_db)):
     """Find substitute teachers for an absent teacher"""
@@ -158,6 +219,30 @@ def export_timetable(class_id: int, format: str = "json", db: Session = Depends(
             detail="Unsupported format. Use 'json' or 'csv'"
         )
 
+@router.get("/school/{school_id}/export")
+def export_school_timetables(school_id: int, format: str = "csv", db: Session = Depends(get_db)):
+    """Stream every timetable row of a school as CSV or NDJSON"""
+    format = format.lower()
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Unsupported format. Use 'csv' or 'ndjson'"
+        )
+    
+    school = db.query(School).filter(School.id == school_id).first()
+    if not school:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="School not found"
+        )
+    
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        export_service.stream_school(school_id, format),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="school_{school_id}_timetables.{format}"'}
+    )
+
 @router.get("/school/{school_id}/summary")
 def get_school_timetable_summary(school_id: int, db: Session = Depends(get_db)):
     """Get summary of all timetables for a school"""
@@ -189,6 +189,21 @@ class TimetableGenerationRequest(BaseModel):
     class_ids: List[int]
     regenerate: bool = False
 
+class GenerationJob(BaseModel):
+    id: str
+    school_id: int
+    class_ids: List[int]
+    regenerate: bool = False
+    status: str
+    progress: Optional[Dict[str, Any]] = None
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
 class TeacherWorkload(BaseModel):
     teacher_id: int
     teacher_name: str
@@ -196,6 +211,8 @@ class TeacherWorkload(BaseModel):
     avg_periods_per_day: float
     workload_status: str
     daily_breakdown: Dict[str, int]
+    double_bookings: int = 0
+    free_periods: Dict[str, int] = {}
 
 class SubstituteTeacherRequest(BaseModel):
     absent_teacher_id: int
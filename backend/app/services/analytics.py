@@ -0,0 +1,93 @@
+from typing import Iterable, List, Optional
+
+import numpy as np
+
+# Relative, so timetable_shared can load this module outside the app package
+from .compact import CompactTimetable, SLOT_TYPES, EMPTY
+
+PERIOD = SLOT_TYPES.index('period')
+
+# Average periods per day from which a teacher counts as Moderate / Heavy
+MODERATE_AVG = 4
+HEAVY_AVG = 6
+WORKLOAD_STATUSES = ('Light', 'Moderate', 'Heavy')
+
+def workload_status(avg_periods: float) -> str:
+    """Heavy/Moderate/Light for one average"""
+    if avg_periods >= HEAVY_AVG:
+        return 'Heavy'
+    if avg_periods >= MODERATE_AVG:
+        return 'Moderate'
+    return 'Light'
+
+def workload_statuses(averages: np.ndarray) -> List[str]:
+    """Heavy/Moderate/Light for an array of averages"""
+    codes = (averages >= MODERATE_AVG).astype(np.int8) + (averages >= HEAVY_AVG)
+    return [WORKLOAD_STATUSES[code] for code in codes]
+
+class WorkloadReport:
+    """Teacher and class analytics of a compact timetable, computed in one pass
+
+    Rows follow compact.teacher_names and compact.sections, columns follow days:
+
+    - loads: periods each teacher teaches per day
+    - totals, averages, statuses: weekly periods, periods per day and Heavy/Moderate/Light
+    - double_bookings: periods per teacher beyond one in the same day and time slot
+    - slots_per_day: distinct period slots the school runs each day
+    - teacher_free: period slots of the day in which a teacher does not teach
+    - free_periods: free periods of each class per day
+    """
+
+    def __init__(self, compact: CompactTimetable, days: Optional[Iterable[str]] = None):
+        self.days = list(days) if days is not None else list(compact.days)
+        self.teacher_names = compact.teacher_names
+        self.teacher_index = {name: row for row, name in enumerate(self.teacher_names)}
+        num_teachers, num_days = len(self.teacher_names), len(self.days)
+        num_labels = max(len(compact.labels), 1)
+
+        # Compact day index -> report column, -1 for days the report leaves out
+        columns = np.array([self.days.index(day) if day in self.days else -1 for day in compact.days],
+                           dtype=np.int64)
+        periods = (compact.kind == PERIOD) & (compact.time != EMPTY) & (columns >= 0)[None, :, None]
+
+        # Every taught cell as (teacher, day column, time label)
+        taught = periods & (compact.teacher != EMPTY)
+        sections, day_idx, positions = np.nonzero(taught)
+        teachers = compact.teacher[sections, day_idx, positions].astype(np.int64)
+        days_of = columns[day_idx]
+        times = compact.time[sections, day_idx, positions].astype(np.int64)
+
+        self.loads = np.bincount(teachers * num_days + days_of,
+                                 minlength=num_teachers * num_days).reshape(num_teachers, num_days)
+        self.totals = self.loads.sum(axis=1)
+        self.averages = self.totals / num_days if num_days else np.zeros(num_teachers)
+        self.statuses = workload_statuses(self.averages)
+
+        # The same teacher twice in one day and time slot is a double booking
+        slots, counts = np.unique((teachers * num_days + days_of) * num_labels + times, return_counts=True)
+        self.double_bookings = np.bincount(slots // (num_days * num_labels), weights=counts - 1,
+                                           minlength=num_teachers).astype(np.int64)
+        busy = np.bincount(slots // num_labels, minlength=num_teachers * num_days).reshape(num_teachers, num_days)
+
+        # Distinct period slots the school runs each day
+        sections, day_idx, positions = np.nonzero(periods)
+        day_slots = np.unique(columns[day_idx] * num_labels + compact.time[sections, day_idx, positions])
+        self.slots_per_day = np.bincount(day_slots // num_labels, minlength=num_days)[:num_days]
+        self.teacher_free = self.slots_per_day[None, :] - busy
+
+        free_id = compact.names.index('Free Period') if 'Free Period' in compact.names else EMPTY
+        per_day = (periods & (compact.subject == free_id) & (free_id != EMPTY)).sum(axis=2)
+        self.free_periods = np.zeros((len(compact.sections), num_days), dtype=np.int64)
+        self.free_periods[:, columns[columns >= 0]] = per_day[:, columns >= 0]
+
+    def teacher(self, name: str) -> Optional[int]:
+        """Row of a teacher, or None if they teach no period"""
+        return self.teacher_index.get(name)
+
+    def daily_breakdown(self, row: int) -> dict:
+        return {day: int(periods) for day, periods in zip(self.days, self.loads[row])}
+
+    def free_breakdown(self, row: Optional[int]) -> dict:
+        """Free period slots per day of a teacher; a teacher without a row is free all day"""
+        free = self.teacher_free[row] if row is not None else self.slots_per_day
+        return {day: int(periods) for day, periods in zip(self.days, free)}
@@ -0,0 +1,175 @@
+from collections.abc import Mapping
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+SLOT_TYPES = ('period', 'break', 'eca', 'lab', 'extra_class')  # Codes 0-4; other types get later codes
+SLOT_KEYS = ('time', 'subject', 'teacher', 'type')
+EMPTY = -1
+ARRAY_FIELDS = ('time', 'subject', 'teacher', 'kind', 'length', 'present')
+
+class CompactTimetable(Mapping):
+    """Timetables of many classes held in small integer arrays
+
+    Cell (section, day, index) of the arrays describes one entry of a day's
+    slot list: time is an id into labels, subject an id into names, teacher
+    an id into teacher_names (EMPTY when the entry has no teacher) and kind
+    an index into slot_types, which starts with SLOT_TYPES. length holds the
+    number of entries per day, so every day reads back in the order it was
+    written. The rare entry with keys beyond SLOT_KEYS keeps them in extras.
+
+    It is also a read-only mapping of class key -> {day: [slot dict]}, the
+    shape used by API responses and the desktop display. Those dicts are only
+    built when a class is looked up.
+    """
+
+    def __init__(self, sections: Iterable[str], days: Iterable[str], width: int = 12):
+        self.sections = list(sections)
+        self.days = list(days)
+        self.section_index = {key: section for section, key in enumerate(self.sections)}
+        self.day_index = {day: idx for idx, day in enumerate(self.days)}
+
+        shape = (len(self.sections), len(self.days), max(width, 1))
+        self.time = np.full(shape, EMPTY, dtype=np.int16)
+        self.subject = np.full(shape, EMPTY, dtype=np.int16)
+        self.teacher = np.full(shape, EMPTY, dtype=np.int16)
+        self.kind = np.zeros(shape, dtype=np.int8)
+        self.length = np.zeros(shape[:2], dtype=np.int16)
+        self.present = np.zeros(shape[:2], dtype=bool)  # Days that exist in a class's timetable
+
+        self.labels: List[str] = []
+        self.names: List[str] = []
+        self.teacher_names: List[str] = []
+        self.slot_types: List[str] = list(SLOT_TYPES)
+        self.extras: Dict[Tuple[int, int, int], Dict[str, Any]] = {}
+        self._ids: Tuple[Dict[str, int], ...] = ({}, {}, {}, {slot_type: code for code, slot_type in enumerate(SLOT_TYPES)})
+
+    @classmethod
+    def from_dicts(cls, timetables: Dict[str, Dict[str, List[Dict[str, Any]]]]) -> 'CompactTimetable':
+        """Build from the {class key: {day: [slot dict]}} shape"""
+        days = {}
+        width = 1
+        for timetable in timetables.values():
+            for day, slots in timetable.items():
+                days.setdefault(day, None)
+                width = max(width, len(slots))
+
+        compact = cls(timetables.keys(), days, width)
+        for section, timetable in enumerate(timetables.values()):
+            for day, slots in timetable.items():
+                compact.add_day(section, day)
+                for slot in slots:
+                    extra = {key: value for key, value in slot.items() if key not in SLOT_KEYS} or None
+                    compact.append(section, day, slot['time'], slot['subject'], slot['type'], slot.get('teacher'), extra)
+        return compact
+
+    @classmethod
+    def from_arrays(cls, sections: List[str], days: List[str], labels: List[str], names: List[str],
+                    teacher_names: List[str], arrays: Dict[str, np.ndarray], slot_types: List[str] = SLOT_TYPES,
+                    extras: Optional[Dict[Tuple[int, int, int], Dict[str, Any]]] = None) -> 'CompactTimetable':
+        """Wrap existing arrays, e.g. memory-mapped from a project file, without copying them"""
+        compact = cls(sections, days, width=1)
+        for field in ARRAY_FIELDS:
+            setattr(compact, field, arrays[field])
+        compact.labels, compact.names, compact.teacher_names = list(labels), list(names), list(teacher_names)
+        compact.slot_types = list(slot_types)
+        compact.extras = dict(extras or {})
+        compact._ids = tuple({value: idx for idx, value in enumerate(table)}
+                             for table in (compact.labels, compact.names, compact.teacher_names, compact.slot_types))
+        return compact
+
+    def arrays(self) -> Dict[str, np.ndarray]:
+        return {field: getattr(self, field) for field in ARRAY_FIELDS}
+
+    def add_day(self, section: int, day: str):
+        """Mark a day as part of a class's timetable, even if it stays empty"""
+        self.present[section, self.day_index[day]] = True
+
+    def append(self, section: int, day: str, time: str, subject: str, slot_type: str,
+               teacher: Optional[str] = None, extra: Optional[Dict[str, Any]] = None):
+        """Add an entry at the end of a class's day"""
+        day_idx = self.day_index[day]
+        position = int(self.length[section, day_idx])
+        if position >= self.time.shape[2]:
+            self._grow(position + 1)
+
+        labels, names, teachers, slot_types = self._ids
+        self.time[section, day_idx, position] = self._intern(labels, self.labels, time)
+        self.subject[section, day_idx, position] = self._intern(names, self.names, subject)
+        if teacher is not None:
+            self.teacher[section, day_idx, position] = self._intern(teachers, self.teacher_names, teacher)
+        self.kind[section, day_idx, position] = self._intern(slot_types, self.slot_types, slot_type)
+        if extra:
+            self.extras[(section, day_idx, position)] = extra
+        self.length[section, day_idx] = position + 1
+        self.present[section, day_idx] = True
+
+    def set_cell(self, key: str, day: str, position: int, subject: str, teacher: Optional[str] = None):
+        """Change the subject and teacher of an existing entry, keeping its time and type"""
+        section, day_idx = self.section_index[key], self.day_index[day]
+        if not 0 <= position < self.length[section, day_idx]:
+            raise IndexError(f"{key} has no entry {position} on {day}")
+        _, names, teachers, _ = self._ids
+        self.subject[section, day_idx, position] = self._intern(names, self.names, subject)
+        self.teacher[section, day_idx, position] = (self._intern(teachers, self.teacher_names, teacher)
+                                                    if teacher is not None else EMPTY)
+
+    def cells(self, key: str, day: str) -> Iterator[Tuple[str, str, Optional[str], str]]:
+        """Yield (time, subject, teacher, type) for each entry of a day without building dicts"""
+        section, day_idx = self.section_index[key], self.day_index[day]
+        for position in range(int(self.length[section, day_idx])):
+            teacher = self.teacher[section, day_idx, position]
+            yield (self.labels[self.time[section, day_idx, position]],
+                   self.names[self.subject[section, day_idx, position]],
+                   self.teacher_names[teacher] if teacher != EMPTY else None,
+                   self.slot_types[self.kind[section, day_idx, position]])
+
+    def to_dict(self) -> Dict[str, Dict[str, List[Dict[str, Any]]]]:
+        """All classes in the {class key: {day: [slot dict]}} shape"""
+        return {key: self[key] for key in self}
+
+    @property
+    def nbytes(self) -> int:
+        return sum(array.nbytes for array in self.arrays().values())
+
+    def __getitem__(self, key: str) -> Dict[str, List[Dict[str, Any]]]:
+        section = self.section_index[key]
+        timetable = {}
+        for day_idx, day in enumerate(self.days):
+            if not self.present[section, day_idx]:
+                continue
+            slots = []
+            for position, (time, subject, teacher, slot_type) in enumerate(self.cells(key, day)):
+                slot = {'time': time, 'subject': subject}
+                if teacher is not None:
+                    slot['teacher'] = teacher
+                slot['type'] = slot_type
+                if self.extras:
+                    slot.update(self.extras.get((section, day_idx, position), ()))
+                slots.append(slot)
+            timetable[day] = slots
+        return timetable
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.section_index)
+
+    def __len__(self) -> int:
+        return len(self.section_index)
+
+    def __contains__(self, key) -> bool:
+        return key in self.section_index
+
+    def _intern(self, ids: Dict[str, int], table: List[str], value: str) -> int:
+        value_id = ids.get(value)
+        if value_id is None:
+            value_id = ids[value] = len(table)
+            table.append(value)
+        return value_id
+
+    def _grow(self, width: int):
+        extra = max(width - self.time.shape[2], self.time.shape[2] // 2)
+        pad = ((0, 0), (0, 0), (0, extra))
+        self.time = np.pad(self.time, pad, constant_values=EMPTY)
+        self.subject = np.pad(self.subject, pad, constant_values=EMPTY)
+        self.teacher = np.pad(self.teacher, pad, constant_values=EMPTY)
+        self.kind = np.pad(self.kind, pad, constant_values=0)
@@ -0,0 +1,75 @@
+import csv
+import io
+import json
+from typing import Iterator
+from app.database import SessionLocal
+from app.models import Timetable, Class, Subject, Teacher
+from app.services.solver import FREE_PERIOD
+
+EXPORT_FORMATS = ("csv", "ndjson")
+EXPORT_COLUMNS = ["class_id", "class_number", "stream", "day", "time", "subject", "teacher", "type"]
+FIRST_CHUNK_ROWS = 50
+
+class ExportService:
+    """Streams a school's timetables as CSV or newline-delimited JSON
+
+    Rows are read from a server-side cursor in batches of batch_size and
+    written out in chunks, so memory use does not grow with the size of the
+    export. The CSV header goes out before the query runs and chunks start
+    small, doubling up to batch_size, so clients see rows right away.
+    """
+
+    def __init__(self, batch_size: int = 1000):
+        self.batch_size = batch_size
+
+    def stream_school(self, school_id: int, format: str = "csv") -> Iterator[str]:
+        """Yield the export of every timetable row of a school in chunks"""
+        if format not in EXPORT_FORMATS:
+            raise ValueError("Unsupported format. Use 'csv' or 'ndjson'")
+
+        buffer = io.StringIO()
+        writer = csv.writer(buffer) if format == "csv" else None
+        if writer:
+            writer.writerow(EXPORT_COLUMNS)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+        # The response outlives the request's session, so the stream opens its own
+        db = SessionLocal()
+        try:
+            rows = db.query(
+                Timetable.class_id, Class.class_number, Class.stream, Timetable.day,
+                Timetable.time_slot, Subject.name, Teacher.name, Timetable.slot_type
+            ).join(Class, Timetable.class_id == Class.id)\
+             .outerjoin(Subject, Timetable.subject_id == Subject.id)\
+             .outerjoin(Teacher, Timetable.teacher_id == Teacher.id)\
+             .filter(Class.school_id == school_id)\
+             .order_by(Timetable.class_id, Timetable.id)\
+             .yield_per(self.batch_size)
+
+            # Rows of a class are written in day and slot order, so id order reads them back that way
+            chunk_rows = min(FIRST_CHUNK_ROWS, self.batch_size)
+            next_flush = chunk_rows
+            for count, (class_id, class_number, stream, day, time_slot, subject, teacher, slot_type) in enumerate(rows, 1):
+                if subject is None and teacher is None:
+                    # Free periods are stored without a subject or teacher
+                    subject, teacher = FREE_PERIOD, ""
+                row = [class_id, class_number, stream, day, time_slot,
+                       subject or "Unknown", teacher if teacher is not None else "TBD", slot_type]
+                if writer:
+                    writer.writerow(row)
+                else:
+                    buffer.write(json.dumps(dict(zip(EXPORT_COLUMNS, row))) + "\n")
+
+                if count == next_flush:
+                    chunk_rows = min(chunk_rows * 2, self.batch_size)
+                    next_flush += chunk_rows
+                    yield buffer.getvalue()
+                    buffer.seek(0)
+                    buffer.truncate()
+        finally:
+            db.close()
+
+        if buffer.tell():
+            yield buffer.getvalue()
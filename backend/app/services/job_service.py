@@ -0,0 +1,192 @@
+import json
+import os
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional
+from sqlalchemy.orm import Session
+from app.database import SessionLocal, engine
+from app.models import GenerationJob
+from app.services.timetable_service import TimetableService
+
+class JobService:
+    """Runs timetable generation jobs in a background process pool
+
+    Jobs are rows in the generation_jobs table, so their status and progress
+    can be read from any worker or API process without a message broker.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None):
+        self.max_workers = max_workers or max(1, min(4, os.cpu_count() or 1))
+        self._executor = None
+
+    def submit(self, db: Session, school_id: int, class_ids: List[int] = None,
+               regenerate: bool = False) -> GenerationJob:
+        """Queue a generation run and return its job row"""
+        job = GenerationJob(
+            id=uuid.uuid4().hex,
+            school_id=school_id,
+            class_ids=list(class_ids or []),
+            regenerate=regenerate,
+            status="queued",
+            progress={"completed": 0, "total": 0, "classes": {}, "solver": {}}
+        )
+        db.add(job)
+        db.commit()
+        db.refresh(job)
+
+        future = self._get_executor().submit(run_generation_job, job.id)
+        future.add_done_callback(lambda f, job_id=job.id: self._on_done(job_id, f))
+        return job
+
+    def get_job(self, db: Session, job_id: str) -> Optional[GenerationJob]:
+        return db.query(GenerationJob).filter(GenerationJob.id == job_id).first()
+
+    def stream_events(self, job_id: str, poll_interval: float = 0.25,
+                      keepalive: float = 15.0) -> Iterator[str]:
+        """Yield Server-Sent Events for a job until it completes or fails
+
+        Emits a status event on every status change, a class_completed event per
+        finished class and a progress event whenever the solver counters move.
+        """
+        last_status = None
+        last_solver = None
+        sent_classes = set()
+        last_sent = time.monotonic()
+
+        while True:
+            db = SessionLocal()
+            try:
+                job = self.get_job(db, job_id)
+                if not job:
+                    yield _sse("failed", {"error": "Job not found"})
+                    return
+                job_status, progress, result, error = job.status, job.progress or {}, job.result, job.error
+            finally:
+                db.close()
+
+            events = []
+            finished = job_status in ("completed", "failed")
+            if job_status != last_status and not finished:
+                last_status = job_status
+                events.append(("status", {"status": job_status}))
+            for class_id, entry in progress.get("classes", {}).items():
+                if class_id not in sent_classes:
+                    sent_classes.add(class_id)
+                    events.append(("class_completed", {
+                        "class": entry["class"],
+                        "class_id": int(class_id),
+                        "completed": len(sent_classes),
+                        "total": progress.get("total", 0)
+                    }))
+            solver = progress.get("solver") or None
+            if solver and solver != last_solver:
+                last_solver = solver
+                events.append(("progress", solver))
+            # Classes finished in the last poll go out before the job's final status
+            if job_status != last_status and finished:
+                last_status = job_status
+                events.append(("status", {"status": job_status}))
+
+            for name, data in events:
+                yield _sse(name, data)
+            if events:
+                last_sent = time.monotonic()
+            elif time.monotonic() - last_sent >= keepalive:
+                last_sent = time.monotonic()
+                yield ": keep-alive\n\n"
+
+            if job_status == "completed":
+                yield _sse("completed", {"rows_written": (result or {}).get("rows_written", 0)})
+                return
+            if job_status == "failed":
+                yield _sse("failed", {"error": error})
+                return
+            time.sleep(poll_interval)
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers, initializer=_init_worker)
+        return self._executor
+
+    def _on_done(self, job_id: str, future):
+        """Mark a job failed if its worker died before it could record the outcome"""
+        error = future.exception()
+        if error is None:
+            return
+        if type(error).__name__ == "BrokenProcessPool":
+            self._executor = None
+        db = SessionLocal()
+        try:
+            job = db.query(GenerationJob).filter(GenerationJob.id == job_id).first()
+            if job and job.status not in ("completed", "failed"):
+                job.status = "failed"
+                job.error = str(error) or type(error).__name__
+                db.commit()
+        finally:
+            db.close()
+
+def _sse(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def _init_worker():
+    # Connections inherited from the parent process must not be shared
+    engine.dispose(close=False)
+
+class _ProgressRecorder:
+    """Stores generation progress on the job row, at most every interval seconds"""
+
+    def __init__(self, job_id: str, interval: float = 0.5):
+        self.job_id = job_id
+        self.interval = interval
+        self.state: Dict[str, Any] = {"completed": 0, "total": 0, "classes": {}, "solver": {}}
+        self._last_write = 0.0
+
+    def __call__(self, event: Dict[str, Any]):
+        if event["type"] == "progress":
+            self.state["solver"] = {key: value for key, value in event.items() if key != "type"}
+            force = False
+        elif event["type"] == "class_completed":
+            # Sections can share a class name, so entries are keyed by class id
+            self.state["classes"][str(event["class_id"])] = {"class": event["class"], "status": "completed"}
+            self.state["completed"] = event["completed"]
+            self.state["total"] = event["total"]
+            force = True
+        else:
+            return
+
+        now = time.monotonic()
+        if force or now - self._last_write >= self.interval:
+            self._last_write = now
+            self.write()
+
+    def write(self, **fields):
+        # A separate session so progress commits never commit the generation itself
+        db = SessionLocal()
+        try:
+            db.query(GenerationJob).filter(GenerationJob.id == self.job_id).update(
+                {"progress": dict(self.state), **fields}, synchronize_session=False
+            )
+            db.commit()
+        finally:
+            db.close()
+
+def run_generation_job(job_id: str):
+    """Worker entry point: generate timetables for one job and record the outcome"""
+    db = SessionLocal()
+    recorder = _ProgressRecorder(job_id)
+    try:
+        job = db.query(GenerationJob).filter(GenerationJob.id == job_id).first()
+        if not job:
+            return
+        school_id, class_ids, regenerate = job.school_id, job.class_ids, bool(job.regenerate)
+        recorder.write(status="running")
+
+        result = TimetableService().generate_timetables(db, school_id, class_ids, progress=recorder,
+                                                        regenerate=regenerate)
+        recorder.write(status="completed", result=result)
+    except Exception as e:
+        db.rollback()
+        recorder.write(status="failed", error=str(e))
+    finally:
+        db.close()
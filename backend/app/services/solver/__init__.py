@@ -0,0 +1,9 @@
+from app.services.solver.model import SolverModel, FREE_PERIOD, NO_TEACHER, BLOCKED
+from app.services.solver.backtracking import BacktrackingSolver, SolverResult
+from app.services.solver.partition import connected_components, solve_partitioned
+from app.services.solver.annealing import AnnealingOptimizer, score
+from app.services.solver.portfolio import solve_portfolio
+
+__all__ = ["SolverModel", "BacktrackingSolver", "SolverResult", "FREE_PERIOD", "NO_TEACHER", "BLOCKED",
+           "connected_components", "solve_partitioned", "AnnealingOptimizer", "score",
+           "solve_portfolio"]
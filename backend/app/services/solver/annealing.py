@@ -0,0 +1,209 @@
+import math
+import random
+import time
+from typing import Any, Dict, List, Optional
+
+from app.services.solver.model import NO_TEACHER
+from app.services.solver.backtracking import SolverResult
+
+class AnnealingOptimizer:
+    """Simulated annealing over a feasible grid to improve soft constraints
+
+    A move swaps two cells of one section on different days, which keeps
+    every weekly quota intact. Moves that would double-book a teacher or
+    break a daily cap are never made, so the grid stays feasible. The
+    objective (lower is better) adds up:
+
+    - repeats: pairs of periods of the same subject on one day
+    - spread: a rare subject (at most every other day) on consecutive days
+    - balance: spread of each teacher's daily loads around an even split
+
+    Only the terms touched by a move are re-evaluated.
+    """
+
+    def __init__(self, time_budget: float = 1.0, rng: Optional[random.Random] = None,
+                 repeat_weight: float = 10.0, spread_weight: float = 3.0, balance_weight: float = 1.0,
+                 start_temperature: float = 5.0, end_temperature: float = 0.05):
+        self.time_budget = time_budget
+        self.rng = rng or random.Random()
+        self.repeat_weight = repeat_weight
+        self.spread_weight = spread_weight
+        self.balance_weight = balance_weight
+        self.start_temperature = start_temperature
+        self.end_temperature = end_temperature
+
+    def optimize(self, result: SolverResult) -> Dict[str, Any]:
+        """Improve result.grid in place within the time budget and return the scores"""
+        state = _State(result, self)
+        initial = state.total()
+        stats = {"initial_score": round(initial, 2), "score": round(initial, 2), "iterations": 0, "accepted": 0}
+        if not state.cells or self.time_budget <= 0:
+            return stats
+
+        rng = self.rng
+        started = time.perf_counter()
+        deadline = started + self.time_budget
+        temperature = self.start_temperature
+        cooling = math.log(self.end_temperature / self.start_temperature)
+        current = best = initial
+        best_grid = [[list(row) for row in days] for days in result.grid]
+
+        iterations = accepted = 0
+        while True:
+            if iterations % 256 == 0:
+                now = time.perf_counter()
+                if now >= deadline:
+                    break
+                temperature = self.start_temperature * math.exp(cooling * (now - started) / self.time_budget)
+
+            iterations += 1
+            section, cells = rng.choice(state.cells)
+            first, second = rng.sample(cells, 2) if len(cells) > 1 else (cells[0], cells[0])
+            if first[0] == second[0]:
+                continue
+            delta = state.try_swap(section, first, second)
+            if delta is None:
+                continue
+            if delta <= 0 or rng.random() < math.exp(-delta / temperature):
+                accepted += 1
+                current += delta
+                if current < best - 1e-9:
+                    best = current
+                    best_grid = [[list(row) for row in days] for days in result.grid]
+            else:
+                state.swap(section, first, second)
+
+        result.grid[:] = best_grid
+        stats.update(score=round(best, 2), iterations=iterations, accepted=accepted)
+        return stats
+
+def score(result: SolverResult, optimizer: Optional[AnnealingOptimizer] = None) -> float:
+    """Soft-constraint objective of a solved grid (lower is better)"""
+    return _State(result, optimizer or AnnealingOptimizer()).total()
+
+class _State:
+    """Counters behind the objective, updated incrementally by swaps"""
+
+    def __init__(self, result: SolverResult, optimizer: AnnealingOptimizer):
+        model = result.model
+        self.grid = result.grid
+        self.num_days = model.num_days
+        self.repeat_weight = optimizer.repeat_weight
+        self.spread_weight = optimizer.spread_weight
+        self.balance_weight = optimizer.balance_weight
+
+        self.teachers = [[lesson[1] for lesson in lessons] for lessons in model.lessons]
+        self.caps = [[lesson[3] for lesson in lessons] for lessons in model.lessons]
+        # Subjects taught at most every other day should not land on consecutive days
+        self.rare = [[2 * lesson[2] <= self.num_days + 1 for lesson in lessons] for lessons in model.lessons]
+        self.masks = [[[model.slot_mask(section, day, period) for period in range(len(self.grid[section][day]))]
+                       for day in range(self.num_days)] for section in range(len(model.sections))]
+
+        self.counts = [[[0] * len(lessons) for _ in range(self.num_days)] for lessons in model.lessons]
+        self.load = [[0] * self.num_days for _ in model.teachers]
+        self.occupancy = list(model.teacher_busy) or [0] * len(model.teachers)
+        self.cells: List[tuple] = []
+
+        for section, days in enumerate(self.grid):
+            fixed = model.fixed[section] if section < len(model.fixed) else {}
+            movable = []
+            for day, row in enumerate(days):
+                for period, lesson in enumerate(row):
+                    if lesson < 0:
+                        continue
+                    self.counts[section][day][lesson] += 1
+                    teacher = self.teachers[section][lesson]
+                    if teacher != NO_TEACHER:
+                        self.load[teacher][day] += 1
+                        self.occupancy[teacher] |= self.masks[section][day][period]
+                    if (day, period) not in fixed:
+                        movable.append((day, period))
+            if len(movable) > 1:
+                self.cells.append((section, movable))
+
+    def lesson_cost(self, section: int, lesson: int) -> float:
+        counts = self.counts[section]
+        cost = 0.0
+        for day in range(self.num_days):
+            count = counts[day][lesson]
+            cost += self.repeat_weight * count * (count - 1) / 2
+            if self.rare[section][lesson] and day and count and counts[day - 1][lesson]:
+                cost += self.spread_weight
+        return cost
+
+    def teacher_cost(self, teacher: int, days) -> float:
+        if teacher == NO_TEACHER:
+            return 0.0
+        load = self.load[teacher]
+        return self.balance_weight * sum(load[day] * load[day] for day in days)
+
+    def try_swap(self, section: int, first: tuple, second: tuple) -> Optional[float]:
+        """Swap two cells if the result stays feasible and return the objective change"""
+        (day_a, period_a), (day_b, period_b) = first, second
+        row_a, row_b = self.grid[section][day_a], self.grid[section][day_b]
+        lesson_a, lesson_b = row_a[period_a], row_b[period_b]
+        if lesson_a == lesson_b:
+            return None
+        teacher_a = self.teachers[section][lesson_a]
+        teacher_b = self.teachers[section][lesson_b]
+        mask_a = self.masks[section][day_a][period_a]
+        mask_b = self.masks[section][day_b][period_b]
+        counts = self.counts[section]
+
+        # Hard constraints: daily caps and teacher availability in the new slot
+        caps = self.caps[section]
+        if counts[day_b][lesson_a] >= caps[lesson_a] or counts[day_a][lesson_b] >= caps[lesson_b]:
+            return None
+        if teacher_a != teacher_b:
+            if teacher_a != NO_TEACHER and self.occupancy[teacher_a] & mask_b:
+                return None
+            if teacher_b != NO_TEACHER and self.occupancy[teacher_b] & mask_a:
+                return None
+
+        days = (day_a, day_b)
+        before = (self.lesson_cost(section, lesson_a) + self.lesson_cost(section, lesson_b) +
+                  self.teacher_cost(teacher_a, days) +
+                  (self.teacher_cost(teacher_b, days) if teacher_b != teacher_a else 0.0))
+
+        self.swap(section, first, second)
+
+        after = (self.lesson_cost(section, lesson_a) + self.lesson_cost(section, lesson_b) +
+                 self.teacher_cost(teacher_a, days) +
+                 (self.teacher_cost(teacher_b, days) if teacher_b != teacher_a else 0.0))
+        return after - before
+
+    def swap(self, section: int, first: tuple, second: tuple):
+        """Exchange two cells and update the counters; applying it twice undoes it"""
+        (day_a, period_a), (day_b, period_b) = first, second
+        row_a, row_b = self.grid[section][day_a], self.grid[section][day_b]
+        lesson_a, lesson_b = row_a[period_a], row_b[period_b]
+        teacher_a = self.teachers[section][lesson_a]
+        teacher_b = self.teachers[section][lesson_b]
+        mask_a = self.masks[section][day_a][period_a]
+        mask_b = self.masks[section][day_b][period_b]
+        counts = self.counts[section]
+
+        row_a[period_a], row_b[period_b] = lesson_b, lesson_a
+        counts[day_a][lesson_a] -= 1
+        counts[day_b][lesson_a] += 1
+        counts[day_b][lesson_b] -= 1
+        counts[day_a][lesson_b] += 1
+        if teacher_a != teacher_b:
+            if teacher_a != NO_TEACHER:
+                self.occupancy[teacher_a] = (self.occupancy[teacher_a] & ~mask_a) | mask_b
+                self.load[teacher_a][day_a] -= 1
+                self.load[teacher_a][day_b] += 1
+            if teacher_b != NO_TEACHER:
+                self.occupancy[teacher_b] = (self.occupancy[teacher_b] & ~mask_b) | mask_a
+                self.load[teacher_b][day_b] -= 1
+                self.load[teacher_b][day_a] += 1
+
+    def total(self) -> float:
+        cost = 0.0
+        for section, lessons in enumerate(self.teachers):
+            for lesson in range(len(lessons)):
+                cost += self.lesson_cost(section, lesson)
+        for teacher, load in enumerate(self.load):
+            # Offset by the perfectly even split so that a balanced week scores zero
+            cost += self.teacher_cost(teacher, range(self.num_days)) - self.balance_weight * sum(load) ** 2 / self.num_days
+        return cost
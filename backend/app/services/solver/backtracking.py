@@ -0,0 +1,327 @@
+import random
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from app.services.solver.model import SolverModel, NO_TEACHER, BLOCKED
+
+UNASSIGNED = -2
+
+class SolverResult:
+    """Outcome of a solver run"""
+
+    def __init__(self, model: SolverModel, grid: List[List[List[int]]], solved: bool, stats: Dict[str, Any]):
+        self.model = model
+        self.grid = grid  # section -> day -> period -> lesson index, BLOCKED for lab/ECA windows
+        self.solved = solved
+        self.stats = stats
+
+    def lesson_at(self, section: int, day: int, period: int):
+        """Return (subject_id, teacher_id) for a cell, or None if it is blocked or empty"""
+        lesson = self.grid[section][day][period]
+        if lesson < 0:
+            return None
+        subject, teacher, _, _ = self.model.lessons[section][lesson]
+        return subject, teacher
+
+class BacktrackingSolver:
+    """Backtracking search with forward checking over (day, period) slot groups
+
+    Slot groups are filled in chronological order. Each group is one
+    bipartite matching of sections to teachers, built with augmenting paths
+    so that every teacher who has no spare slot left in the week is placed.
+    After a group is filled the remaining demand is forward checked against
+    the rest of the week; a group that cannot be filled, or that leaves an
+    unsatisfiable remainder, is retried with new tie-breaks and then undone
+    in favour of the previous group. The search restarts when it thrashes.
+    """
+
+    def __init__(self, max_backtracks: int = 200, max_restarts: int = 10, tries_per_group: int = 3,
+                 rng: Optional[random.Random] = None,
+                 progress: Optional[Callable[[Dict[str, Any]], None]] = None):
+        self.max_backtracks = max_backtracks
+        self.max_restarts = max_restarts
+        self.tries_per_group = tries_per_group
+        self.rng = rng or random.Random()
+        self.progress = progress
+
+    def solve(self, model: SolverModel) -> SolverResult:
+        """Search for a clash-free assignment of every open cell"""
+        if not model.period_masks and model.layouts:
+            model.finalize()
+
+        started = time.perf_counter()
+        stats = {"nodes": 0, "conflicts": 0, "backtracks": 0, "restarts": 0}
+        grid = None
+        solved = False
+
+        for restart in range(self.max_restarts + 1):
+            stats["restarts"] = restart
+            solved, grid = _Attempt(model, self, stats).run()
+            if solved:
+                break
+
+        stats["elapsed"] = time.perf_counter() - started
+        return SolverResult(model, grid, solved, stats)
+
+class _Attempt:
+    """Mutable search state for one restart"""
+
+    def __init__(self, model: SolverModel, solver: BacktrackingSolver, stats: Dict[str, Any]):
+        self.model = model
+        self.solver = solver
+        self.stats = stats
+        self.rng = solver.rng
+        self.num_days = model.num_days
+        num_sections = len(model.sections)
+
+        self.teachers = [[lesson[1] for lesson in lessons] for lessons in model.lessons]
+        self.caps = [[lesson[3] for lesson in lessons] for lessons in model.lessons]
+        self.remaining = [[lesson[2] for lesson in lessons] for lessons in model.lessons]
+        self.day_used = [[[0] * len(lessons) for _ in range(model.num_days)] for lessons in model.lessons]
+        self.occupancy = list(model.teacher_busy) or [0] * len(model.teachers)
+        self.teacher_left = model.teacher_demand()
+
+        self.grid = []
+        self.masks = []
+        for section in range(num_sections):
+            periods = model.periods_per_day(section)
+            self.grid.append([[UNASSIGNED] * periods for _ in range(model.num_days)])
+            self.masks.append([[model.slot_mask(section, day, period) for period in range(periods)]
+                               for day in range(model.num_days)])
+            for day, period in model.blocked[section]:
+                if day < model.num_days and period < periods:
+                    self.grid[section][day][period] = BLOCKED
+            for (day, period), lesson in model.fixed[section].items():
+                self._place(section, day, period, lesson)
+
+        # Slot groups in chronological order; each lists the sections with an open cell there
+        max_periods = max((len(layout) for layout in model.layouts), default=0)
+        self.groups = []
+        for day in range(model.num_days):
+            for period in range(max_periods):
+                members = [s for s in range(num_sections)
+                           if period < len(self.grid[s][day]) and self.grid[s][day][period] == UNASSIGNED]
+                if members:
+                    self.groups.append((day, period, members))
+
+        # Groups left in the day from each group onwards, including the group itself
+        self.today_left = [0] * len(self.groups)
+        for group in range(len(self.groups) - 1, -1, -1):
+            follows = group + 1 < len(self.groups) and self.groups[group + 1][0] == self.groups[group][0]
+            self.today_left[group] = 1 + (self.today_left[group + 1] if follows else 0)
+
+        # The "one period per group" teacher bound is only exact when everyone shares a clock
+        self.tight_week = len(model.layouts) == 1
+
+    def run(self):
+        groups = self.groups
+        tries = [0] * len(groups)
+        placed: List[Optional[Dict[int, int]]] = [None] * len(groups)
+        backtracks = 0
+        group = 0
+
+        while group < len(groups):
+            if tries[group] >= self.solver.tries_per_group:
+                # Every alternative for this group failed: undo the previous group
+                tries[group] = 0
+                group -= 1
+                backtracks += 1
+                self.stats["backtracks"] += 1
+                if group < 0 or backtracks > self.solver.max_backtracks:
+                    return False, self.grid
+                self._undo(group, placed[group])
+                placed[group] = None
+                continue
+
+            tries[group] += 1
+            self.stats["nodes"] += 1
+            assignment = self._fill(group)
+            if assignment is not None:
+                self._apply(group, assignment)
+                if self._forward_check(group + 1):
+                    placed[group] = assignment
+                    group += 1
+                    if self.solver.progress:
+                        self.solver.progress({"type": "progress", "groups": group, "total_groups": len(groups),
+                                              "nodes": self.stats["nodes"], "conflicts": self.stats["conflicts"]})
+                    continue
+                self._undo(group, assignment)
+            self.stats["conflicts"] += 1
+
+        return True, self.grid
+
+    def _day_due(self, day: int) -> List[int]:
+        """Periods each teacher must still teach today because later days cannot take them"""
+        due = [0] * len(self.teacher_left)
+        days_after = self.num_days - day - 1
+        for section, lessons in enumerate(self.remaining):
+            caps = self.caps[section]
+            teacher_of = self.teachers[section]
+            for lesson, left in enumerate(lessons):
+                teacher = teacher_of[lesson]
+                if teacher != NO_TEACHER and left > caps[lesson] * days_after:
+                    due[teacher] += left - caps[lesson] * days_after
+        return due
+
+    def _options(self, section: int, day: int, period: int, groups_left: int,
+                 today_left: int, day_due: List[int]) -> List[int]:
+        """Legal lessons for one cell, most urgent first"""
+        mask = self.masks[section][day][period]
+        used = self.day_used[section][day]
+        left = self.remaining[section]
+        caps = self.caps[section]
+        teacher_of = self.teachers[section]
+        days_after = self.num_days - day - 1
+        row = self.grid[section][day]
+        open_today = sum(1 for cell in row[period:] if cell == UNASSIGNED)
+
+        # Periods that cannot be pushed to later days must take the rest of today
+        due = [max(left[lesson] - caps[lesson] * days_after, 0) for lesson in range(len(left))]
+        only_due = sum(due) >= open_today
+
+        rng = self.rng
+        options = []
+        for lesson in range(len(left)):
+            if not left[lesson] or used[lesson] >= caps[lesson]:
+                continue
+            if only_due and not due[lesson]:
+                continue
+            teacher = teacher_of[lesson]
+            if teacher != NO_TEACHER and self.occupancy[teacher] & mask:
+                continue
+            # Rank by the share of the remaining time this lesson needs: the teacher's
+            # share of the rest of the week or of today, or the section's share of today
+            teacher_share = 0
+            if teacher != NO_TEACHER:
+                teacher_share = max(self.teacher_left[teacher] / groups_left, day_due[teacher] / today_left)
+            due_share = due[lesson] / open_today
+            options.append((-max(teacher_share, due_share), -left[lesson], rng.random(), lesson))
+        options.sort()
+        return [option[-1] for option in options]
+
+    def _fill(self, group: int) -> Optional[Dict[int, int]]:
+        """Match every section of a group to a lesson so that no teacher is used twice"""
+        day, period, members = self.groups[group]
+        groups_left = len(self.groups) - group
+        today_left = self.today_left[group]
+        day_due = self._day_due(day)
+        teachers = self.teachers
+
+        options = {}
+        for section in members:
+            section_options = self._options(section, day, period, groups_left, today_left, day_due)
+            if not section_options:
+                return None
+            options[section] = section_options
+        order = sorted(members, key=lambda s: (len(options[s]), self.rng.random()))
+
+        lesson_of: Dict[int, int] = {}
+        section_of_teacher: Dict[int, int] = {}
+
+        def augment(section, seen):
+            for lesson in options[section]:
+                teacher = teachers[section][lesson]
+                if teacher == NO_TEACHER:
+                    lesson_of[section] = lesson
+                    return True
+                if teacher in seen:
+                    continue
+                seen.add(teacher)
+                holder = section_of_teacher.get(teacher)
+                if holder is None or augment(holder, seen):
+                    lesson_of[section] = lesson
+                    section_of_teacher[teacher] = section
+                    return True
+            return False
+
+        for section in order:
+            if not augment(section, set()):
+                return None
+
+        if self.tight_week:
+            # Teachers with exactly as many periods left as slots, in the week or
+            # in the day, must teach now
+            critical = [t for t, left in enumerate(self.teacher_left)
+                        if (left >= groups_left or day_due[t] >= today_left) and t not in section_of_teacher]
+            if critical:
+                def is_critical(t):
+                    return self.teacher_left[t] >= groups_left or day_due[t] >= today_left
+
+                reachable: Dict[int, List[tuple]] = {}
+                for section in members:
+                    for lesson in options[section]:
+                        teacher = teachers[section][lesson]
+                        if teacher != NO_TEACHER:
+                            reachable.setdefault(teacher, []).append((section, lesson))
+                for teacher in critical:
+                    if not self._relocate(teacher, reachable, lesson_of, section_of_teacher, is_critical, set()):
+                        return None
+
+        return lesson_of
+
+    def _relocate(self, teacher, reachable, lesson_of, section_of_teacher, is_critical, seen) -> bool:
+        """Alternating path that gives an idle teacher a section without leaving any section empty"""
+        seen.add(teacher)
+        for section, lesson in reachable.get(teacher, ()):
+            current = self.teachers[section][lesson_of[section]]
+            if current == teacher or current in seen:
+                continue
+            current_is_critical = current != NO_TEACHER and is_critical(current)
+            if current_is_critical and not self._relocate(current, reachable, lesson_of, section_of_teacher,
+                                                          is_critical, seen):
+                continue
+            if section_of_teacher.get(current) == section:
+                del section_of_teacher[current]
+            lesson_of[section] = lesson
+            section_of_teacher[teacher] = section
+            return True
+        return False
+
+    def _place(self, section: int, day: int, period: int, lesson: int):
+        self.grid[section][day][period] = lesson
+        self.remaining[section][lesson] -= 1
+        self.day_used[section][day][lesson] += 1
+        teacher = self.teachers[section][lesson]
+        if teacher != NO_TEACHER:
+            self.occupancy[teacher] |= self.masks[section][day][period]
+            self.teacher_left[teacher] -= 1
+
+    def _apply(self, group: int, assignment: Dict[int, int]):
+        day, period, _ = self.groups[group]
+        for section, lesson in assignment.items():
+            self._place(section, day, period, lesson)
+
+    def _undo(self, group: int, assignment: Dict[int, int]):
+        day, period, _ = self.groups[group]
+        for section, lesson in assignment.items():
+            self.grid[section][day][period] = UNASSIGNED
+            self.remaining[section][lesson] += 1
+            self.day_used[section][day][lesson] -= 1
+            teacher = self.teachers[section][lesson]
+            if teacher != NO_TEACHER:
+                self.occupancy[teacher] &= ~self.masks[section][day][period]
+                self.teacher_left[teacher] += 1
+
+    def _forward_check(self, next_group: int) -> bool:
+        """Check that the rest of the week can still absorb every open demand"""
+        if next_group >= len(self.groups):
+            return True
+        day = self.groups[next_group][0]
+        if self.tight_week:
+            groups_left = len(self.groups) - next_group
+            for left in self.teacher_left:
+                if left > groups_left:
+                    return False
+            if self.groups[next_group - 1][0] == day:
+                today_left = self.today_left[next_group]
+                for due in self._day_due(day):
+                    if due > today_left:
+                        return False
+        if self.groups[next_group - 1][0] != day:
+            days_left = self.num_days - day
+            for section, lessons in enumerate(self.remaining):
+                caps = self.caps[section]
+                for lesson, left in enumerate(lessons):
+                    if left > caps[lesson] * days_left:
+                        return False
+        return True
@@ -0,0 +1,187 @@
+import math
+from typing import Dict, List, Tuple, Hashable
+
+FREE_PERIOD = "Free Period"
+NO_TEACHER = -1
+BLOCKED = -1
+
+class SolverModel:
+    """Integer-indexed timetable model: sections x slots x teachers"""
+
+    def __init__(self, num_days: int):
+        self.num_days = num_days
+
+        # Lookup tables; everything inside the solver refers to these by index
+        self.subjects: List[str] = []
+        self.teachers: List[Hashable] = []
+        self.sections: List[Hashable] = []
+        self._subject_ids: Dict[str, int] = {}
+        self._teacher_ids: Dict[Hashable, int] = {}
+
+        # Period layouts as (start, end) minutes; sections on different layouts
+        # only clash when their periods overlap on the clock
+        self.layouts: List[List[Tuple[int, int]]] = []
+        self._layout_ids: Dict[Tuple[Tuple[int, int], ...], int] = {}
+
+        # Per section data
+        self.section_layout: List[int] = []
+        self.lessons: List[List[Tuple[int, int, int, int]]] = []  # (subject, teacher, weekly quota, daily cap)
+        self.blocked: List[set] = []  # (day, period) pairs reserved for lab/ECA windows
+        self.fixed: List[Dict[Tuple[int, int], int]] = []  # (day, period) -> lesson kept from a previous run
+
+        # Clock windows where a teacher is already booked outside the model: (teacher, day, start, end)
+        self.busy: List[Tuple[int, int, int, int]] = []
+
+        # Filled in by finalize()
+        self.atoms_per_day = 0
+        self.period_masks: List[List[int]] = []
+        self.teacher_busy: List[int] = []
+
+    def subject_id(self, name: str) -> int:
+        """Return the index of a subject, registering it if needed"""
+        if name not in self._subject_ids:
+            self._subject_ids[name] = len(self.subjects)
+            self.subjects.append(name)
+        return self._subject_ids[name]
+
+    def teacher_id(self, key: Hashable) -> int:
+        """Return the index of a teacher, registering it if needed"""
+        if key not in self._teacher_ids:
+            self._teacher_ids[key] = len(self.teachers)
+            self.teachers.append(key)
+        return self._teacher_ids[key]
+
+    def layout_id(self, periods: List[Tuple[int, int]]) -> int:
+        """Return the index of a period layout, registering it if needed"""
+        key = tuple(periods)
+        if key not in self._layout_ids:
+            self._layout_ids[key] = len(self.layouts)
+            self.layouts.append(list(key))
+        return self._layout_ids[key]
+
+    def periods_per_day(self, section: int) -> int:
+        return len(self.layouts[self.section_layout[section]])
+
+    def add_busy(self, teacher: Hashable, day: int, start: int, end: int):
+        """Book a teacher for a clock window that the model does not schedule"""
+        self.busy.append((self.teacher_id(teacher), day, start, end))
+
+    def add_section(self, key: Hashable, periods: List[Tuple[int, int]], subjects: List[str],
+                    teachers: Dict[str, Hashable], subject_limits: Dict[str, int] = None,
+                    blocked: set = None, fixed: Dict[Tuple[int, int], str] = None) -> int:
+        """Add a section and derive weekly quotas for its subjects
+
+        Subjects listed in subject_limits get at most that many periods per
+        week; the remaining periods are spread evenly over the other subjects.
+        Subjects without a teacher are still scheduled but never clash.
+        Cells in fixed keep their subject as long as it fits the new quotas;
+        the solver only fills the remaining cells.
+        """
+        subject_limits = subject_limits or {}
+        blocked = set(blocked or ())
+        layout = self.layout_id(periods)
+        open_slots = self.num_days * len(periods) - len(blocked)
+
+        limited = [s for s in subjects if s in subject_limits]
+        regular = [s for s in subjects if s not in subject_limits]
+
+        quotas = {}
+        for subject in limited:
+            quotas[subject] = min(subject_limits[subject], self.num_days, max(open_slots - sum(quotas.values()), 0))
+        remaining = open_slots - sum(quotas.values())
+        if regular:
+            base, extra = divmod(remaining, len(regular))
+            for idx, subject in enumerate(regular):
+                quotas[subject] = base + (1 if idx < extra else 0)
+            remaining = 0
+
+        lessons = []
+        for subject in subjects:
+            quota = quotas[subject]
+            if quota <= 0:
+                continue
+            teacher = teachers.get(subject)
+            teacher_idx = self.teacher_id(teacher) if teacher is not None else NO_TEACHER
+            lessons.append((self.subject_id(subject), teacher_idx, quota, self._daily_cap(quota, subject in subject_limits)))
+        if remaining > 0:
+            lessons.append((self.subject_id(FREE_PERIOD), NO_TEACHER, remaining, len(periods)))
+
+        self.sections.append(key)
+        self.section_layout.append(layout)
+        self.lessons.append(lessons)
+        self.blocked.append(blocked)
+        self.fixed.append(self._fixed_cells(lessons, len(periods), blocked, fixed or {}))
+        return len(self.sections) - 1
+
+    def _fixed_cells(self, lessons, periods: int, blocked: set,
+                     fixed: Dict[Tuple[int, int], str]) -> Dict[Tuple[int, int], int]:
+        """Map kept cells to lessons, dropping any that break a quota or daily cap"""
+        lesson_of = {self.subjects[subject]: lesson for lesson, (subject, _, _, _) in enumerate(lessons)}
+        used = [0] * len(lessons)
+        day_used: Dict[Tuple[int, int], int] = {}
+        cells = {}
+        for (day, period), subject in sorted(fixed.items()):
+            lesson = lesson_of.get(subject)
+            if lesson is None or day >= self.num_days or period >= periods or (day, period) in blocked:
+                continue
+            _, _, quota, cap = lessons[lesson]
+            if used[lesson] >= quota or day_used.get((day, lesson), 0) >= cap:
+                continue
+            used[lesson] += 1
+            day_used[(day, lesson)] = day_used.get((day, lesson), 0) + 1
+            cells[(day, period)] = lesson
+        return cells
+
+    def _daily_cap(self, quota: int, limited: bool) -> int:
+        """Most periods of one subject allowed on a single day"""
+        if limited or quota <= self.num_days:
+            return 1
+        return math.ceil(quota / self.num_days) + 1
+
+    def finalize(self):
+        """Split every layout into clock atoms and build per-period occupancy masks
+
+        A teacher's weekly occupancy is a single int with one bit per atom per
+        day, so a clash check is one AND regardless of the number of sections.
+        """
+        bounds = {t for layout in self.layouts for period in layout for t in period}
+        bounds.update(t for _, _, start, end in self.busy for t in (start, end))
+        bounds = sorted(bounds)
+        atoms = list(zip(bounds, bounds[1:]))
+        self.atoms_per_day = len(atoms)
+
+        def window_mask(start, end):
+            mask = 0
+            for bit, (a_start, a_end) in enumerate(atoms):
+                if a_start >= start and a_end <= end:
+                    mask |= 1 << bit
+            return mask
+
+        self.period_masks = [[window_mask(start, end) for start, end in layout] for layout in self.layouts]
+        self.teacher_busy = [0] * len(self.teachers)
+        for teacher, day, start, end in self.busy:
+            self.teacher_busy[teacher] |= window_mask(start, end) << (day * self.atoms_per_day)
+
+    def slot_mask(self, section: int, day: int, period: int) -> int:
+        """Occupancy bits covered by a section's period on a given day"""
+        return self.period_masks[self.section_layout[section]][period] << (day * self.atoms_per_day)
+
+    def teacher_demand(self) -> List[int]:
+        """Weekly periods each teacher has to teach across all sections"""
+        demand = [0] * len(self.teachers)
+        for lessons in self.lessons:
+            for _, teacher, quota, _ in lessons:
+                if teacher != NO_TEACHER:
+                    demand[teacher] += quota
+        return demand
+
+    def check_capacity(self) -> List[str]:
+        """Report teachers whose weekly load cannot fit into the week"""
+        problems = []
+        demand = self.teacher_demand()
+        max_periods = max((len(layout) for layout in self.layouts), default=0)
+        capacity = self.num_days * max_periods
+        for teacher, periods in enumerate(demand):
+            if periods > capacity:
+                problems.append(f"Teacher {self.teachers[teacher]} needs {periods} periods but the week only has {capacity}")
+        return problems
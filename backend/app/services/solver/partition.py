@@ -0,0 +1,124 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Callable, Dict, List, Optional
+
+from app.services.solver.model import SolverModel, NO_TEACHER
+from app.services.solver.backtracking import BacktrackingSolver, SolverResult
+
+# Worker processes when the caller does not say, and the model size below which
+# starting a pool costs more than it saves
+DEFAULT_MAX_WORKERS = 4
+PARALLEL_MIN_SECTIONS = 20
+
+def connected_components(model: SolverModel) -> List[List[int]]:
+    """Group sections that are linked through a shared teacher
+
+    Sections in different components can never clash, so each component can
+    be solved on its own.
+    """
+    parent = list(range(len(model.sections)))
+
+    def find(section):
+        while parent[section] != section:
+            parent[section] = parent[parent[section]]
+            section = parent[section]
+        return section
+
+    first_section = {}
+    for section, lessons in enumerate(model.lessons):
+        for _, teacher, _, _ in lessons:
+            if teacher == NO_TEACHER:
+                continue
+            if teacher in first_section:
+                root, other = find(section), find(first_section[teacher])
+                if root != other:
+                    parent[root] = other
+            else:
+                first_section[teacher] = section
+
+    components: Dict[int, List[int]] = {}
+    for section in range(len(model.sections)):
+        components.setdefault(find(section), []).append(section)
+    return list(components.values())
+
+def submodel(model: SolverModel, sections: List[int]) -> SolverModel:
+    """Copy a subset of sections into a model of their own
+
+    Subject and teacher indexes are kept, so lessons can be copied unchanged.
+    """
+    part = SolverModel(model.num_days)
+    part.subjects = model.subjects
+    part.teachers = model.teachers
+    part.layouts = model.layouts
+    part.atoms_per_day = model.atoms_per_day
+    part.period_masks = model.period_masks
+    part.teacher_busy = model.teacher_busy
+    for section in sections:
+        part.sections.append(model.sections[section])
+        part.section_layout.append(model.section_layout[section])
+        part.lessons.append(model.lessons[section])
+        part.blocked.append(model.blocked[section])
+        part.fixed.append(model.fixed[section])
+    return part
+
+def _solve_part(part: SolverModel, options: Dict[str, Any]) -> SolverResult:
+    return BacktrackingSolver(**options).solve(part)
+
+def solve_partitioned(model: SolverModel, max_workers: Optional[int] = None,
+                      progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+                      **options) -> SolverResult:
+    """Solve independent components of a model in parallel and merge the results
+
+    Components run in a process pool of at most max_workers processes when
+    there are several of them and the model has at least PARALLEL_MIN_SECTIONS
+    sections, and one after another in process otherwise. Either way a dead
+    end in one component never undoes work in another. Progress is reported
+    once per finished component, and a "component_completed" event lists the
+    section keys of each component as soon as it is solved.
+    """
+    if not model.period_masks and model.layouts:
+        model.finalize()
+
+    components = connected_components(model)
+    if len(components) < 2:
+        result = BacktrackingSolver(progress=progress, **options).solve(model)
+        if progress and result.solved:
+            progress({"type": "component_completed", "sections": list(model.sections)})
+        return result
+
+    # Largest components first so the slowest work starts earliest
+    components.sort(key=len, reverse=True)
+    started = time.perf_counter()
+    grid: List[Any] = [None] * len(model.sections)
+    stats = {"nodes": 0, "conflicts": 0, "backtracks": 0, "restarts": 0, "elapsed": 0.0,
+             "components": len(components)}
+    solved = True
+
+    def merge(sections, part, done):
+        nonlocal solved
+        for local, section in enumerate(sections):
+            grid[section] = part.grid[local]
+        solved = solved and part.solved
+        for key in ("nodes", "conflicts", "backtracks"):
+            stats[key] += part.stats[key]
+        stats["restarts"] = max(stats["restarts"], part.stats["restarts"])
+        if progress:
+            if part.solved:
+                progress({"type": "component_completed", "sections": [model.sections[section] for section in sections]})
+            progress({"type": "progress", "components": done, "total_components": len(components),
+                      "nodes": stats["nodes"], "conflicts": stats["conflicts"]})
+
+    max_workers = min(max_workers or DEFAULT_MAX_WORKERS, os.cpu_count() or 1, len(components))
+    if max_workers < 2 or len(model.sections) < PARALLEL_MIN_SECTIONS:
+        for done, sections in enumerate(components, 1):
+            merge(sections, _solve_part(submodel(model, sections), options), done)
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futures = {executor.submit(_solve_part, submodel(model, sections), options): sections
+                       for sections in components}
+            for done, future in enumerate(as_completed(futures), 1):
+                merge(futures[future], future.result(), done)
+
+    stats["elapsed"] = time.perf_counter() - started
+    return SolverResult(model, grid, solved, stats)
@@ -0,0 +1,174 @@
+import multiprocessing
+import os
+import queue
+import random
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.services.solver.model import SolverModel
+from app.services.solver.backtracking import SolverResult
+from app.services.solver.partition import solve_partitioned
+from app.services.solver.annealing import AnnealingOptimizer
+
+# Search settings the portfolio cycles through; each run also gets its own seed
+SEARCH_VARIANTS = [
+    {"tries_per_group": 3, "max_backtracks": 200, "max_restarts": 10},
+    {"tries_per_group": 5, "max_backtracks": 400, "max_restarts": 5},
+    {"tries_per_group": 2, "max_backtracks": 100, "max_restarts": 20},
+]
+
+# Annealing settings: cooler runs polish, hotter runs explore, weights shift the focus
+OPTIMIZER_VARIANTS = [
+    {"start_temperature": 5.0, "end_temperature": 0.05},
+    {"start_temperature": 20.0, "end_temperature": 0.1},
+    {"start_temperature": 2.0, "end_temperature": 0.01, "balance_weight": 2.0},
+]
+
+def portfolio_configs(size: int, seed: int = 0) -> List[Dict[str, Any]]:
+    """Build size run configurations with distinct seeds and settings"""
+    return [{
+        "seed": seed + index,
+        "search": SEARCH_VARIANTS[index % len(SEARCH_VARIANTS)],
+        "optimizer": OPTIMIZER_VARIANTS[(index // len(SEARCH_VARIANTS)) % len(OPTIMIZER_VARIANTS)],
+    } for index in range(size)]
+
+# Seconds between progress messages a run sends to the parent
+PROGRESS_INTERVAL = 0.25
+
+# Set in each pool worker: where runs send their progress
+_progress_queue = None
+
+def _init_worker(progress_queue):
+    global _progress_queue
+    _progress_queue = progress_queue
+
+class _ProgressForwarder:
+    """Sends a run's solver counters to the parent, at most every PROGRESS_INTERVAL seconds"""
+
+    def __init__(self, run: int):
+        self.run = run
+        self._last_sent = 0.0
+
+    def __call__(self, event: Dict[str, Any]):
+        now = time.monotonic()
+        if event["type"] == "progress" and now - self._last_sent >= PROGRESS_INTERVAL:
+            self._last_sent = now
+            _progress_queue.put((self.run, event["nodes"], event["conflicts"]))
+
+def _run_config(model: SolverModel, config: Dict[str, Any], time_limit: float,
+                run: int = 0) -> Tuple[SolverResult, Dict[str, Any]]:
+    """Solve and optimize one configuration within time_limit seconds"""
+    started = time.perf_counter()
+    rng = random.Random(config["seed"])
+    progress = _ProgressForwarder(run) if _progress_queue is not None else None
+    result = solve_partitioned(model, max_workers=1, rng=rng, progress=progress, **config["search"])
+    optimization = {}
+    if result.solved:
+        remaining = max(time_limit - (time.perf_counter() - started), 0.0)
+        optimization = AnnealingOptimizer(time_budget=remaining, rng=rng, **config["optimizer"]).optimize(result)
+    return result, optimization
+
+def solve_portfolio(model: SolverModel, size: int = 4, mode: str = "best", deadline: float = 5.0,
+                    max_workers: Optional[int] = None, seed: int = 0,
+                    progress: Optional[Callable[[Dict[str, Any]], None]] = None) -> Tuple[SolverResult, Dict[str, Any]]:
+    """Run several solver configurations in parallel processes and pick one result
+
+    mode "first" takes the first feasible result and anneals it for what is
+    left of the deadline. mode "best" waits for every run up to the deadline
+    and returns the feasible result with the lowest score. If no run is
+    feasible by the deadline, the runs get as long again, after which the
+    first infeasible result is returned, or ValueError raised if none
+    finished. Runs still going once a result is picked are terminated.
+    If given, progress receives the summed node and conflict counts of the
+    runs while they search.
+    Returns the result and its optimizer stats with a "portfolio" summary.
+    """
+    if mode not in ("first", "best"):
+        raise ValueError("Portfolio mode must be 'first' or 'best'")
+    if not model.period_masks and model.layouts:
+        model.finalize()
+
+    configs = portfolio_configs(size, seed)
+    max_workers = min(max_workers or os.cpu_count() or 1, len(configs))
+    # Runs queued behind others share the deadline, and every run stops annealing
+    # a little early to leave time for the hand-back
+    waves = -(-len(configs) // max_workers)
+    time_limit = deadline * 0.8 / waves if mode == "best" else 0.0
+    started = time.perf_counter()
+    finished: List[Tuple[int, SolverResult, Dict[str, Any]]] = []
+
+    outcomes = queue.SimpleQueue()
+    progress_queue = multiprocessing.Queue() if progress else None
+    counters: Dict[int, Tuple[int, int]] = {}
+    pool = multiprocessing.Pool(processes=max_workers, initializer=_init_worker, initargs=(progress_queue,))
+    try:
+        for index, config in enumerate(configs):
+            pool.apply_async(_run_config, (model, config, time_limit, index),
+                             callback=lambda outcome, index=index: outcomes.put((index, outcome, None)),
+                             error_callback=lambda error, index=index: outcomes.put((index, None, error)))
+        while len(finished) < len(configs):
+            elapsed = time.perf_counter() - started
+            if elapsed >= deadline and any(result.solved for _, result, _ in finished):
+                break
+            # Without a feasible run by the deadline, wait as long again at most
+            if elapsed >= 2 * deadline:
+                break
+            timeout = (deadline if elapsed < deadline else 2 * deadline) - elapsed
+            if progress:
+                _report_progress(progress, progress_queue, counters, len(configs), len(finished))
+                timeout = min(timeout, PROGRESS_INTERVAL)
+            try:
+                index, outcome, error = outcomes.get(timeout=timeout)
+            except queue.Empty:
+                continue
+            if error is not None:
+                raise error
+            finished.append((index, *outcome))
+            if mode == "first" and outcome[0].solved:
+                break
+    finally:
+        # Losing runs would otherwise keep a CPU busy until they finish on their own
+        pool.terminate()
+        pool.join()
+        if progress_queue is not None:
+            progress_queue.close()
+
+    if not finished:
+        raise ValueError(f"No solver run finished within {2 * deadline:g} seconds")
+    solved = [entry for entry in finished if entry[1].solved]
+    if solved:
+        index, result, optimization = min(solved, key=lambda entry: entry[2].get("score", 0.0))
+        if mode == "first":
+            config = configs[index]
+            time_budget = max(deadline * 0.8 - (time.perf_counter() - started), 0.0)
+            optimization = AnnealingOptimizer(time_budget=time_budget, rng=random.Random(config["seed"]),
+                                              **config["optimizer"]).optimize(result)
+    else:
+        index, result, optimization = finished[0]
+
+    optimization = dict(optimization)
+    optimization["portfolio"] = {
+        "mode": mode,
+        "runs": len(configs),
+        "finished": len(finished),
+        "feasible": len(solved),
+        "chosen": index,
+        "elapsed": time.perf_counter() - started,
+    }
+    return result, optimization
+
+def _report_progress(progress: Callable[[Dict[str, Any]], None], progress_queue, counters: Dict[int, Tuple[int, int]],
+                     runs: int, finished: int):
+    """Pass on the latest counters of every run, summed, if any of them moved"""
+    changed = False
+    while True:
+        try:
+            run, nodes, conflicts = progress_queue.get_nowait()
+        except queue.Empty:
+            break
+        counters[run] = (nodes, conflicts)
+        changed = True
+    if changed:
+        progress({"type": "progress", "runs": runs, "finished_runs": finished,
+                  "nodes": sum(nodes for nodes, _ in counters.values()),
+                  "conflicts": sum(conflicts for _, conflicts in counters.values())})
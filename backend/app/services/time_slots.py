@@ -0,0 +1,131 @@
+import threading
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+# Used when a timings dict cannot be read
+FALLBACK_SLOTS = [
+    (1, '9:00', '9:40', 'period'),
+    (2, '9:40', '10:20', 'period'),
+    ('Break 1', '10:20', '10:35', 'break'),
+    (3, '10:35', '11:15', 'period'),
+    (4, '11:15', '11:55', 'period'),
+    ('Lunch', '11:55', '12:25', 'break'),
+    (5, '12:25', '13:05', 'period'),
+    (6, '13:05', '13:45', 'period'),
+]
+
+PERIODS_PER_DAY = 8
+
+def parse_clock(text: str) -> Optional[int]:
+    """Parse '9:00' into minutes since midnight"""
+    try:
+        hours, minutes = text.strip().split(':')
+        hours, minutes = int(hours), int(minutes)
+    except (AttributeError, ValueError):
+        return None
+    if not (0 <= hours < 24 and 0 <= minutes < 60):
+        return None
+    return hours * 60 + minutes
+
+def parse_time_range(text: str) -> Optional[Tuple[int, int]]:
+    """Parse '9:00-9:40' into minutes since midnight"""
+    try:
+        start, end = [parse_clock(part) for part in text.split('-')]
+    except (AttributeError, ValueError):
+        return None
+    if start is None or end is None:
+        return None
+    return start, end
+
+def format_clock(minutes: int) -> str:
+    return f"{minutes // 60 % 24:02d}:{minutes % 60:02d}"
+
+class SlotLabels:
+    """Interned table of slot labels such as '09:00-09:40'
+
+    Each distinct label gets a small int id. The label and its window in
+    minutes since midnight are stored once and looked up by id.
+    """
+
+    def __init__(self):
+        self.ids: Dict[str, int] = {}
+        self.labels: List[str] = []
+        self.windows: List[Optional[Tuple[int, int]]] = []
+        self._lock = threading.Lock()
+
+    def intern(self, label: str) -> int:
+        slot_id = self.ids.get(label)
+        if slot_id is None:
+            with self._lock:
+                slot_id = self.ids.get(label)
+                if slot_id is None:
+                    slot_id = len(self.labels)
+                    self.labels.append(label)
+                    self.windows.append(parse_time_range(label))
+                    self.ids[label] = slot_id
+        return slot_id
+
+    def label(self, slot_id: int) -> str:
+        return self.labels[slot_id]
+
+    def window(self, slot_id: int) -> Optional[Tuple[int, int]]:
+        return self.windows[slot_id]
+
+slot_labels = SlotLabels()
+
+class SlotTemplate:
+    """The slots of one school day, shared by every class with the same timings
+
+    slots holds (slot_id, type, name) per slot, where name is the period
+    number or the break name.
+    """
+
+    def __init__(self, slots: List[Tuple[int, str, Any]]):
+        self.slots = tuple(slots)
+        self.period_ids = tuple(slot_id for slot_id, slot_type, _ in self.slots if slot_type == 'period')
+        self.periods = tuple(slot_labels.window(slot_id) for slot_id in self.period_ids)
+
+def slot_template(timings: Dict[str, Any]) -> SlotTemplate:
+    """Get the slot template for a timings dict, building it once per distinct timings"""
+    return _build_template(_normalize(timings))
+
+def _normalize(timings: Dict[str, Any]) -> Optional[Tuple[int, ...]]:
+    """Timings as a tuple of ints with defaults filled in, or None if they cannot be read"""
+    try:
+        start = parse_clock(timings.get('start_time', '9:00'))
+        if start is None:
+            return None
+        return (start,
+                int(timings.get('period_duration', '40')),
+                int(timings.get('break1_after', '2')), int(timings.get('break1_duration', '15')),
+                int(timings.get('lunch_after', '4')), int(timings.get('lunch_duration', '30')),
+                int(timings.get('break2_after', '6')), int(timings.get('break2_duration', '15')))
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+@lru_cache(maxsize=None)
+def _build_template(key: Optional[Tuple[int, ...]]) -> SlotTemplate:
+    if key is None:
+        return SlotTemplate([(slot_labels.intern(f"{start}-{end}"), slot_type, name)
+                             for name, start, end, slot_type in FALLBACK_SLOTS])
+
+    (current, period_duration, break1_after, break1_duration,
+     lunch_after, lunch_duration, break2_after, break2_duration) = key
+    slots = []
+    for period in range(1, PERIODS_PER_DAY + 1):
+        end = current + period_duration
+        slots.append((slot_labels.intern(f"{format_clock(current)}-{format_clock(end)}"), 'period', period))
+        current = end
+
+        # Add breaks
+        if period == break1_after:
+            name, duration = "Break 1", break1_duration
+        elif period == lunch_after:
+            name, duration = "Lunch", lunch_duration
+        elif period == break2_after:
+            name, duration = "Break 2", break2_duration
+        else:
+            continue
+        slots.append((slot_labels.intern(f"{format_clock(current)}-{format_clock(current + duration)}"), 'break', name))
+        current += duration
+    return SlotTemplate(slots)
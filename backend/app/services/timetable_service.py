@@ -1,9 +1,20 @@
+import hashlib
+import json
 import random
-from datetime import datetime, timedelta
-from typing import Dict, List, Any, Optional
+import numpy as np
+from typing import Any, Callable, Dict, List, Optional
+from sqlalchemy import func, insert
 from sqlalchemy.orm import Session
-from app.models import School, Class, Subject, Teacher, Timetable, ECA, Lab
+from app.models import School, Class, Subject, Teacher, TeacherSubject, TeacherClass, Timetable, ECA, Lab, GenerationCache
 from app.schemas import TeacherWorkload, SubstituteTeacherResponse
+from app.config import settings
+from app.services.time_slots import slot_labels, slot_template
+from app.services.compact import CompactTimetable, SLOT_TYPES, EMPTY
+from app.services.analytics import WorkloadReport, workload_statuses
+from app.services.solver import SolverModel, SolverResult, AnnealingOptimizer, FREE_PERIOD, NO_TEACHER, solve_partitioned, solve_portfolio
+
+# Bump when a solver change should stop serving timetables cached by older code
+GENERATION_CACHE_VERSION = 1
 
 class TimetableService:
     def __init__(self):
@@ -66,8 +77,20 @@ class TimetableService:
             }
         }
 
-    def generate_timetables(self, db: Session, school_id: int, class_ids: List[int] = None) -> Dict[str, Any]:
-        """Generate timetables for specified classes"""
+    def generate_timetables(self, db: Session, school_id: int, class_ids: List[int] = None,
+                            progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+                            regenerate: bool = False) -> Dict[str, Any]:
+        """Generate timetables for specified classes
+
+        Returns the timetables keyed by class name, the number of rows written,
+        the soft-constraint score of the result (lower is better) and whether
+        it was served from the cache. Runs are seeded from a hash of all their
+        inputs; a run whose inputs match an earlier one reuses its timetables.
+        regenerate skips the cache and seeds a new variant, which then replaces
+        the cached one.
+        If given, progress is called with solver progress and per-class
+        completion events as the run advances.
+        """
         # Get school data
         school = db.query(School).filter(School.id == school_id).first()
         if not school:
@@ -82,26 +105,281 @@ class TimetableService:
         if not classes:
             raise ValueError("No classes found")
         
-        # Clear existing timetables for these classes
-        for class_obj in classes:
-            db.query(Timetable).filter(Timetable.class_id == class_obj.id).delete()
+        return self._solve_classes(db, school, classes, progress, regenerate=regenerate)
+
+    def repair_timetables(self, db: Session, school_id: int, class_ids: List[int],
+                          progress: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+        """Re-solve only the given classes after a teacher or class change
+
+        Every other class keeps its stored timetable and its teachers stay booked.
+        In the repaired classes, a period keeps its subject if that subject still has
+        the same teacher, and only the remaining periods are solved again. Classes
+        without a stored timetable are skipped.
+        """
+        school = db.query(School).filter(School.id == school_id).first()
+        if not school:
+            raise ValueError("School not found")
+        
+        stored = {class_id for class_id, in db.query(Timetable.class_id).filter(
+            Timetable.class_id.in_(class_ids or [])
+        ).distinct().all()}
+        classes = db.query(Class).filter(Class.id.in_(stored), Class.school_id == school_id).all()
+        if not classes:
+            return {"timetables": {}, "rows_written": 0, "kept_periods": 0}
+        
+        return self._solve_classes(db, school, classes, progress, repair=True)
+
+    def _solve_classes(self, db: Session, school: School, classes: List[Class],
+                       progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+                       repair: bool = False, regenerate: bool = False) -> Dict[str, Any]:
+        """Solve timetables for a set of classes and replace their stored rows"""
+        # Load every teacher/subject/class link once for the whole run
+        links = self._preload_links(db, school.id)
+        class_ids = [class_obj.id for class_obj in classes]
+        bookings = self._other_bookings(db, school.id, class_ids)
+        
+        # Identical inputs are served from the cache, and otherwise seed the run
+        fingerprint = self._input_fingerprint(school, classes, links, bookings)
+        if not repair and not regenerate:
+            cached = db.query(GenerationCache).filter(GenerationCache.fingerprint == fingerprint).first()
+            if cached:
+                return self._serve_cached(db, classes, cached, progress)
+        rng = random.Random(random.SystemRandom().getrandbits(64) if regenerate else int(fingerprint[:16], 16))
         
-        generated_timetables = {}
+        # Build one model for all classes so a teacher is never booked twice
+        working_days = school.working_days or []
+        model = SolverModel(len(working_days))
+        existing = self._stored_periods(db, class_ids, links) if repair else {}
         
+        plans = {}
         for class_obj in classes:
-            timetable = self._create_class_timetable(db, class_obj, school)
-            generated_timetables[f"Class {class_obj.class_number}"] = timetable
+            plan = self._plan_class(db, class_obj, school, model, links, rng, existing.get(class_obj.id))
+            if plan:
+                plans[class_obj.id] = plan
+        
+        # Classes are reported complete as soon as the solver has placed their component
+        class_names = {class_obj.id: f"Class {class_obj.class_number}" for class_obj in classes}
+        reported = set()
+        
+        def report_class(class_id):
+            if progress and class_id not in reported:
+                reported.add(class_id)
+                progress({"type": "class_completed", "class": class_names[class_id], "class_id": class_id,
+                          "completed": len(reported), "total": len(classes)})
+        
+        def solver_progress(event):
+            if event["type"] == "component_completed":
+                for class_id in event["sections"]:
+                    report_class(class_id)
+            else:
+                progress(event)
+        
+        result = None
+        optimization = {}
+        if plans:
+            # Classes outside this run keep their stored timetables, so their teachers stay booked
+            self._book_other_classes(school, bookings, model)
+            problems = model.check_capacity()
+            if problems:
+                raise ValueError("; ".join(problems))
+            if not repair and settings.SOLVER_PORTFOLIO_SIZE > 1:
+                # Race several solver configurations and keep the chosen one, already optimized
+                result, optimization = solve_portfolio(model, size=settings.SOLVER_PORTFOLIO_SIZE,
+                                                       mode=settings.SOLVER_PORTFOLIO_MODE,
+                                                       deadline=settings.SOLVER_PORTFOLIO_DEADLINE,
+                                                       seed=rng.getrandbits(32),
+                                                       progress=progress)
+            else:
+                # Classes that share no teacher are solved in parallel
+                result = solve_partitioned(model, max_workers=settings.SOLVER_MAX_WORKERS,
+                                           progress=solver_progress if progress else None, rng=rng)
+            if not result.solved and any(model.fixed):
+                # The kept periods boxed the solver in: re-solve these classes in full
+                model.fixed = [{} for _ in model.fixed]
+                result = solve_partitioned(model, max_workers=settings.SOLVER_MAX_WORKERS,
+                                           progress=solver_progress if progress else None, rng=rng)
+            if not result.solved:
+                raise ValueError("Could not find a clash-free timetable for the selected classes")
             
-            # Save to database
-            self._save_timetable_to_db(db, class_obj.id, timetable)
+            if not optimization:
+                # Spend the remaining budget on soft goals: subject spread and even teacher days
+                time_budget = settings.REPAIR_OPTIMIZER_TIME_BUDGET if repair else settings.OPTIMIZER_TIME_BUDGET
+                optimization = AnnealingOptimizer(time_budget=time_budget, rng=rng).optimize(result)
+        
+        subject_ids = links['subject_ids']
+        class_keys = [f"Class {class_obj.class_number}" for class_obj in classes]
+        width = max((len(plan['template'].slots) for plan in plans.values()), default=0) + 2
+        compact = CompactTimetable(class_keys, working_days, width)
+        rows = []
+        
+        for row, class_obj in enumerate(classes):
+            plan = plans.get(class_obj.id)
+            if plan:
+                self._create_class_timetable(class_obj, school, plan, result, compact, row)
+            
+            teacher_ids = plan['teacher_ids'] if plan else {}
+            rows.extend(self._timetable_rows(class_obj.id, compact, row, subject_ids, teacher_ids))
+            # Classes without a plan, or solved by the portfolio, finish here
+            report_class(class_obj.id)
+        
+        # Replace existing timetables for these classes only once the new ones are ready
+        db.query(Timetable).filter(Timetable.class_id.in_(class_ids)).delete(synchronize_session=False)
+        rows_written = self._save_timetables_to_db(db, rows)
+        generated_timetables = compact.to_dict()
+        if not repair:
+            self._store_cached(db, school.id, class_ids, fingerprint, generated_timetables, rows,
+                               optimization.get("score"))
+        db.commit()
         
+        response = {
+            "timetables": generated_timetables,
+            "rows_written": rows_written,
+            "score": optimization.get("score"),
+            "cached": False
+        }
+        if repair:
+            response["kept_periods"] = sum(len(cells) for cells in model.fixed)
+        return response
+
+    def _stored_periods(self, db: Session, class_ids: List[int],
+                        links: Dict[str, Any]) -> Dict[int, Dict[tuple, tuple]]:
+        """Stored teaching periods per class as (day, slot_id) -> (subject, teacher_id)"""
+        subject_names = {subject_id: name for name, subject_id in links['subject_ids'].items()}
+        periods = {}
+        for class_id, day, time_slot, subject_id, teacher_id in db.query(
+            Timetable.class_id, Timetable.day, Timetable.time_slot, Timetable.subject_id, Timetable.teacher_id
+        ).filter(
+            Timetable.class_id.in_(class_ids),
+            Timetable.slot_type == 'period'
+        ).all():
+            subject = subject_names.get(subject_id, FREE_PERIOD)
+            periods.setdefault(class_id, {})[(day, slot_labels.intern(time_slot))] = (subject, teacher_id)
+        return periods
+
+    def _other_bookings(self, db: Session, school_id: int, class_ids: List[int]) -> List[tuple]:
+        """Stored (teacher_id, day, time_slot) bookings of classes outside this run"""
+        return [tuple(row) for row in db.query(
+            Timetable.teacher_id, Timetable.day, Timetable.time_slot
+        ).join(
+            Class, Timetable.class_id == Class.id
+        ).filter(
+            Class.school_id == school_id,
+            Timetable.class_id.notin_(class_ids),
+            Timetable.teacher_id.isnot(None)
+        ).order_by(Timetable.teacher_id, Timetable.day, Timetable.time_slot).all()]
+
+    def _book_other_classes(self, school: School, bookings: List[tuple], model: SolverModel):
+        """Mark the model's teachers busy wherever they teach a class outside this run"""
+        day_index = {day: idx for idx, day in enumerate(school.working_days or [])}
+        teachers = set(model.teachers)
+        for teacher_id, day, time_slot in bookings:
+            window = slot_labels.window(slot_labels.intern(time_slot))
+            if teacher_id in teachers and day in day_index and window:
+                model.add_busy(teacher_id, day_index[day], *window)
+
+    def _input_fingerprint(self, school: School, classes: List[Class], links: Dict[str, Any],
+                           bookings: List[tuple]) -> str:
+        """SHA-256 of everything a generation run reads, so any changed row gives a new key"""
+        inputs = {
+            'version': GENERATION_CACHE_VERSION,
+            'school': [school.board, school.regional_language, school.primary_timings,
+                       school.secondary_timings, school.senior_secondary_timings, school.working_days,
+                       school.extra_class_enabled, school.extra_class_timing],
+            'classes': sorted([c.id, c.class_number, c.stream, c.sections] for c in classes),
+            'subjects': sorted(links['subject_ids'].items()),
+            'class_teachers': sorted([class_id, [[t.id, t.name] for t in teachers]]
+                                     for class_id, teachers in links['class_teachers'].items()),
+            'subject_teachers': sorted([subject, sorted(ids)] for subject, ids in links['subject_teachers'].items()),
+            'ecas': sorted([e.class_id, e.day, e.time] for e in links['ecas'].values()),
+            'labs': sorted([l.class_id, l.days, l.time] for l in links['labs'].values()),
+            'bookings': bookings,
+            'settings': [settings.OPTIMIZER_TIME_BUDGET, settings.SOLVER_PORTFOLIO_SIZE,
+                         settings.SOLVER_PORTFOLIO_MODE, settings.SOLVER_PORTFOLIO_DEADLINE]
+        }
+        encoded = json.dumps(inputs, sort_keys=True, default=str)
+        return hashlib.sha256(encoded.encode()).hexdigest()
+
+    def _serve_cached(self, db: Session, classes: List[Class], cached: GenerationCache,
+                      progress: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+        """Write a cached result back as the stored timetables of its classes"""
+        class_ids = [class_obj.id for class_obj in classes]
+        db.query(Timetable).filter(Timetable.class_id.in_(class_ids)).delete(synchronize_session=False)
+        rows_written = self._save_timetables_to_db(db, cached.rows or [])
         db.commit()
-        return generated_timetables
+        
+        if progress:
+            for completed, class_obj in enumerate(classes, 1):
+                progress({"type": "class_completed", "class": f"Class {class_obj.class_number}",
+                          "class_id": class_obj.id, "completed": completed, "total": len(classes)})
+        
+        return {
+            "timetables": cached.timetables,
+            "rows_written": rows_written,
+            "score": cached.score,
+            "cached": True
+        }
+
+    def _store_cached(self, db: Session, school_id: int, class_ids: List[int], fingerprint: str,
+                      timetables: Dict[str, Any], rows: List[Dict[str, Any]], score: Optional[float]):
+        """Cache a generation result, replacing older results for the same classes"""
+        scope = ",".join(str(class_id) for class_id in sorted(class_ids))
+        db.query(GenerationCache).filter(
+            GenerationCache.school_id == school_id,
+            (GenerationCache.scope == scope) | (GenerationCache.fingerprint == fingerprint)
+        ).delete(synchronize_session=False)
+        db.add(GenerationCache(fingerprint=fingerprint, school_id=school_id, scope=scope,
+                               timetables=timetables, rows=rows, score=score))
 
-    def _create_class_timetable(self, db: Session, class_obj: Class, school: School) -> Dict[str, List[Dict]]:
-        """Create timetable for a specific class"""
+    def _preload_links(self, db: Session, school_id: int) -> Dict[str, Any]:
+        """Fetch teacher, subject, class, ECA and lab links for a school and index them by id"""
+        subject_ids = {}
+        subject_names = {}
+        for subject in db.query(Subject).all():
+            subject_ids[subject.name] = subject.id
+            subject_names[subject.id] = subject.name
+        
+        # class -> teachers assigned to it, in a stable order
+        class_teachers = {}
+        teacher_rows = db.query(TeacherClass.class_id, Teacher).join(
+            Teacher, TeacherClass.teacher_id == Teacher.id
+        ).join(
+            Class, TeacherClass.class_id == Class.id
+        ).filter(Class.school_id == school_id).order_by(Teacher.id).all()
+        for class_id, teacher in teacher_rows:
+            class_teachers.setdefault(class_id, []).append(teacher)
+        
+        # subject name -> ids of teachers who can teach it
+        subject_teachers = {}
+        teacher_ids = {teacher.id for _, teacher in teacher_rows}
+        if teacher_ids:
+            for teacher_id, subject_id in db.query(TeacherSubject.teacher_id, TeacherSubject.subject_id).filter(
+                TeacherSubject.teacher_id.in_(teacher_ids)
+            ).all():
+                if subject_id in subject_names:
+                    subject_teachers.setdefault(subject_names[subject_id], set()).add(teacher_id)
+        
+        class_ids = db.query(Class.id).filter(Class.school_id == school_id)
+        ecas = {}
+        for eca in db.query(ECA).filter(ECA.class_id.in_(class_ids)).order_by(ECA.id).all():
+            ecas.setdefault(eca.class_id, eca)
+        labs = {}
+        for lab in db.query(Lab).filter(Lab.class_id.in_(class_ids)).order_by(Lab.id).all():
+            labs.setdefault(lab.class_id, lab)
+        
+        return {
+            'subject_ids': subject_ids,
+            'class_teachers': class_teachers,
+            'subject_teachers': subject_teachers,
+            'ecas': ecas,
+            'labs': labs
+        }
+
+    def _plan_class(self, db: Session, class_obj: Class, school: School, model: SolverModel,
+                    links: Dict[str, Any], rng: random.Random,
+                    existing: Dict[tuple, tuple] = None) -> Optional[Dict[str, Any]]:
+        """Register a class with the solver model"""
         class_num = class_obj.class_number
-        working_days = school.working_days
+        working_days = school.working_days or []
         
         # Determine timings based on class level
         if class_num <= 5:
@@ -115,99 +393,109 @@ class TimetableService:
         subjects = self._get_class_subjects(db, class_obj, school)
         
         # Get teachers for this class
-        class_teachers = self._get_class_teachers(db, class_obj.id, subjects)
+        class_teachers = self._get_class_teachers(links, class_obj.id, subjects)
         
         if not class_teachers:
-            return {}
+            return None
         
-        # Create time slots
-        time_slots = self._create_time_slots(timings)
+        # Classes with the same timings share one slot template
+        template = slot_template(timings)
         
-        # Generate timetable for each day
-        timetable = {}
-        pe_periods_assigned = 0
+        # ECA and lab windows that overlap a period take that period over
+        activities = {}
+        eca = links['ecas'].get(class_obj.id)
+        if eca and eca.day in working_days:
+            activities.setdefault(eca.day, []).append({'time': eca.time, 'subject': 'ECA', 'type': 'eca'})
         
-        for day_idx, day in enumerate(working_days):
-            timetable[day] = []
-            
-            # Create varied subject list for this day
-            daily_subjects = [s for s in subjects if s != 'Physical Education']
-            random.shuffle(daily_subjects)
-            
-            # Add PE with limitation (max 2 periods per week)
-            if 'Physical Education' in subjects and pe_periods_assigned < 2:
-                if day in ['Tuesday', 'Thursday'] or (pe_periods_assigned == 0 and day_idx >= len(working_days) - 2):
-                    if len(time_slots) > 2:
-                        pe_position = random.randint(1, min(len(time_slots) - 2, 4))
-                        daily_subjects.insert(pe_position, 'Physical Education')
-                        pe_periods_assigned += 1
-            
-            # Extend subject list to cover all periods
-            while len(daily_subjects) < len(time_slots):
-                daily_subjects.extend([s for s in subjects if s != 'Physical Education'])
-            
-            subject_index = 0
-            
-            for slot in time_slots:
-                if slot['type'] == 'break':
-                    timetable[day].append({
-                        'time': f"{slot['start']}-{slot['end']}",
-                        'subject': slot['period'],
-                        'type': 'break'
-                    })
-                else:
-                    if subject_index < len(daily_subjects):
-                        subject = daily_subjects[subject_index]
-                        teacher = class_teachers.get(subject, 'TBD')
-                        timetable[day].append({
-                            'time': f"{slot['start']}-{slot['end']}",
-                            'subject': subject,
-                            'teacher': teacher,
-                            'type': 'period'
-                        })
-                        subject_index += 1
-                    else:
-                        timetable[day].append({
-                            'time': f"{slot['start']}-{slot['end']}",
-                            'subject': 'Free Period',
-                            'type': 'period'
-                        })
-        
-        # Add ECA if present
-        eca = db.query(ECA).filter(ECA.class_id == class_obj.id).first()
-        if eca:
-            if eca.day in timetable:
-                timetable[eca.day].append({
-                    'time': eca.time,
-                    'subject': 'ECA',
-                    'type': 'eca'
-                })
-        
-        # Add Lab Activities for higher secondary classes
-        lab = db.query(Lab).filter(Lab.class_id == class_obj.id).first()
+        lab = links['labs'].get(class_obj.id)
         if lab:
             stream = class_obj.stream or 'Science'
             lab_subjects = self.stream_subjects.get(stream, {}).get('labs', ['Lab'])
-            
-            for day in lab.days:
-                if day in timetable:
-                    lab_subject = random.choice(lab_subjects)
-                    timetable[day].append({
+            for day in lab.days or []:
+                if day in working_days:
+                    activities.setdefault(day, []).append({
                         'time': lab.time,
-                        'subject': lab_subject,
+                        'subject': rng.choice(lab_subjects),
                         'type': 'lab'
                     })
         
+        blocked = {}
+        for day_idx, day in enumerate(working_days):
+            for activity in activities.get(day, []):
+                window = slot_labels.window(slot_labels.intern(activity['time']))
+                if not window:
+                    continue
+                for period_idx, (start, end) in enumerate(template.periods):
+                    if start < window[1] and window[0] < end:
+                        blocked.setdefault((day_idx, period_idx), activity)
+        
+        # Stored periods stay put while their subject keeps the same teacher
+        teacher_ids = {subject: teacher.id for subject, teacher in class_teachers.items()}
+        fixed = {}
+        for day_idx, day in enumerate(working_days):
+            for period_idx, slot_id in enumerate(template.period_ids):
+                stored = (existing or {}).get((day, slot_id))
+                if stored and (stored[0] == FREE_PERIOD or teacher_ids.get(stored[0]) == stored[1]):
+                    fixed[(day_idx, period_idx)] = stored[0]
+        
+        section = model.add_section(
+            class_obj.id,
+            list(template.periods),
+            subjects,
+            teacher_ids,
+            subject_limits={'Physical Education': 2},
+            blocked=set(blocked),
+            fixed=fixed
+        )
+        
+        return {
+            'section': section,
+            'template': template,
+            'activities': activities,
+            'blocked': blocked,
+            'teacher_names': {teacher.id: teacher.name for teacher in class_teachers.values()},
+            'teacher_ids': teacher_ids
+        }
+
+    def _create_class_timetable(self, class_obj: Class, school: School, plan: Dict[str, Any],
+                                result: SolverResult, compact: CompactTimetable, row: int):
+        """Write the timetable of a class from the solved model into row of compact"""
+        model = result.model
+        section = plan['section']
+        
+        for day_idx, day in enumerate(school.working_days or []):
+            compact.add_day(row, day)
+            period_idx = 0
+            
+            for slot_id, slot_type, name in plan['template'].slots:
+                time = slot_labels.label(slot_id)
+                if slot_type == 'break':
+                    compact.append(row, day, time, name, 'break')
+                    continue
+                
+                activity = plan['blocked'].get((day_idx, period_idx))
+                lesson = result.lesson_at(section, day_idx, period_idx)
+                period_idx += 1
+                
+                if activity:
+                    compact.append(row, day, time, activity['subject'], activity['type'])
+                elif lesson and model.subjects[lesson[0]] != FREE_PERIOD:
+                    subject, teacher = lesson
+                    teacher_name = plan['teacher_names'][model.teachers[teacher]] if teacher != NO_TEACHER else 'TBD'
+                    compact.append(row, day, time, model.subjects[subject], 'period', teacher_name)
+                else:
+                    compact.append(row, day, time, FREE_PERIOD, 'period')
+            
+            # Activities outside the teaching day keep their own slot
+            placed = {id(activity) for activity in plan['blocked'].values()}
+            for activity in plan['activities'].get(day, []):
+                if id(activity) not in placed:
+                    compact.append(row, day, activity['time'], activity['subject'], activity['type'])
+        
         # Add extra class for senior secondary
-        if class_num >= 11 and school.extra_class_enabled and school.extra_class_timing:
-            for day in working_days:
-                timetable[day].append({
-                    'time': school.extra_class_timing,
-                    'subject': 'Extra Class',
-                    'type': 'extra_class'
-                })
-        
-        return timetable
+        if class_obj.class_number >= 11 and school.extra_class_enabled and school.extra_class_timing:
+            for day in school.working_days or []:
+                compact.append(row, day, school.extra_class_timing, 'Extra Class', 'extra_class')
 
     def _get_class_subjects(self, db: Session, class_obj: Class, school: School) -> List[str]:
         """Get subjects for a specific class"""
@@ -228,149 +516,104 @@ class TimetableService:
                 return subjects
             return []
 
-    def _get_class_teachers(self, db: Session, class_id: int, subjects: List[str]) -> Dict[str, str]:
+    def _get_class_teachers(self, links: Dict[str, Any], class_id: int, subjects: List[str]) -> Dict[str, Teacher]:
         """Get teachers for a specific class and subjects"""
         teachers = {}
+        assigned = links['class_teachers'].get(class_id, [])
         for subject in subjects:
             # Find teacher who can teach this subject and this class
-            teacher = db.query(Teacher).join(TeacherSubject).join(Subject).join(TeacherClass).filter(
-                Subject.name == subject,
-                TeacherClass.class_id == class_id
-            ).first()
+            qualified = links['subject_teachers'].get(subject, set())
+            teacher = next((t for t in assigned if t.id in qualified), None)
             
             if teacher:
-                teachers[subject] = teacher.name
+                teachers[subject] = teacher
         
         return teachers
 
-    def _create_time_slots(self, timings: Dict[str, Any]) -> List[Dict]:
-        """Create time slots based on school timings"""
-        try:
-            start_time = datetime.strptime(timings.get('start_time', '9:00'), '%H:%M')
-            period_duration = int(timings.get('period_duration', '40'))
-            
-            periods_per_day = 8  # Default
-            time_slots = []
-            current_time = start_time
-            
-            for period in range(1, periods_per_day + 1):
-                end_time = current_time + timedelta(minutes=period_duration)
-                time_slots.append({
-                    'period': period,
-                    'start': current_time.strftime('%H:%M'),
-                    'end': end_time.strftime('%H:%M'),
-                    'type': 'period'
-                })
-                current_time = end_time
-                
-                # Add breaks
-                if period == int(timings.get('break1_after', '2')):
-                    break_duration = int(timings.get('break1_duration', '15'))
-                    current_time += timedelta(minutes=break_duration)
-                    time_slots.append({
-                        'period': f"Break 1",
-                        'start': (current_time - timedelta(minutes=break_duration)).strftime('%H:%M'),
-                        'end': current_time.strftime('%H:%M'),
-                        'type': 'break'
-                    })
-                elif period == int(timings.get('lunch_after', '4')):
-                    lunch_duration = int(timings.get('lunch_duration', '30'))
-                    current_time += timedelta(minutes=lunch_duration)
-                    time_slots.append({
-                        'period': f"Lunch",
-                        'start': (current_time - timedelta(minutes=lunch_duration)).strftime('%H:%M'),
-                        'end': current_time.strftime('%H:%M'),
-                        'type': 'break'
-                    })
-                elif period == int(timings.get('break2_after', '6')):
-                    break_duration = int(timings.get('break2_duration', '15'))
-                    current_time += timedelta(minutes=break_duration)
-                    time_slots.append({
-                        'period': f"Break 2",
-                        'start': (current_time - timedelta(minutes=break_duration)).strftime('%H:%M'),
-                        'end': current_time.strftime('%H:%M'),
-                        'type': 'break'
-                    })
-        except:
-            # Fallback to simple time slots
-            time_slots = [
-                {'period': 1, 'start': '9:00', 'end': '9:40', 'type': 'period'},
-                {'period': 2, 'start': '9:40', 'end': '10:20', 'type': 'period'},
-                {'period': 'Break 1', 'start': '10:20', 'end': '10:35', 'type': 'break'},
-                {'period': 3, 'start': '10:35', 'end': '11:15', 'type': 'period'},
-                {'period': 4, 'start': '11:15', 'end': '11:55', 'type': 'period'},
-                {'period': 'Lunch', 'start': '11:55', 'end': '12:25', 'type': 'break'},
-                {'period': 5, 'start': '12:25', 'end': '13:05', 'type': 'period'},
-                {'period': 6, 'start': '13:05', 'end': '13:45', 'type': 'period'},
-            ]
-        
-        return time_slots
+    def _timetable_rows(self, class_id: int, compact: CompactTimetable, row: int,
+                        subject_ids: Dict[str, int], teacher_ids: Dict[str, int]) -> List[Dict[str, Any]]:
+        """Flatten the teaching periods of one compact timetable row into timetable table rows"""
+        rows = []
+        periods = (compact.kind[row] == SLOT_TYPES.index('period')) & (compact.time[row] != EMPTY)
+        for day_idx, position in zip(*np.nonzero(periods)):
+            subject = compact.names[compact.subject[row, day_idx, position]]
+            rows.append({
+                'class_id': class_id,
+                'day': compact.days[day_idx],
+                'time_slot': compact.labels[compact.time[row, day_idx, position]],
+                'subject_id': subject_ids.get(subject),
+                'teacher_id': teacher_ids.get(subject),
+                'slot_type': 'period'
+            })
+        return rows
 
-    def _save_timetable_to_db(self, db: Session, class_id: int, timetable: Dict[str, List[Dict]]):
-        """Save timetable to database"""
-        for day, slots in timetable.items():
-            for slot in slots:
-                if slot['type'] == 'period':
-                    db_timetable = Timetable(
-                        class_id=class_id,
-                        day=day,
-                        time_slot=slot['time'],
-                        subject_id=None,  # Will be updated when subjects are properly linked
-                        teacher_id=None,  # Will be updated when teachers are properly linked
-                        slot_type='period'
-                    )
-                    db.add(db_timetable)
+    def _save_timetables_to_db(self, db: Session, rows: List[Dict[str, Any]]) -> int:
+        """Save timetable rows with a single bulk insert and return the number written"""
+        if rows:
+            db.execute(insert(Timetable), rows)
+        return len(rows)
 
     def calculate_teacher_workload(self, db: Session, teacher_id: int) -> TeacherWorkload:
         """Calculate workload analysis for a teacher"""
-        teacher = db.query(Teacher).filter(Teacher.id == teacher_id).first()
-        if not teacher:
+        workload = self.calculate_workloads(db, [teacher_id]).get(teacher_id)
+        if not workload:
             raise ValueError("Teacher not found")
+        return workload
+
+    def calculate_workloads(self, db: Session, teacher_ids: List[int]) -> Dict[int, TeacherWorkload]:
+        """Calculate workload analysis for many teachers from one pass over their classes' timetables"""
+        if not teacher_ids:
+            return {}
+        
+        teacher_names = dict(db.query(Teacher.id, Teacher.name).filter(Teacher.id.in_(teacher_ids)).all())
+        found = [teacher_id for teacher_id in teacher_ids if teacher_id in teacher_names]
+        
+        # Every period of the classes these teachers teach, so free slots are counted against the school day
+        class_ids = db.query(Timetable.class_id).filter(Timetable.teacher_id.in_(found)).distinct()
+        rows = db.query(Timetable.class_id, Timetable.day, Timetable.time_slot, Timetable.subject_id,
+                        Timetable.teacher_id).filter(Timetable.class_id.in_(class_ids))\
+                 .order_by(Timetable.class_id, Timetable.id).all()
+        
+        timetables = {}
+        for class_id, day, time_slot, subject_id, teacher_id in rows:
+            # Teachers are keyed by id, since two teachers may share a name
+            timetables.setdefault(str(class_id), {}).setdefault(day, []).append({
+                'time': time_slot,
+                'subject': str(subject_id) if subject_id is not None else FREE_PERIOD,
+                'teacher': str(teacher_id) if teacher_id is not None else None,
+                'type': 'period'
+            })
+        report = WorkloadReport(CompactTimetable.from_dicts(timetables))
         
-        # Get teacher's timetable
-        timetables = db.query(Timetable).filter(Timetable.teacher_id == teacher_id).all()
+        # Averages count only the days a teacher teaches on
+        days_taught = (report.loads > 0).sum(axis=1)
+        averages = report.totals / np.maximum(days_taught, 1)
+        statuses = workload_statuses(averages)
         
-        if not timetables:
-            return TeacherWorkload(
+        workloads = {}
+        for teacher_id in found:
+            row = report.teacher(str(teacher_id))
+            if row is None:
+                workloads[teacher_id] = TeacherWorkload(
+                    teacher_id=teacher_id,
+                    teacher_name=teacher_names[teacher_id],
+                    total_periods=0,
+                    avg_periods_per_day=0.0,
+                    workload_status="No Data",
+                    daily_breakdown={}
+                )
+                continue
+            workloads[teacher_id] = TeacherWorkload(
                 teacher_id=teacher_id,
-                teacher_name=teacher.name,
-                total_periods=0,
-                avg_periods_per_day=0.0,
-                workload_status="No Data",
-                daily_breakdown={}
+                teacher_name=teacher_names[teacher_id],
+                total_periods=int(report.totals[row]),
+                avg_periods_per_day=float(averages[row]),
+                workload_status=statuses[row],
+                daily_breakdown={day: periods for day, periods in report.daily_breakdown(row).items() if periods},
+                double_bookings=int(report.double_bookings[row]),
+                free_periods=report.free_breakdown(row)
             )
-        
-        # Count periods by day
-        daily_breakdown = {}
-        total_periods = 0
-        
-        for timetable in timetables:
-            day = timetable.day
-            if day not in daily_breakdown:
-                daily_breakdown[day] = 0
-            daily_breakdown[day] += 1
-            total_periods += 1
-        
-        # Calculate average
-        working_days = len(daily_breakdown)
-        avg_periods = total_periods / working_days if working_days > 0 else 0
-        
-        # Determine workload status
-        if avg_periods >= 6:
-            status = "Heavy"
-        elif avg_periods >= 4:
-            status = "Moderate"
-        else:
-            status = "Light"
-        
-        return TeacherWorkload(
-            teacher_id=teacher_id,
-            teacher_name=teacher.name,
-            total_periods=total_periods,
-            avg_periods_per_day=avg_periods,
-            workload_status=status,
-            daily_breakdown=daily_breakdown
-        )
+        return workloads
 
     def find_substitute_teachers(self, db: Session, absent_teacher_id: int, day: str) -> List[SubstituteTeacherResponse]:
         """Find substitute teachers for an absent teacher on a specific day"""
@@ -379,7 +622,11 @@ class TimetableService:
             raise ValueError("Absent teacher not found")
         
         # Get absent teacher's schedule for the day
-        absent_schedule = db.query(Timetable).filter(
+        absent_schedule = db.query(Timetable.time_slot, Subject.name, Class.class_number).outerjoin(
+            Subject, Timetable.subject_id == Subject.id
+        ).outerjoin(
+            Class, Timetable.class_id == Class.id
+        ).filter(
             Timetable.teacher_id == absent_teacher_id,
             Timetable.day == day
         ).all()
@@ -387,39 +634,44 @@ class TimetableService:
         if not absent_schedule:
             return []
         
+        # Teachers who can cover each subject
+        subject_names = {subject for _, subject, _ in absent_schedule if subject}
+        subject_teachers = {}
+        teacher_names = {}
+        if subject_names:
+            for teacher_id, teacher_name, subject in db.query(Teacher.id, Teacher.name, Subject.name).join(
+                TeacherSubject, TeacherSubject.teacher_id == Teacher.id
+            ).join(
+                Subject, TeacherSubject.subject_id == Subject.id
+            ).filter(Subject.name.in_(subject_names)).all():
+                subject_teachers.setdefault(subject, set()).add(teacher_id)
+                teacher_names[teacher_id] = teacher_name
+        
+        # Busy teachers per slot on this day, and per-day period counts for every candidate
+        busy = {}
+        for time_slot, teacher_id in db.query(Timetable.time_slot, Timetable.teacher_id).filter(
+            Timetable.day == day,
+            Timetable.teacher_id.isnot(None)
+        ).all():
+            busy.setdefault(time_slot, set()).add(teacher_id)
+        
+        workloads = self.calculate_workloads(db, list(teacher_names))
+        
         substitute_responses = []
         
-        for period in absent_schedule:
-            # Find available substitute teachers for this period
-            available_substitutes = []
-            
-            # Get all teachers who can teach the same subjects
-            potential_substitutes = db.query(Teacher).join(TeacherSubject).join(Subject).filter(
-                Subject.name == period.subject.name if period.subject else "Unknown"
-            ).all()
-            
-            for substitute in potential_substitutes:
-                if substitute.id == absent_teacher_id:
-                    continue
-                
-                # Check if substitute is free at this time
-                is_free = not db.query(Timetable).filter(
-                    Timetable.teacher_id == substitute.id,
-                    Timetable.day == day,
-                    Timetable.time_slot == period.time_slot
-                ).first()
-                
-                if is_free:
-                    workload = self.calculate_teacher_workload(db, substitute.id)
-                    available_substitutes.append(workload)
+        for time_slot, subject, class_number in absent_schedule:
+            # Available teachers are the qualified ones not busy in this slot
+            candidates = subject_teachers.get(subject, set()) - busy.get(time_slot, set())
+            candidates.discard(absent_teacher_id)
             
             # Sort by workload (lighter workload first)
-            available_substitutes.sort(key=lambda x: x.avg_periods_per_day)
+            available_substitutes = sorted((workloads[teacher_id] for teacher_id in candidates),
+                                           key=lambda x: (x.avg_periods_per_day, x.teacher_id))
             
             substitute_responses.append(SubstituteTeacherResponse(
-                period_time=period.time_slot,
-                subject=period.subject.name if period.subject else "Unknown",
-                class_name=f"Class {period.class_obj.class_number}",
+                period_time=time_slot,
+                subject=subject or "Unknown",
+                class_name=f"Class {class_number}",
                 available_substitutes=available_substitutes[:5]  # Top 5 substitutes
             ))
         
@@ -0,0 +1,63 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# Point the app at a throwaway database before anything imports app.database
+_db_dir = tempfile.mkdtemp(prefix="timetable-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_db_dir, 'test.db')}"
+os.environ["OPTIMIZER_TIME_BUDGET"] = "0.1"
+os.environ["REPAIR_OPTIMIZER_TIME_BUDGET"] = "0.05"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import Base, engine, SessionLocal
+from app.models import School, Class, Subject, Teacher, TeacherSubject, TeacherClass
+
+TIMINGS = {"start_time": "8:00", "period_duration": "40", "break1_after": "2",
+           "lunch_after": "4", "break2_after": "6"}
+SUBJECTS = ["English", "Hindi", "Mathematics", "Science", "Social Science", "Art",
+            "Physical Education", "Tamil"]
+
+@pytest.fixture
+def db():
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+@pytest.fixture
+def make_school(db):
+    """Build a CBSE school of class 6-8 sections, each subject shared round robin by its teachers"""
+    def make(num_classes: int, teachers_per_subject: int):
+        school = School(name="Test School", board="CBSE", regional_language="Tamil",
+                        primary_timings=TIMINGS, secondary_timings=TIMINGS, senior_secondary_timings=TIMINGS,
+                        working_days=["Monday", "Tuesday", "Wednesday", "Thursday", "Friday"])
+        db.add(school)
+        db.flush()
+        
+        classes = [Class(school_id=school.id, class_number=6 + i % 3, sections=[chr(ord("A") + i // 3)])
+                   for i in range(num_classes)]
+        db.add_all(classes)
+        db.flush()
+        
+        for name in SUBJECTS:
+            subject = Subject(name=name)
+            db.add(subject)
+            db.flush()
+            teachers = [Teacher(school_id=school.id, name=f"{name} {k}", employee_id=f"{name}-{k}",
+                                email=f"{name.replace(' ', '')}{k}@example.com")
+                        for k in range(teachers_per_subject)]
+            db.add_all(teachers)
+            db.flush()
+            for teacher in teachers:
+                db.add(TeacherSubject(teacher_id=teacher.id, subject_id=subject.id))
+            for idx, class_obj in enumerate(classes):
+                db.add(TeacherClass(teacher_id=teachers[idx % teachers_per_subject].id, class_id=class_obj.id))
+        
+        db.commit()
+        return school, classes
+    return make
@@ -0,0 +1,96 @@
+import pytest
+
+from app.models import Subject, Teacher, TeacherClass, TeacherSubject, Timetable
+from app.services.timetable_service import TimetableService
+
+def _clashes(db):
+    """Count stored periods that put a teacher in two classes at once"""
+    seen = set()
+    clashes = 0
+    for teacher_id, day, time_slot in db.query(Timetable.teacher_id, Timetable.day, Timetable.time_slot).filter(
+        Timetable.teacher_id.isnot(None)
+    ).all():
+        clashes += (teacher_id, day, time_slot) in seen
+        seen.add((teacher_id, day, time_slot))
+    return clashes
+
+def _stored_rows(db, class_id):
+    return sorted(
+        (row.day, row.time_slot, row.subject_id, row.teacher_id, row.slot_type)
+        for row in db.query(Timetable).filter(Timetable.class_id == class_id).all()
+    )
+
+def test_generates_clash_free_timetables(db, make_school):
+    school, classes = make_school(num_classes=6, teachers_per_subject=2)
+    
+    result = TimetableService().generate_timetables(db, school.id)
+    
+    assert result["rows_written"] > 0
+    assert _clashes(db) == 0
+    for class_obj in classes:
+        assert _stored_rows(db, class_obj.id)
+
+def test_overbooked_teacher_raises_capacity_error(db, make_school):
+    # One teacher per subject over eight classes needs more periods than a week has
+    school, _ = make_school(num_classes=8, teachers_per_subject=1)
+    
+    with pytest.raises(ValueError):
+        TimetableService().generate_timetables(db, school.id)
+    assert db.query(Timetable).count() == 0
+
+def test_repeat_run_is_served_from_cache(db, make_school):
+    school, _ = make_school(num_classes=3, teachers_per_subject=1)
+    service = TimetableService()
+    
+    first = service.generate_timetables(db, school.id)
+    repeat = service.generate_timetables(db, school.id)
+    
+    assert first["cached"] is False
+    assert repeat["cached"] is True
+    assert repeat["timetables"] == first["timetables"]
+
+def test_regenerate_skips_cache_and_replaces_it(db, make_school):
+    school, _ = make_school(num_classes=3, teachers_per_subject=1)
+    service = TimetableService()
+    
+    first = service.generate_timetables(db, school.id)
+    regenerated = service.generate_timetables(db, school.id, regenerate=True)
+    after = service.generate_timetables(db, school.id)
+    
+    assert regenerated["cached"] is False
+    assert regenerated["timetables"] != first["timetables"]
+    assert after["cached"] is True
+    assert after["timetables"] == regenerated["timetables"]
+    assert _clashes(db) == 0
+
+def test_repair_keeps_unaffected_classes(db, make_school):
+    school, classes = make_school(num_classes=4, teachers_per_subject=2)
+    service = TimetableService()
+    service.generate_timetables(db, school.id)
+    changed, untouched = classes[0], classes[1]
+    before = _stored_rows(db, untouched.id)
+    art = db.query(Subject).filter(Subject.name == "Art").one()
+    art_periods = db.query(Timetable).filter(Timetable.class_id == changed.id,
+                                             Timetable.subject_id == art.id).count()
+    
+    # Hand the changed class's Art periods to a newly hired teacher
+    new_teacher = Teacher(school_id=school.id, name="Art New", employee_id="Art-new", email="artnew@example.com")
+    db.add(new_teacher)
+    db.flush()
+    db.add(TeacherSubject(teacher_id=new_teacher.id, subject_id=art.id))
+    link = db.query(TeacherClass).join(TeacherSubject, TeacherSubject.teacher_id == TeacherClass.teacher_id).filter(
+        TeacherClass.class_id == changed.id, TeacherSubject.subject_id == art.id
+    ).one()
+    link.teacher_id = new_teacher.id
+    db.commit()
+    
+    result = service.repair_timetables(db, school.id, [changed.id])
+    
+    # Only the Art periods lost their teacher; every other period of the class stays put
+    stored = db.query(Timetable).filter(Timetable.class_id == changed.id, Timetable.slot_type == "period").count()
+    assert result["kept_periods"] == stored - art_periods
+    assert _stored_rows(db, untouched.id) == before
+    assert _clashes(db) == 0
+    art_rows = db.query(Timetable).filter(Timetable.class_id == changed.id, Timetable.subject_id == art.id).all()
+    assert len(art_rows) == art_periods
+    assert all(row.teacher_id == new_teacher.id for row in art_rows)
@@ -1,88 +1,129 @@
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
-from datetime import datetime, timedelta
-import random
-import pickle
-from PIL import Image, ImageDraw, ImageFont
-from collections import defaultdict
+import queue
+import threading
 
-class TimetableGenerator:
+# Data model and generation live in the GUI-free core
+from timetable_core import TimetableProject
+import timetable_export
+
+class TimetableGrid(tk.Frame):
+    """Timetable table (header row, time column, one column per day) that reuses its cells
+    
+    show() only reconfigures cells whose text or colour changed. Cells outside
+    the current size are hidden rather than destroyed, so once the largest
+    timetable has been shown, switching timetables creates no widgets.
+    Editable cells are Text widgets; on_edit(row, col, text) is called when
+    one loses focus with changed text (row and col count from the first slot
+    and the first day).
+    """
+    
+    def __init__(self, parent, header_font, time_font, cell_font, time_width=None, cell_width=None,
+                 wraplength=100, on_edit=None, **kwargs):
+        super().__init__(parent, bg='white', **kwargs)
+        self.header_font = header_font
+        self.time_font = time_font
+        self.cell_font = cell_font
+        self.time_width = time_width
+        self.cell_width = cell_width
+        self.wraplength = wraplength
+        self.on_edit = on_edit
+        self.cells = {}  # (row, col) -> {'label', 'text', 'state', 'visible'}
+        self.shape = (0, 0)
+        self.message = tk.Label(self, bg='white')
+    
+    def show(self, headers, rows, message=None, **message_options):
+        """Show headers over rows of [time text, (text, bg, editable) per day], or just a message"""
+        self.message.grid_remove()
+        specs = [[(header, 'lightgray', self.header_font, False) for header in headers]]
+        specs += [[(row[0], 'white', self.time_font, False)] + [(text, bg, self.cell_font, editable)
+                                                                for text, bg, editable in row[1:]]
+                  for row in rows]
+        if message:
+            specs = []
+            self.message.config(text=message, **message_options)
+            self.message.grid(row=0, column=0)
+        
+        for row, row_specs in enumerate(specs):
+            for col, spec in enumerate(row_specs):
+                self._set(row, col, spec)
+        
+        # Hide what the previous timetable used beyond this one
+        num_rows, num_cols = len(specs), len(headers) if specs else 0
+        for (row, col), cell in self.cells.items():
+            if cell['visible'] and (row >= num_rows or col >= num_cols):
+                cell['label'].grid_remove()
+                if cell['text'] is not None:
+                    cell['text'].grid_remove()
+                cell['visible'] = False
+        
+        for i in range(max(num_cols, self.shape[1])):
+            self.columnconfigure(i, weight=1 if i < num_cols else 0)
+        for i in range(max(num_rows, self.shape[0])):
+            self.rowconfigure(i, weight=1 if i < num_rows else 0)
+        self.shape = (num_rows, num_cols)
+    
+    def _set(self, row, col, spec):
+        cell = self.cells.get((row, col))
+        if cell is None:
+            options = {'width': self.time_width if col == 0 else self.cell_width}
+            if row and col:
+                options['wraplength'] = self.wraplength
+            label = tk.Label(self, relief='solid', bd=1, **{k: v for k, v in options.items() if v is not None})
+            label.grid(row=row, column=col, sticky='nsew')
+            cell = self.cells[(row, col)] = {'label': label, 'text': None, 'state': None, 'visible': True}
+        
+        if cell['state'] == spec:
+            if not cell['visible']:
+                (cell['text'] if spec[3] else cell['label']).grid()
+                cell['visible'] = True
+            return
+        
+        text, bg, font, editable = spec
+        if editable:
+            if cell['text'] is None:
+                cell['text'] = tk.Text(self, height=3, width=15, font=font, relief='solid', bd=1)
+                cell['text'].grid(row=row, column=col, sticky='nsew')
+                cell['text'].bind('<FocusOut>', lambda event, row=row, col=col: self._edited(row, col))
+            cell['text'].delete('1.0', 'end')
+            cell['text'].insert('1.0', text)
+            cell['text'].config(bg=bg)
+            cell['label'].grid_remove()
+            cell['text'].grid()
+        else:
+            cell['label'].config(text=text, bg=bg, font=font)
+            if cell['text'] is not None:
+                cell['text'].grid_remove()
+            cell['label'].grid()
+        cell['state'] = spec
+        cell['visible'] = True
+    
+    def _edited(self, row, col):
+        cell = self.cells[(row, col)]
+        text = cell['text'].get('1.0', 'end-1c')
+        if not cell['state'][3] or text == cell['state'][0]:
+            return
+        cell['state'] = (text,) + cell['state'][1:]
+        if self.on_edit:
+            self.on_edit(row - 1, col - 1, text)
+
+class TimetableGenerator(TimetableProject):
     def __init__(self):
+        super().__init__()
         self.root = tk.Tk()
         self.root.title("School Timetable Generator")
         self.root.geometry("1200x800")
         self.root.configure(bg="#FFFFFF")  # Light green background
         
-        # Data storage
-        self.school_data = {}
-        self.classes_data = []
-        self.teachers_data = []
-        self.subjects_data = {}
-        self.timetables = {}
-        self.stream_data = {}  # Store stream information for classes 11-12
-        
-        # Board curricula with stream-based subjects for 11-12
-        self.board_subjects = {
-            "CBSE": {
-                1: ["English", "Hindi", "Mathematics", "EVS", "Art", "Physical Education", "REGIONAL_LANGUAGE"],
-                2: ["English", "Hindi", "Mathematics", "EVS", "Art", "Physical Education", "REGIONAL_LANGUAGE"],
-                3: ["English", "Hindi", "Mathematics", "EVS", "Art", "Physical Education", "REGIONAL_LANGUAGE"],
-                4: ["English", "Hindi", "Mathematics", "EVS", "Art", "Physical Education", "REGIONAL_LANGUAGE"],
-                5: ["English", "Hindi", "Mathematics", "EVS", "Art", "Physical Education", "REGIONAL_LANGUAGE"],
-                6: ["English", "Hindi", "Mathematics", "Science", "Social Science", "Art", "Physical Education", "REGIONAL_LANGUAGE"],
-                7: ["English", "Hindi", "Mathematics", "Science", "Social Science", "Art", "Physical Education", "REGIONAL_LANGUAGE"],
-                8: ["English", "Hindi", "Mathematics", "Science", "Social Science", "Art", "Physical Education", "REGIONAL_LANGUAGE"],
-                9: ["English", "Hindi", "Mathematics", "Science", "Social Science", "Physical Education", "Computer Science", "REGIONAL_LANGUAGE"],
-                10: ["English", "Hindi", "Mathematics", "Science", "Social Science", "Physical Education", "Computer Science", "REGIONAL_LANGUAGE"],
-            },
-            "ICSE": {
-                1: ["English", "Hindi", "Mathematics", "EVS", "Art", "Physical Education", "REGIONAL_LANGUAGE"],
-                2: ["English", "Hindi", "Mathematics", "EVS", "Art", "Physical Education", "REGIONAL_LANGUAGE"],
-                3: ["English", "Hindi", "Mathematics", "EVS", "Art", "Physical Education", "REGIONAL_LANGUAGE"],
-                4: ["English", "Hindi", "Mathematics", "EVS", "Art", "Physical Education", "REGIONAL_LANGUAGE"],
-                5: ["English", "Hindi", "Mathematics", "EVS", "Art", "Physical Education", "REGIONAL_LANGUAGE"],
-                6: ["English", "Hindi", "Mathematics", "Science", "History", "Geography", "Art", "Physical Education", "REGIONAL_LANGUAGE"],
-                7: ["English", "Hindi", "Mathematics", "Science", "History", "Geography", "Art", "Physical Education", "REGIONAL_LANGUAGE"],
-                8: ["English", "Hindi", "Mathematics", "Science", "History", "Geography", "Art", "Physical Education", "REGIONAL_LANGUAGE"],
-                9: ["English", "Hindi", "Mathematics", "Physics", "Chemistry", "Biology", "History", "Geography", "Computer Applications", "REGIONAL_LANGUAGE"],
-                10: ["English", "Hindi", "Mathematics", "Physics", "Chemistry", "Biology", "History", "Geography", "Computer Applications", "REGIONAL_LANGUAGE"],
-            },
-            "State Board": {
-                1: ["English", "Regional Language", "Mathematics", "EVS", "Art", "Physical Education", "REGIONAL_LANGUAGE"],
-                2: ["English", "Regional Language", "Mathematics", "EVS", "Art", "Physical Education", "REGIONAL_LANGUAGE"],
-                3: ["English", "Regional Language", "Mathematics", "EVS", "Art", "Physical Education", "REGIONAL_LANGUAGE"],
-                4: ["English", "Regional Language", "Mathematics", "EVS", "Art", "Physical Education", "REGIONAL_LANGUAGE"],
-                5: ["English", "Regional Language", "Mathematics", "EVS", "Art", "Physical Education", "REGIONAL_LANGUAGE"],
-                6: ["English", "Regional Language", "Mathematics", "Science", "Social Science", "Art", "Physical Education", "REGIONAL_LANGUAGE"],
-                7: ["English", "Regional Language", "Mathematics", "Science", "Social Science", "Art", "Physical Education", "REGIONAL_LANGUAGE"],
-                8: ["English", "Regional Language", "Mathematics", "Science", "Social Science", "Art", "Physical Education", "REGIONAL_LANGUAGE"],
-                9: ["English", "Regional Language", "Mathematics", "Science", "Social Science", "Physical Education", "REGIONAL_LANGUAGE"],
-                10: ["English", "Regional Language", "Mathematics", "Science", "Social Science", "Physical Education", "REGIONAL_LANGUAGE"],
-            }
-        }
-
-        # Stream-based subjects for classes 11-12
-        self.stream_subjects = {
-            "Science": {
-                "core": ["English", "Physics", "Chemistry", "Mathematics", "REGIONAL_LANGUAGE"],
-                "optional": ["Biology", "Computer Science", "Physical Education"],
-                "labs": ["Physics Lab", "Chemistry Lab", "Biology Lab", "Computer Lab"]
-            },
-            "Commerce": {
-                "core": ["English", "Accountancy", "Business Studies", "Economics", "REGIONAL_LANGUAGE"],
-                "optional": ["Mathematics", "Computer Science", "Physical Education", "Entrepreneurship"],
-                "labs": ["Computer Lab", "Business Lab"]
-            },
-            "Arts/Humanities": {
-                "core": ["English", "History", "Political Science", "Geography", "REGIONAL_LANGUAGE"],
-                "optional": ["Psychology", "Sociology", "Economics", "Philosophy", "Physical Education"],
-                "labs": ["Computer Lab", "Geography Lab"]
-            }
-        }
-
-        # Add ECA and lab data storage
-        self.eca_data = {}
-        self.lab_data = {}
+        # Screen state
+        self.class_grid = None  # TimetableGrid of the generate screen, rebuilt with the screen
+        self.teacher_grid = None  # TimetableGrid of the teacher timetable screen
+        self.displayed_class = None  # (class key, days) shown in class_grid
+        self.export_pool = None  # Worker processes for image export, started on first export
+        self.export_state = None  # Futures and progress widgets of the running export
+        self.generation_state = None  # Queue, cancel event and progress widgets of the running generation
+        
+        # Extra class data storage (ECA and lab data are in the project)
         self.extra_class_data = {}
         
         # Initialize field variables
@@ -331,11 +372,7 @@ class TimetableGenerator:
             return
         
         # Find teacher by employee ID
-        teacher = None
-        for t in self.teachers_data:
-            if t['employee_id'].lower() == emp_id.lower():
-                teacher = t
-                break
+        teacher = self.teacher_index.get(emp_id)
         
         if not teacher:
             messagebox.showerror("Error", f"Teacher with Employee ID '{emp_id}' not found")
@@ -353,11 +390,7 @@ class TimetableGenerator:
         emp_id = selected.split("ID: ")[1].rstrip(")")
         
         # Find teacher
-        teacher = None
-        for t in self.teachers_data:
-            if t['employee_id'] == emp_id:
-                teacher = t
-                break
+        teacher = self.teacher_index.get(emp_id)
         
         if teacher:
             self.teacher_id_entry.delete(0, tk.END)
@@ -366,11 +399,9 @@ class TimetableGenerator:
 
     def display_teacher_timetable(self, teacher):
         """Display the selected teacher's timetable and workload status"""
-        # Clear previous displays
+        # Clear previous teacher information
         for widget in self.teacher_info_frame.winfo_children():
             widget.destroy()
-        for widget in self.teacher_timetable_container.winfo_children():
-            widget.destroy()
         
         # Display teacher information
         info_header = tk.Label(self.teacher_info_frame, text="TEACHER INFORMATION", 
@@ -412,97 +443,47 @@ class TimetableGenerator:
         tk.Label(workload_info, text=f"Workload Status: {workload['status']}", 
                 font=('Arial', 11, 'bold'), bg='white', fg=status_color).pack(anchor='w')
         
-        # Create timetable display
-        timetable_label = tk.Label(self.teacher_timetable_container, text="PERSONAL TIMETABLE", 
-                                  font=('Arial', 12, 'bold'), bg='white', fg='navy')
-        timetable_label.pack(pady=10)
+        # Timetable heading and grid are built once per screen and refilled for each teacher
+        if self.teacher_grid is None or not self.teacher_grid.winfo_exists():
+            timetable_label = tk.Label(self.teacher_timetable_container, text="PERSONAL TIMETABLE", 
+                                      font=('Arial', 12, 'bold'), bg='white', fg='navy')
+            timetable_label.pack(pady=10)
+            self.teacher_grid = TimetableGrid(self.teacher_timetable_container, header_font=('Arial', 11, 'bold'),
+                                              time_font=('Arial', 10), cell_font=('Arial', 9),
+                                              time_width=12, cell_width=15, relief='solid', bd=2)
+            self.teacher_grid.pack(fill='both', expand=True, padx=10, pady=10)
         
         # Generate teacher's consolidated timetable
         teacher_schedule = self.generate_teacher_schedule(teacher)
         
         if not teacher_schedule or not any(teacher_schedule.values()):
-            tk.Label(self.teacher_timetable_container, text="No schedule found for this teacher", 
-                    font=('Arial', 14), bg='white', fg='red').pack(pady=50)
+            self.teacher_grid.show([], [], message="No schedule found for this teacher",
+                                   font=('Arial', 14), fg='red', pady=50)
             return
         
-        # Create timetable grid
-        table_frame = tk.Frame(self.teacher_timetable_container, bg='white', relief='solid', bd=2)
-        table_frame.pack(fill='both', expand=True, padx=10, pady=10)
-        
         working_days = self.school_data.get('working_days', ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday'])
         
-        # Headers
-        tk.Label(table_frame, text="Time", font=('Arial', 11, 'bold'), 
-                relief='solid', bd=1, bg='lightgray', width=12).grid(row=0, column=0, sticky='nsew')
-        
-        for col, day in enumerate(working_days, 1):
-            tk.Label(table_frame, text=day, font=('Arial', 11, 'bold'), 
-                    relief='solid', bd=1, bg='lightgray', width=15).grid(row=0, column=col, sticky='nsew')
-        
-        # Get all unique time slots
-        all_times = set()
-        for day_schedule in teacher_schedule.values():
+        # First period per day and time slot
+        slots_at = {}
+        for day, day_schedule in teacher_schedule.items():
             for slot in day_schedule:
-                all_times.add(slot['time'])
+                slots_at.setdefault((day, slot['time']), slot)
         
-        sorted_times = sorted(list(all_times))
+        sorted_times = sorted({time_slot for _, time_slot in slots_at})
         
-        # Display schedule
-        for row, time_slot in enumerate(sorted_times, 1):
-            tk.Label(table_frame, text=time_slot, font=('Arial', 10), 
-                    relief='solid', bd=1, bg='white', width=12).grid(row=row, column=0, sticky='nsew')
-            
-            for col, day in enumerate(working_days, 1):
-                cell_text = ""
-                cell_color = 'white'
-                
-                if day in teacher_schedule:
-                    for slot in teacher_schedule[day]:
-                        if slot['time'] == time_slot:
-                            cell_text = f"{slot['subject']}\n{slot['class']}"
-                            cell_color = 'lightblue'
-                            break
-                
-                if not cell_text:
-                    cell_text = "Free"
-                    cell_color = 'lightgreen'
-                
-                tk.Label(table_frame, text=cell_text, font=('Arial', 9), 
-                        relief='solid', bd=1, bg=cell_color, width=15, 
-                        wraplength=100, justify='center').grid(row=row, column=col, sticky='nsew')
-        
-        # Configure grid weights for proper resizing
-        for i in range(len(working_days) + 1):
-            table_frame.columnconfigure(i, weight=1)
-        for i in range(len(sorted_times) + 1):
-            table_frame.rowconfigure(i, weight=1)
-
-    def generate_teacher_schedule(self, teacher):
-        """Generate consolidated schedule for a specific teacher"""
-        teacher_schedule = {}
-        working_days = self.school_data.get('working_days', ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday'])
+        rows = []
+        for time_slot in sorted_times:
+            row = [time_slot]
+            for day in working_days:
+                slot = slots_at.get((day, time_slot))
+                if slot:
+                    row.append((f"{slot['subject']}\n{slot['class']}", 'lightblue', False))
+                else:
+                    row.append(("Free", 'lightgreen', False))
+            rows.append(row)
         
-        for day in working_days:
-            teacher_schedule[day] = []
-        
-        # Go through all class timetables and extract teacher's periods
-        for class_key, timetable in self.timetables.items():
-            if class_key in teacher['classes']:
-                for day, slots in timetable.items():
-                    if day in working_days:
-                        for slot in slots:
-                            if (slot.get('type') == 'period' and 
-                                slot.get('teacher') == teacher['name'] and
-                                slot.get('subject') in teacher['subjects']):
-                                
-                                teacher_schedule[day].append({
-                                    'time': slot['time'],
-                                    'subject': slot['subject'],
-                                    'class': class_key,
-                                    'type': 'teaching'
-                                })
-        
-        return teacher_schedule
+        self.teacher_grid.show(["Time"] + working_days, rows)
+
 
     # NEW FEATURE 2: Substitution Screen
     def substitution_screen(self):
@@ -646,11 +627,7 @@ class TimetableGenerator:
             return
         
         # Find absent teacher
-        absent_teacher = None
-        for t in self.teachers_data:
-            if t['employee_id'].lower() == emp_id.lower():
-                absent_teacher = t
-                break
+        absent_teacher = self.teacher_index.get(emp_id)
         
         if not absent_teacher:
             messagebox.showerror("Error", f"Teacher with Employee ID '{emp_id}' not found")
@@ -688,14 +665,11 @@ class TimetableGenerator:
             # Find available substitutes for this specific period
             available_substitutes = []
             
-            for teacher in self.teachers_data:
-                if teacher['employee_id'] == absent_teacher['employee_id']:
+            # Only teachers of the subject can substitute
+            for teacher in self.teacher_index.teaching(period_info['subject']):
+                if teacher is absent_teacher:
                     continue  # Skip the absent teacher
                 
-                # Check if teacher can teach the subject
-                if period_info['subject'] not in teacher['subjects']:
-                    continue
-                
                 # Check if teacher is free at this time
                 teacher_schedule = self.generate_teacher_schedule(teacher)
                 is_free = True
@@ -762,52 +736,6 @@ class TimetableGenerator:
                 for i in range(len(headers)):
                     table_frame.columnconfigure(i, weight=1)
 
-    def calculate_teacher_workload(self, teacher):
-        """Calculate workload analysis for a teacher"""
-        if not self.timetables:
-            return {
-                'avg_periods': 0,
-                'total_periods': 0,
-                'status': 'No Data',
-                'daily_breakdown': {}
-            }
-        
-        teacher_periods = {}
-        total_periods = 0
-        
-        # Count periods for each day
-        working_days = self.school_data.get('working_days', ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday'])
-        
-        for day in working_days:
-            teacher_periods[day] = 0
-        
-        # Go through all timetables and count teacher's periods
-        for class_key, timetable in self.timetables.items():
-            if class_key in teacher.get('classes', []):
-                for day, slots in timetable.items():
-                    if day in working_days:
-                        for slot in slots:
-                            if slot.get('type') == 'period' and slot.get('teacher') == teacher['name']:
-                                teacher_periods[day] += 1
-                                total_periods += 1
-        
-        # Calculate average
-        avg_periods = total_periods / len(working_days) if working_days else 0
-        
-        # Determine workload status
-        if avg_periods >= 6:
-            status = 'Heavy'
-        elif avg_periods >= 4:
-            status = 'Moderate'
-        else:
-            status = 'Light'
-        
-        return {
-            'avg_periods': avg_periods,
-            'total_periods': total_periods,
-            'status': status,
-            'daily_breakdown': teacher_periods
-        }
 
     # Enhanced existing methods with scroll bars
     def school_details_screen(self):
@@ -1732,11 +1660,10 @@ class TimetableGenerator:
             messagebox.showerror("Error", "Please enter teacher name and employee ID")
             return
         
-        # Check if employee ID already exists
-        for teacher in self.teachers_data:
-            if teacher['employee_id'] == emp_id:
-                messagebox.showerror("Error", "Employee ID already exists")
-                return
+        # Check if employee ID already exists (IDs are looked up case-insensitively)
+        if self.teacher_index.get(emp_id):
+            messagebox.showerror("Error", "Employee ID already exists")
+            return
         
         selected_classes = [class_name for class_name, var in self.teacher_class_vars.items() if var.get()]
         selected_subjects = [subject for subject, var in self.teacher_subject_vars.items() if var.get()]
@@ -1745,14 +1672,16 @@ class TimetableGenerator:
             messagebox.showerror("Error", "Please select at least one class and one subject")
             return
         
-        self.teachers_data.append({
+        teacher = {
             'name': name,
             'employee_id': emp_id,
             'email': email,
             'qualification': qualification,
             'classes': selected_classes,
             'subjects': selected_subjects
-        })
+        }
+        self.teachers_data.append(teacher)
+        self.teacher_index.add(teacher)
         
         # Clear form
         self.teacher_name_entry.delete(0, tk.END)
@@ -1909,6 +1838,11 @@ class TimetableGenerator:
             status_color = 'red' if workload_data['status'] == 'Heavy' else 'orange' if workload_data['status'] == 'Moderate' else 'green'
             tk.Label(workload_info_frame, text=workload_data['status'], bg='white', font=('Arial', 9), fg=status_color).grid(row=1, column=1, sticky='w', padx=10)
             
+            # Periods booked twice in the same slot, e.g. after manual edits
+            tk.Label(workload_info_frame, text="Double Bookings:", bg='white', font=('Arial', 9, 'bold')).grid(row=1, column=2, sticky='w', padx=5)
+            tk.Label(workload_info_frame, text=str(workload_data['double_bookings']), bg='white', font=('Arial', 9),
+                     fg='red' if workload_data['double_bookings'] else 'green').grid(row=1, column=3, sticky='w', padx=10)
+            
             # Daily breakdown
             if workload_data['daily_breakdown']:
                 tk.Label(workload_info_frame, text="Daily Breakdown:", bg='white', font=('Arial', 9, 'bold')).grid(row=2, column=0, sticky='w', padx=5)
@@ -1916,6 +1850,14 @@ class TimetableGenerator:
                 if len(breakdown_text) > 60:
                     breakdown_text = breakdown_text[:57] + "..."
                 tk.Label(workload_info_frame, text=breakdown_text, bg='white', font=('Arial', 8), wraplength=400).grid(row=2, column=1, columnspan=3, sticky='w', padx=10)
+            
+            # Free periods per day
+            if workload_data['free_periods']:
+                tk.Label(workload_info_frame, text="Free Periods:", bg='white', font=('Arial', 9, 'bold')).grid(row=3, column=0, sticky='w', padx=5)
+                free_text = ', '.join([f"{day}: {periods}" for day, periods in workload_data['free_periods'].items()])
+                if len(free_text) > 60:
+                    free_text = free_text[:57] + "..."
+                tk.Label(workload_info_frame, text=free_text, bg='white', font=('Arial', 8), wraplength=400).grid(row=3, column=1, columnspan=3, sticky='w', padx=10)
         
         # Back button
         btn_frame = tk.Frame(self.current_frame, bg="#FFFFFF")
@@ -1987,11 +1929,7 @@ class TimetableGenerator:
         emp_id = selected.split("ID: ")[1].rstrip(")")
         
         # Find teacher data
-        selected_teacher = None
-        for teacher in self.teachers_data:
-            if teacher['employee_id'] == emp_id:
-                selected_teacher = teacher
-                break
+        selected_teacher = self.teacher_index.get(emp_id)
         
         if not selected_teacher:
             return
@@ -2116,13 +2054,9 @@ class TimetableGenerator:
     def save_teacher_changes(self, emp_id):
         """Save changes to teacher data"""
         # Find teacher to update
-        teacher_index = -1
-        for i, teacher in enumerate(self.teachers_data):
-            if teacher['employee_id'] == emp_id:
-                teacher_index = i
-                break
+        teacher = self.teacher_index.get(emp_id)
         
-        if teacher_index == -1:
+        if not teacher:
             messagebox.showerror("Error", "Teacher not found!")
             return
         
@@ -2144,7 +2078,7 @@ class TimetableGenerator:
             return
         
         # Update teacher data
-        self.teachers_data[teacher_index].update({
+        self.teacher_index.update(teacher, {
             'name': name,
             'email': email,
             'qualification': qualification,
@@ -2162,10 +2096,10 @@ class TimetableGenerator:
         
         if result:
             # Find and remove teacher
-            for i, teacher in enumerate(self.teachers_data):
-                if teacher['employee_id'] == emp_id:
-                    del self.teachers_data[i]
-                    break
+            teacher = self.teacher_index.get(emp_id)
+            if teacher:
+                self.teacher_index.remove(teacher)
+                self.teachers_data.remove(teacher)
             
             messagebox.showinfo("Success", "Teacher deleted successfully!")
             self.teachers_details_view_screen()
@@ -2175,9 +2109,10 @@ class TimetableGenerator:
             messagebox.showerror("Error", "Please add teachers first")
             return
         
-        # Generate timetables
-        self.generate_timetables()
-        
+        # Generate timetables in the background, then show them
+        self.run_generation(self.show_generated_timetables)
+    
+    def show_generated_timetables(self):
         self.clear_frame()
         self.current_frame = tk.Frame(self.root, bg="#FFFFFF")
         self.current_frame.pack(fill='both', expand=True, padx=20, pady=20)
@@ -2256,216 +2191,88 @@ class TimetableGenerator:
             self.selected_class_var.set(class_options[0])
             self.display_timetable()
     
-    def generate_timetables(self):
-        """Generate varied timetables for all classes with limited PE periods"""
-        self.timetables = {}
-        working_days = self.school_data.get('working_days', ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday'])
-        
-        for class_data in self.classes_data:
-            class_num = class_data['class']
-            
-            # Determine if primary, secondary, or senior secondary
-            if class_num <= 5:
-                timings = self.school_data.get('primary_timings', {})
-            elif class_num <= 10:
-                timings = self.school_data.get('secondary_timings', {})
-            else:  # 11-12
-                timings = self.school_data.get('senior_secondary_timings', {})
-            
-            if not class_data['sections']:
-                class_key = f"Class {class_num}"
-                self.timetables[class_key] = self.create_class_timetable(class_key, class_num, timings, working_days)
-            else:
-                for section in class_data['sections']:
-                    class_key = f"Class {class_num}-{section}"
-                    self.timetables[class_key] = self.create_class_timetable(class_key, class_num, timings, working_days)
-    
-    def create_class_timetable(self, class_key, class_num, timings, working_days):
-        """Create varied timetable for a specific class with limited PE periods"""
-        # Get subjects for this class
-        subjects = self.subjects_data.get(class_num, [])
+    def run_generation(self, on_done, force=False):
+        """Generate timetables on a worker thread and call on_done on the Tk thread when finished
         
-        # Remove special subjects from regular rotation
-        regular_subjects = [s for s in subjects if s not in ['ECA', 'LAB']]
-        
-        # Get teachers for this class
-        class_teachers = {}
-        for teacher in self.teachers_data:
-            if class_key in teacher['classes']:
-                for subject in teacher['subjects']:
-                    if subject in regular_subjects:
-                        class_teachers[subject] = teacher['name']
-        
-        if not class_teachers:
-            return {}
+        Unless force is set, timetables generated from the current inputs are kept.
+        """
+        if self.generation_state:
+            return
+        if not force and self.timetables and self.input_fingerprint() == self.timetables_fingerprint:
+            on_done()
+            return
         
-        # Create time slots
-        try:
-            start_time = datetime.strptime(timings.get('start_time', '9:00'), '%H:%M')
-            period_duration = int(timings.get('period_duration', '40'))
-            
-            # Calculate periods and breaks
-            periods_per_day = 8  # Default
-            time_slots = []
-            current_time = start_time
-            
-            for period in range(1, periods_per_day + 1):
-                end_time = current_time + timedelta(minutes=period_duration)
-                time_slots.append({
-                    'period': period,
-                    'start': current_time.strftime('%H:%M'),
-                    'end': end_time.strftime('%H:%M'),
-                    'type': 'period'
-                })
-                current_time = end_time
-                
-                # Add breaks
-                if period == int(timings.get('break1_after', '2')):
-                    break_duration = int(timings.get('break1_duration', '15'))
-                    current_time += timedelta(minutes=break_duration)
-                    time_slots.append({
-                        'period': f"Break 1",
-                        'start': (current_time - timedelta(minutes=break_duration)).strftime('%H:%M'),
-                        'end': current_time.strftime('%H:%M'),
-                        'type': 'break'
-                    })
-                elif period == int(timings.get('lunch_after', '4')):
-                    lunch_duration = int(timings.get('lunch_duration', '30'))
-                    current_time += timedelta(minutes=lunch_duration)
-                    time_slots.append({
-                        'period': f"Lunch",
-                        'start': (current_time - timedelta(minutes=lunch_duration)).strftime('%H:%M'),
-                        'end': current_time.strftime('%H:%M'),
-                        'type': 'break'
-                    })
-                elif period == int(timings.get('break2_after', '6')):
-                    break_duration = int(timings.get('break2_duration', '15'))
-                    current_time += timedelta(minutes=break_duration)
-                    time_slots.append({
-                        'period': f"Break 2",
-                        'start': (current_time - timedelta(minutes=break_duration)).strftime('%H:%M'),
-                        'end': current_time.strftime('%H:%M'),
-                        'type': 'break'
-                    })
-        except:
-            # Fallback to simple time slots
-            time_slots = [
-                {'period': 1, 'start': '9:00', 'end': '9:40', 'type': 'period'},
-                {'period': 2, 'start': '9:40', 'end': '10:20', 'type': 'period'},
-                {'period': 'Break 1', 'start': '10:20', 'end': '10:35', 'type': 'break'},
-                {'period': 3, 'start': '10:35', 'end': '11:15', 'type': 'period'},
-                {'period': 4, 'start': '11:15', 'end': '11:55', 'type': 'period'},
-                {'period': 'Lunch', 'start': '11:55', 'end': '12:25', 'type': 'break'},
-                {'period': 5, 'start': '12:25', 'end': '13:05', 'type': 'period'},
-                {'period': 6, 'start': '13:05', 'end': '13:45', 'type': 'period'},
-            ]
-        
-        # Create subject distribution for varied daily schedules with PE limitation
-        period_slots = [slot for slot in time_slots if slot['type'] == 'period']
-        subject_list = list(class_teachers.keys())
-        
-        # Separate PE from other subjects
-        pe_subject = 'Physical Education'
-        other_subjects = [s for s in subject_list if s != pe_subject]
-        
-        # Generate different timetable for each day
-        timetable = {}
-        pe_periods_assigned = 0  # Track PE periods across the week
-        
-        for day_idx, day in enumerate(working_days):
-            timetable[day] = []
-            
-            # Create a shuffled subject list for this day to ensure variety
-            daily_subjects = other_subjects.copy()
-            random.shuffle(daily_subjects)
-            
-            # Add PE only if we haven't reached the limit of 2 periods per week
-            # Assign PE to specific days (e.g., Tuesday and Thursday)
-            if pe_subject in class_teachers and pe_periods_assigned < 2:
-                if day in ['Tuesday', 'Thursday'] or (pe_periods_assigned == 0 and day_idx >= len(working_days) - 2):
-                    # Insert PE at a random position (not first or last period)
-                    if len(period_slots) > 2:
-                        pe_position = random.randint(1, min(len(period_slots) - 2, 4))
-                        daily_subjects.insert(pe_position, pe_subject)
-                        pe_periods_assigned += 1
-            
-            # Extend the list to cover all periods
-            while len(daily_subjects) < len(period_slots):
-                daily_subjects.extend(other_subjects)
-            
-            subject_index = 0
-            
-            for slot in time_slots:
-                if slot['type'] == 'break':
-                    timetable[day].append({
-                        'time': f"{slot['start']}-{slot['end']}",
-                        'subject': slot['period'],
-                        'type': 'break'
-                    })
-                else:
-                    if subject_index < len(daily_subjects):
-                        subject = daily_subjects[subject_index]
-                        teacher = class_teachers.get(subject, 'TBD')
-                        timetable[day].append({
-                            'time': f"{slot['start']}-{slot['end']}",
-                            'subject': subject,
-                            'teacher': teacher,
-                            'type': 'period'
-                        })
-                        subject_index += 1
-                    else:
-                        timetable[day].append({
-                            'time': f"{slot['start']}-{slot['end']}",
-                            'subject': 'Free Period',
-                            'type': 'period'
-                        })
-        
-        # Handle ECA if present
-        if class_num in self.eca_data:
-            eca_info = self.eca_data[class_num]
-            eca_day = eca_info['day']
-            eca_time = eca_info['time']
-            
-            if eca_day in timetable:
-                timetable[eca_day].append({
-                    'time': eca_time,
-                    'subject': 'ECA',
-                    'type': 'eca'
-                })
-        
-        # Handle Lab Activities for higher secondary classes
-        if class_num in self.lab_data:
-            lab_info = self.lab_data[class_num]
-            lab_days = lab_info['days']
-            lab_time = lab_info['time']
-            
-            # Get stream-specific lab subjects
-            stream = self.stream_data.get(class_num, 'Science')
-            lab_subjects = self.stream_subjects.get(stream, {}).get('labs', ['Lab'])
-            
-            for day in lab_days:
-                if day in timetable:
-                    # Randomly assign a lab subject for this day
-                    lab_subject = random.choice(lab_subjects)
-                    timetable[day].append({
-                        'time': lab_time,
-                        'subject': lab_subject,
-                        'type': 'lab'
-                    })
+        messages = queue.Queue()
+        cancel = threading.Event()
+        
+        # Progress window with a Cancel button; the worker stops before its next class
+        window = tk.Toplevel(self.root)
+        window.title("Generating Timetables")
+        window.geometry("400x160")
+        window.configure(bg='white')
+        window.transient(self.root)
+        window.protocol("WM_DELETE_WINDOW", cancel.set)
+        status_label = tk.Label(window, text="Preparing...", bg='white', font=('Arial', 11))
+        status_label.pack(pady=10)
+        progress_bar = ttk.Progressbar(window, maximum=max(len(self.generation_plan()), 1), length=350, mode='determinate')
+        progress_bar.pack(pady=5)
+        cancel_btn = self.create_styled_button(window, "Cancel", cancel.set, width=15, height=1, bg_color='lightcoral')
+        cancel_btn.pack(pady=10)
+        window.grab_set()  # Screens stay put while the worker reads the project data
+        
+        def work():
+            try:
+                finished = self.generate_timetables(
+                    progress=lambda done, total, class_key: messages.put(('progress', done, total, class_key)),
+                    cancel=cancel,
+                    force=force
+                )
+                messages.put(('done',) if finished else ('cancelled',))
+            except Exception as e:
+                messages.put(('error', str(e)))
+        
+        self.generation_state = {
+            'messages': messages,
+            'cancel': cancel,
+            'window': window,
+            'label': status_label,
+            'bar': progress_bar,
+            'on_done': on_done
+        }
+        threading.Thread(target=work, daemon=True).start()
+        self.root.after(100, self.poll_generation)
+    
+    def poll_generation(self):
+        """Apply messages from the generation worker"""
+        state = self.generation_state
+        if not state:
+            return
         
-        # Handle extra class for senior secondary (classes 11-12)
-        if class_num >= 11 and self.school_data.get('extra_class_enabled', False):
-            extra_class_timing = self.school_data.get('extra_class_timing', '')
-            if extra_class_timing:
-                # Add extra class to all working days
-                for day in working_days:
-                    timetable[day].append({
-                        'time': extra_class_timing,
-                        'subject': 'Extra Class',
-                        'type': 'extra_class'
-                    })
+        while True:
+            try:
+                message = state['messages'].get_nowait()
+            except queue.Empty:
+                break
+            
+            if message[0] == 'progress':
+                _, done, total, class_key = message
+                state['bar']['value'] = done
+                text = "Cancelling..." if state['cancel'].is_set() else f"Generated {class_key} ({done} of {total})"
+                state['label'].config(text=text)
+                continue
+            
+            self.generation_state = None
+            state['window'].grab_release()
+            state['window'].destroy()
+            if message[0] == 'done':
+                state['on_done']()
+            elif message[0] == 'cancelled':
+                messagebox.showinfo("Cancelled", "Timetable generation was cancelled. The previous timetables are unchanged.")
+            else:
+                messagebox.showerror("Error", f"Failed to generate timetables: {message[1]}")
+            return
         
-        return timetable
+        self.root.after(100, self.poll_generation)
     
     def display_timetable(self, event=None):
         """Display timetable for selected class"""
@@ -2473,63 +2280,51 @@ class TimetableGenerator:
         if not class_key or class_key not in self.timetables:
             return
         
-        # Clear existing timetable
-        for widget in self.timetable_frame.winfo_children():
-            widget.destroy()
+        # Title, notice and grid are built once per screen and updated in place
+        if self.class_grid is None or not self.class_grid.winfo_exists():
+            self.class_title_label = tk.Label(self.timetable_frame, font=('Arial', 14, 'bold'), bg='white')
+            self.class_title_label.pack(pady=10)
+            
+            # PE limitation notice
+            pe_notice = tk.Label(self.timetable_frame, text="Note: Physical Education is limited to 2 periods per week", 
+                               font=('Arial', 10), bg='white', fg='blue')
+            pe_notice.pack(pady=5)
+            
+            self.class_grid = TimetableGrid(self.timetable_frame, header_font=('Arial', 10, 'bold'),
+                                            time_font=('Arial', 9), cell_font=('Arial', 8),
+                                            on_edit=self.edit_displayed_cell)
+            self.class_grid.pack(fill='both', expand=True, padx=10, pady=10)
         
         # Class label with stream info for 11-12
         class_num = int(class_key.split('-')[0].replace('Class ', ''))
         title_text = class_key
         if class_num >= 11 and class_num in self.stream_data:
             title_text += f" ({self.stream_data[class_num]} Stream)"
-        
-        tk.Label(self.timetable_frame, text=title_text, font=('Arial', 14, 'bold'), bg='white').pack(pady=10)
-        
-        # PE limitation notice
-        pe_notice = tk.Label(self.timetable_frame, text="Note: Physical Education is limited to 2 periods per week", 
-                           font=('Arial', 10), bg='white', fg='blue')
-        pe_notice.pack(pady=5)
+        self.class_title_label.config(text=title_text)
         
         timetable = self.timetables[class_key]
         
-        # Create table
-        table_frame = tk.Frame(self.timetable_frame, bg='white')
-        table_frame.pack(fill='both', expand=True, padx=10, pady=10)
-        
-        # Headers
         days = list(timetable.keys())
+        self.displayed_class = (class_key, days)
         if not days:
-            tk.Label(table_frame, text="No timetable generated", bg='white').pack()
+            self.class_grid.show([], [], message="No timetable generated")
             return
         
-        # Time column header
-        tk.Label(table_frame, text="Time", font=('Arial', 10, 'bold'), 
-                relief='solid', bd=1, bg='lightgray').grid(row=0, column=0, sticky='nsew')
-        
-        # Day headers
-        for col, day in enumerate(days, 1):
-            tk.Label(table_frame, text=day, font=('Arial', 10, 'bold'), 
-                    relief='solid', bd=1, bg='lightgray').grid(row=0, column=col, sticky='nsew')
-        
         # Get maximum number of time slots across all days
         max_slots = max(len(timetable[day]) for day in days)
+        manual_edit = self.manual_edit_var.get()
         
-        # Create rows
-        for row in range(1, max_slots + 1):
+        rows = []
+        for row in range(max_slots):
             # Time column - use first day's time slot
             first_day = days[0]
-            if row-1 < len(timetable[first_day]):
-                time_text = timetable[first_day][row-1]['time']
-            else:
-                time_text = ""
-            
-            tk.Label(table_frame, text=time_text, font=('Arial', 9), 
-                    relief='solid', bd=1, bg='white').grid(row=row, column=0, sticky='nsew')
+            time_text = timetable[first_day][row]['time'] if row < len(timetable[first_day]) else ""
+            cells = [time_text]
             
             # Subject for each day
-            for col, day in enumerate(days, 1):
-                if row-1 < len(timetable[day]):
-                    day_slot = timetable[day][row-1]
+            for day in days:
+                if row < len(timetable[day]):
+                    day_slot = timetable[day][row]
                     if day_slot['type'] == 'break':
                         text = day_slot['subject']
                         bg_color = 'lightblue'
@@ -2547,27 +2342,20 @@ class TimetableGenerator:
                         # Highlight PE periods
                         bg_color = 'lightpink' if day_slot['subject'] == 'Physical Education' else 'white'
                     
-                    if self.manual_edit_var.get() and day_slot['type'] not in ['break', 'eca', 'lab', 'extra_class']:
-                        # Create editable entry
-                        entry = tk.Text(table_frame, height=3, width=15, font=('Arial', 8),
-                                       relief='solid', bd=1, bg=bg_color)
-                        entry.insert('1.0', text)
-                        entry.grid(row=row, column=col, sticky='nsew')
-                    else:
-                        # Create label
-                        label = tk.Label(table_frame, text=text, font=('Arial', 8), 
-                                        relief='solid', bd=1, bg=bg_color, wraplength=100)
-                        label.grid(row=row, column=col, sticky='nsew')
+                    # Periods become editable text boxes in manual edit mode
+                    editable = manual_edit and day_slot['type'] not in ['break', 'eca', 'lab', 'extra_class']
+                    cells.append((text, bg_color, editable))
                 else:
                     # Empty cell
-                    tk.Label(table_frame, text="", font=('Arial', 8), 
-                            relief='solid', bd=1, bg='white').grid(row=row, column=col, sticky='nsew')
-        
-        # Configure grid weights
-        for i in range(len(days) + 1):
-            table_frame.columnconfigure(i, weight=1)
-        for i in range(max_slots + 1):
-            table_frame.rowconfigure(i, weight=1)
+                    cells.append(("", 'white', False))
+            rows.append(cells)
+        
+        self.class_grid.show(["Time"] + days, rows)
+    
+    def edit_displayed_cell(self, row, col, text):
+        """Store a manual edit made in the class grid"""
+        class_key, days = self.displayed_class
+        self.apply_manual_edit(class_key, days[col], row, text)
     
     def toggle_manual_edit(self):
         """Toggle manual edit mode"""
@@ -2575,7 +2363,9 @@ class TimetableGenerator:
     
     def regenerate_timetable(self):
         """Regenerate all timetables"""
-        self.generate_timetables()
+        self.run_generation(self.on_regenerated, force=True)
+    
+    def on_regenerated(self):
         self.display_timetable()
         messagebox.showinfo("Success", "Timetables regenerated successfully!\nPhysical Education limited to 2 periods per week.")
     
@@ -2663,132 +2453,10 @@ class TimetableGenerator:
     def create_timetable_image(self, class_key, timetable):
         """Create a timetable image using PIL"""
         try:
-            # Image dimensions
-            img_width = 1200
-            img_height = 800
-            
-            # Create image
-            img = Image.new('RGB', (img_width, img_height), 'white')
-            draw = ImageDraw.Draw(img)
-            
-            # Try to use a better font, fallback to default
-            try:
-                title_font = ImageFont.truetype("arial.ttf", 24)
-                header_font = ImageFont.truetype("arial.ttf", 16)
-                cell_font = ImageFont.truetype("arial.ttf", 12)
-            except:
-                title_font = ImageFont.load_default()
-                header_font = ImageFont.load_default()
-                cell_font = ImageFont.load_default()
-            
-            # Title
-            class_num = int(class_key.split('-')[0].replace('Class ', ''))
-            title_text = f"TIMETABLE FOR {class_key}"
-            if class_num >= 11 and class_num in self.stream_data:
-                title_text += f" ({self.stream_data[class_num]} Stream)"
-            
-            # Draw title
-            title_bbox = draw.textbbox((0, 0), title_text, font=title_font)
-            title_width = title_bbox[2] - title_bbox[0]
-            draw.text(((img_width - title_width) // 2, 20), title_text, fill='black', font=title_font)
-            
-            # School info
-            school_info = f"School: {self.school_data.get('name', 'N/A')} | Board: {self.school_data.get('board', 'N/A')}"
-            info_bbox = draw.textbbox((0, 0), school_info, font=header_font)
-            info_width = info_bbox[2] - info_bbox[0]
-            draw.text(((img_width - info_width) // 2, 60), school_info, fill='gray', font=header_font)
-            
-            # PE notice
-            pe_notice = "Note: Physical Education limited to 2 periods per week"
-            notice_bbox = draw.textbbox((0, 0), pe_notice, font=cell_font)
-            notice_width = notice_bbox[2] - notice_bbox[0]
-            draw.text(((img_width - notice_width) // 2, 90), pe_notice, fill='blue', font=cell_font)
-            
-            # Table setup
-            days = list(timetable.keys())
-            if not days:
-                return None
-            
-            max_slots = max(len(timetable[day]) for day in days)
-            
-            # Table dimensions
-            table_start_y = 130
-            table_width = img_width - 100
-            table_height = img_height - table_start_y - 50
-            
-            cell_width = table_width // (len(days) + 1)
-            cell_height = table_height // (max_slots + 1)
-            
-            # Draw table borders and headers
-            start_x = 50
-            
-            # Time column header
-            draw.rectangle([start_x, table_start_y, start_x + cell_width, table_start_y + cell_height], 
-                          outline='black', fill='lightgray')
-            draw.text((start_x + 10, table_start_y + 10), "Time", fill='black', font=header_font)
-            
-            # Day headers
-            for col, day in enumerate(days, 1):
-                x = start_x + col * cell_width
-                draw.rectangle([x, table_start_y, x + cell_width, table_start_y + cell_height], 
-                              outline='black', fill='lightgray')
-                draw.text((x + 10, table_start_y + 10), day, fill='black', font=header_font)
-            
-            # Table content
-            for row in range(1, max_slots + 1):
-                y = table_start_y + row * cell_height
-                
-                # Time column
-                first_day = days[0]
-                if row-1 < len(timetable[first_day]):
-                    time_text = timetable[first_day][row-1]['time']
-                else:
-                    time_text = ""
-                
-                draw.rectangle([start_x, y, start_x + cell_width, y + cell_height], 
-                              outline='black', fill='white')
-                draw.text((start_x + 5, y + 5), time_text, fill='black', font=cell_font)
-                
-                # Subject cells
-                for col, day in enumerate(days, 1):
-                    x = start_x + col * cell_width
-                    
-                    if row-1 < len(timetable[day]):
-                        day_slot = timetable[day][row-1]
-                        
-                        # Determine cell color and text
-                        if day_slot['type'] == 'break':
-                            fill_color = 'lightblue'
-                            text = day_slot['subject']
-                        elif day_slot['type'] == 'eca':
-                            fill_color = 'lightgreen'
-                            text = day_slot['subject']
-                        elif day_slot['type'] == 'lab':
-                            fill_color = 'lightyellow'
-                            text = day_slot['subject']
-                        elif day_slot['type'] == 'extra_class':
-                            fill_color = 'lightcoral'
-                            text = day_slot['subject']
-                        else:
-                            fill_color = 'lightpink' if day_slot['subject'] == 'Physical Education' else 'white'
-                            text = f"{day_slot['subject']}\n({day_slot.get('teacher', 'TBD')})"
-                    else:
-                        fill_color = 'white'
-                        text = ""
-                    
-                    draw.rectangle([x, y, x + cell_width, y + cell_height], 
-                                  outline='black', fill=fill_color)
-                    
-                    # Draw text with word wrapping
-                    if text:
-                        lines = text.split('\n')
-                        for i, line in enumerate(lines[:2]):  # Max 2 lines
-                            if len(line) > 15:  # Truncate long lines
-                                line = line[:12] + "..."
-                            draw.text((x + 5, y + 5 + i * 15), line, fill='black', font=cell_font)
-            
-            return img
-            
+            return timetable_export.render_timetable_image(
+                class_key, timetable, self.class_stream(class_key),
+                self.school_data.get('name', 'N/A'), self.school_data.get('board', 'N/A')
+            )
         except Exception as e:
             print(f"Error creating image: {e}")
             return None
@@ -2801,6 +2469,10 @@ class TimetableGenerator:
             messagebox.showerror("Error", "Please select at least one class to export")
             return
         
+        if self.export_state:
+            messagebox.showinfo("Export", "An export is already running")
+            return
+        
         try:
             # Ask user for directory to save files
             export_dir = filedialog.askdirectory(title="Select Directory to Save Timetables")
@@ -2808,57 +2480,57 @@ class TimetableGenerator:
                 return
             
             export_format = self.export_format_var.get()
+            jobs = self.export_jobs(export_dir, export_format, selected_classes)
             
-            for class_key in selected_classes:
-                class_num = int(class_key.split('-')[0].replace('Class ', ''))
-                
-                if export_format in ["PNG", "JPG"]:
-                    # Create image
-                    img = self.create_timetable_image(class_key, self.timetables[class_key])
-                    if img:
-                        filename = os.path.join(export_dir, f"{class_key.replace(' ', '_').replace('-', '_')}_timetable.{export_format.lower()}")
-                        if export_format == "JPG":
-                            img = img.convert('RGB')
-                        img.save(filename)
-                else:
-                    # Create text file
-                    filename = os.path.join(export_dir, f"{class_key.replace(' ', '_').replace('-', '_')}_timetable.txt")
-                    
-                    with open(filename, 'w', encoding='utf-8') as f:
-                        f.write(f"TIMETABLE FOR {class_key}\n")
-                        if class_num >= 11 and class_num in self.stream_data:
-                            f.write(f"Stream: {self.stream_data[class_num]}\n")
-                        f.write(f"School: {self.school_data.get('name', 'N/A')}\n")
-                        f.write(f"Board: {self.school_data.get('board', 'N/A')}\n")
-                        f.write("Note: Physical Education limited to 2 periods per week\n")
-                        f.write("=" * 80 + "\n\n")
-                        
-                        timetable = self.timetables[class_key]
-                        
-                        # Write timetable
-                        for day, slots in timetable.items():
-                            f.write(f"{day.upper()}\n")
-                            f.write("-" * 40 + "\n")
-                            
-                            for slot in slots:
-                                if slot['type'] == 'break':
-                                    f.write(f"{slot['time']}: {slot['subject']}\n")
-                                elif slot['type'] == 'eca':
-                                    f.write(f"{slot['time']}: {slot['subject']}\n")
-                                elif slot['type'] == 'lab':
-                                    f.write(f"{slot['time']}: {slot['subject']}\n")
-                                elif slot['type'] == 'extra_class':
-                                    f.write(f"{slot['time']}: {slot['subject']}\n")
-                                else:
-                                    teacher_info = f" - {slot.get('teacher', 'TBD')}" if slot.get('teacher') else ""
-                                    f.write(f"{slot['time']}: {slot['subject']}{teacher_info}\n")
-                            
-                            f.write("\n")
-            
-            messagebox.showinfo("Success", f"Timetables exported successfully to {export_dir} as {export_format} files!\nPhysical Education limited to 2 periods per week.")
-            
+            # Render in worker processes; each one writes its file as soon as it is done
+            if self.export_pool is None:
+                self.export_pool = timetable_export.export_pool()
+            futures = [self.export_pool.submit(timetable_export.export_timetable, job) for job in jobs]
         except Exception as e:
             messagebox.showerror("Error", f"Failed to export timetables: {str(e)}")
+            return
+        
+        # Progress window, updated from the Tk loop while the workers run
+        window = tk.Toplevel(self.root)
+        window.title("Exporting Timetables")
+        window.geometry("400x120")
+        window.configure(bg='white')
+        status_label = tk.Label(window, text=f"Exported 0 of {len(futures)}", bg='white', font=('Arial', 11))
+        status_label.pack(pady=10)
+        progress_bar = ttk.Progressbar(window, maximum=len(futures), length=350, mode='determinate')
+        progress_bar.pack(pady=10)
+        
+        self.export_state = {
+            'futures': futures,
+            'window': window,
+            'label': status_label,
+            'bar': progress_bar,
+            'export_dir': export_dir,
+            'export_format': export_format
+        }
+        self.root.after(100, self.poll_export)
+    
+    def poll_export(self):
+        """Update export progress and report once every file is written"""
+        state = self.export_state
+        if not state:
+            return
+        
+        futures = state['futures']
+        done = sum(future.done() for future in futures)
+        state['bar']['value'] = done
+        state['label'].config(text=f"Exported {done} of {len(futures)}")
+        if done < len(futures):
+            self.root.after(100, self.poll_export)
+            return
+        
+        self.export_state = None
+        state['window'].destroy()
+        errors = [f"{future.exception()}" for future in futures if future.exception()]
+        if errors:
+            messagebox.showerror("Error", f"Failed to export {len(errors)} timetable(s): {errors[0]}")
+        else:
+            messagebox.showinfo("Success", f"Timetables exported successfully to {state['export_dir']} as {state['export_format']} files!\nPhysical Education limited to 2 periods per week.")
     
     def preview_export(self):
         """Preview selected timetables"""
@@ -2938,19 +2610,7 @@ class TimetableGenerator:
             )
             
             if filename:
-                project_data = {
-                    'school_data': self.school_data,
-                    'classes_data': self.classes_data,
-                    'teachers_data': self.teachers_data,
-                    'subjects_data': self.subjects_data,
-                    'stream_data': self.stream_data,
-                    'eca_data': self.eca_data,
-                    'lab_data': self.lab_data,
-                    'timetables': self.timetables
-                }
-                
-                with open(filename, 'wb') as f:
-                    pickle.dump(project_data, f)
+                self.save(filename)
                 
                 messagebox.showinfo("Success", f"Project saved successfully to {filename}")
         except Exception as e:
@@ -2965,17 +2625,7 @@ class TimetableGenerator:
             )
             
             if filename:
-                with open(filename, 'rb') as f:
-                    project_data = pickle.load(f)
-                
-                self.school_data = project_data.get('school_data', {})
-                self.classes_data = project_data.get('classes_data', [])
-                self.teachers_data = project_data.get('teachers_data', [])
-                self.subjects_data = project_data.get('subjects_data', {})
-                self.stream_data = project_data.get('stream_data', {})
-                self.eca_data = project_data.get('eca_data', {})
-                self.lab_data = project_data.get('lab_data', {})
-                self.timetables = project_data.get('timetables', {})
+                self.load(filename)
                 
                 messagebox.showinfo("Success", f"Project loaded successfully from {filename}")
         except Exception as e:
@@ -2983,6 +2633,8 @@ class TimetableGenerator:
     
     def run(self):
         self.root.mainloop()
+        if self.export_pool is not None:
+            self.export_pool.shutdown(wait=False, cancel_futures=True)
 
 if __name__ == "__main__":
     app = TimetableGenerator()
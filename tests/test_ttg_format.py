@@ -0,0 +1,89 @@
+import os
+import pickle
+
+import pytest
+
+import ttg_format
+from ttg_format import CompactTimetable
+
+TIMETABLES = {
+    "Class 6-A": {
+        "Monday": [
+            {"time": "08:00-08:40", "subject": "Mathematics", "teacher": "Asha", "type": "period"},
+            {"time": "08:40-09:20", "subject": "Free Period", "type": "period"},
+            {"time": "09:20-09:35", "subject": "Break", "type": "break"},
+            {"time": "09:35-10:15", "subject": "Physics Lab", "type": "lab", "room": "Lab 2"},
+        ],
+        "Tuesday": [
+            {"time": "08:00-08:40", "subject": "English", "teacher": "Ravi", "type": "period"},
+        ],
+    },
+    "Class 11-A": {
+        "Monday": [
+            {"time": "08:00-08:50", "subject": "Chemistry", "teacher": "Meena", "type": "period"},
+        ],
+    },
+}
+
+def _project():
+    return {
+        "school_data": {"name": "Test School", "board": "CBSE", "regional_language": "Tamil"},
+        "classes_data": [{"class": 6, "sections": ["A"]}, {"class": 11, "sections": ["A"]}],
+        "teachers_data": [{"name": "Asha", "subjects": ["Mathematics"], "classes": ["Class 6-A"]}],
+        "subjects_data": {6: ["Mathematics", "English"], 11: ["Chemistry"]},
+        "stream_data": {11: "Science"},
+        "eca_data": {},
+        "lab_data": {"Class 11-A": {"days": ["Monday"], "time": "09:35-10:15"}},
+        "timetables": CompactTimetable.from_dicts(TIMETABLES),
+        "timetables_fingerprint": "abc123",
+    }
+
+def test_round_trip(tmp_path):
+    filename = str(tmp_path / "school.ttg")
+    project = _project()
+    
+    ttg_format.write_project(filename, project)
+    loaded = ttg_format.read_project(filename)
+    
+    with open(filename, "rb") as f:
+        assert f.read(len(ttg_format.MAGIC)) == ttg_format.MAGIC
+    for key in ttg_format.PROJECT_KEYS:
+        assert loaded[key] == project[key]
+    assert loaded["timetables_fingerprint"] == "abc123"
+    assert isinstance(loaded["timetables"], CompactTimetable)
+    assert loaded["timetables"].to_dict() == TIMETABLES
+
+def test_save_over_loaded_file(tmp_path):
+    filename = str(tmp_path / "school.ttg")
+    ttg_format.write_project(filename, _project())
+    loaded = ttg_format.read_project(filename)
+    loaded["timetables"].set_cell("Class 6-A", "Tuesday", 0, "Hindi", "Kavya")
+    
+    ttg_format.write_project(filename, loaded)
+    
+    reloaded = ttg_format.read_project(filename)["timetables"]
+    assert reloaded["Class 6-A"]["Tuesday"][0]["subject"] == "Hindi"
+    assert reloaded["Class 6-A"]["Tuesday"][0]["teacher"] == "Kavya"
+    assert reloaded["Class 11-A"] == TIMETABLES["Class 11-A"]
+
+def test_reads_legacy_pickle(tmp_path):
+    filename = tmp_path / "legacy.ttg"
+    project = _project()
+    project["timetables"] = TIMETABLES
+    filename.write_bytes(pickle.dumps(project))
+    
+    loaded = ttg_format.read_project(str(filename))
+    
+    assert loaded["subjects_data"] == project["subjects_data"]
+    assert loaded["timetables"].to_dict() == TIMETABLES
+
+class _Exploit:
+    def __reduce__(self):
+        return (os.system, ("echo unsafe",))
+
+def test_legacy_pickle_rejects_code(tmp_path):
+    filename = tmp_path / "evil.ttg"
+    filename.write_bytes(pickle.dumps({"timetables": {}, "school_data": _Exploit()}))
+    
+    with pytest.raises(pickle.UnpicklingError):
+        ttg_format.read_project(str(filename))
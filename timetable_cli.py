@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Headless batch mode for the timetable generator
+
+Loads a .ttg project, generates its timetables and exports every section in
+worker processes, without a display:
+
+    python timetable_cli.py school.ttg --output exports/ --formats PNG,TXT,CSV
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import as_completed
+
+from timetable_core import TimetableProject
+import timetable_export
+
+EXPORT_FORMATS = ("PNG", "JPG", "TXT", "CSV")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Generate and export timetables from a project file")
+    parser.add_argument("project", help="Project file (.ttg) saved by the desktop app")
+    parser.add_argument("-o", "--output", default="exports", help="Directory for exported files (default: exports)")
+    parser.add_argument("-f", "--formats", default="PNG,TXT,CSV",
+                        help="Comma-separated export formats: PNG, JPG, TXT, CSV (default: PNG,TXT,CSV)")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="Export worker processes (default: up to 4)")
+    parser.add_argument("--save", action="store_true", help="Write the generated timetables back to the project file")
+    args = parser.parse_args(argv)
+
+    args.formats = [export_format.strip().upper() for export_format in args.formats.split(",") if export_format.strip()]
+    unknown = [export_format for export_format in args.formats if export_format not in EXPORT_FORMATS]
+    if unknown or not args.formats:
+        parser.error(f"Unsupported format(s): {', '.join(unknown) or 'none given'}. Use {', '.join(EXPORT_FORMATS)}")
+    return args
+
+def main(argv=None):
+    args = parse_args(argv)
+    started = time.perf_counter()
+
+    project = TimetableProject()
+    try:
+        project.load(args.project)
+    except Exception as e:
+        print(f"Failed to load project: {e}", file=sys.stderr)
+        return 1
+    loaded = time.perf_counter()
+    print(f"Loaded {args.project} in {loaded - started:.2f}s")
+
+    # Unchanged inputs keep the timetables stored in the project
+    fingerprint = project.timetables_fingerprint
+    project.generate_timetables()
+    generated = time.perf_counter()
+    if project.timetables and fingerprint == project.timetables_fingerprint:
+        print(f"Timetables are up to date ({len(project.timetables)} sections)")
+    else:
+        print(f"Generated {len(project.timetables)} sections in {generated - loaded:.2f}s")
+    if not project.timetables:
+        print("No timetables to export", file=sys.stderr)
+        return 1
+
+    if args.save:
+        project.save(args.project)
+
+    os.makedirs(args.output, exist_ok=True)
+    jobs = [job for export_format in args.formats for job in project.export_jobs(args.output, export_format)]
+    failed = 0
+    with timetable_export.export_pool(args.workers) as pool:
+        futures = {pool.submit(timetable_export.export_timetable, job): job for job in jobs}
+        for done, future in enumerate(as_completed(futures), 1):
+            job = futures[future]
+            try:
+                _, filename = future.result()
+            except Exception as e:
+                failed += 1
+                print(f"[{done}/{len(jobs)}] {job['class_key']} {job['export_format']} failed: {e}", file=sys.stderr)
+                continue
+            print(f"[{done}/{len(jobs)}] {filename or job['class_key'] + ' (empty, skipped)'}")
+
+    print(f"Exported {len(jobs) - failed} of {len(jobs)} files to {args.output} in {time.perf_counter() - generated:.2f}s "
+          f"(total {time.perf_counter() - started:.2f}s)")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,533 @@
+"""Project data and timetable generation without any GUI
+
+TimetableProject holds a school's data, generates its timetables and answers
+the teacher schedule and workload questions the screens ask. The Tk app
+builds on it, and timetable_cli.py uses it directly on machines without a
+display.
+"""
+import bisect
+import hashlib
+import json
+import random
+from collections import defaultdict
+
+# Timetables are held in the backend's compact array form
+import timetable_shared
+import ttg_format
+
+CompactTimetable = timetable_shared.compact.CompactTimetable
+WorkloadReport = timetable_shared.analytics.WorkloadReport
+slot_labels = timetable_shared.time_slots.slot_labels
+slot_template = timetable_shared.time_slots.slot_template
+
+class TeacherIndex:
+    """Lookups over teachers_data by employee ID, name and subject
+    
+    Employee IDs and names are case-folded. The teacher dicts themselves stay
+    in teachers_data; call add, update and remove alongside every change to it.
+    """
+    
+    def __init__(self, teachers=()):
+        self.by_id = {}
+        self.by_name = defaultdict(dict)  # Folded name -> {folded ID: teacher}
+        self.by_subject = defaultdict(dict)  # Subject -> {folded ID: teacher}, in the order they were added
+        for teacher in teachers:
+            self.add(teacher)
+    
+    def get(self, emp_id):
+        return self.by_id.get(emp_id.strip().casefold())
+    
+    def named(self, name):
+        return list(self.by_name.get(name.strip().casefold(), {}).values())
+    
+    def teaching(self, subject):
+        return list(self.by_subject.get(subject, {}).values())
+    
+    def add(self, teacher):
+        key = teacher['employee_id'].casefold()
+        self.by_id[key] = teacher
+        self.by_name[teacher['name'].casefold()][key] = teacher
+        for subject in teacher['subjects']:
+            self.by_subject[subject][key] = teacher
+    
+    def remove(self, teacher):
+        key = teacher['employee_id'].casefold()
+        self.by_id.pop(key, None)
+        self._discard(self.by_name, teacher['name'].casefold(), key)
+        for subject in teacher['subjects']:
+            self._discard(self.by_subject, subject, key)
+    
+    def update(self, teacher, changes):
+        """Apply changes to a teacher dict and reindex it"""
+        self.remove(teacher)
+        teacher.update(changes)
+        self.add(teacher)
+    
+    def _discard(self, index, value, key):
+        entries = index.get(value)
+        if entries is not None:
+            entries.pop(key, None)
+            if not entries:
+                del index[value]
+
+class ScheduleIndex:
+    """Periods of every teacher, grouped by day
+    
+    entries[teacher name][day] holds (section, position, class key, time,
+    subject) for each period the teacher takes, in class order and then slot
+    order, so a teacher's schedule never needs a pass over every timetable.
+    """
+    
+    def __init__(self, timetables):
+        self.timetables = timetables
+        self.entries = defaultdict(lambda: defaultdict(list))
+        if not isinstance(timetables, CompactTimetable):
+            return
+        for section, class_key in enumerate(timetables.sections):
+            for day_idx, day in enumerate(timetables.days):
+                if not timetables.present[section, day_idx]:
+                    continue
+                for position, (time, subject, teacher, slot_type) in enumerate(timetables.cells(class_key, day)):
+                    if slot_type == 'period' and teacher is not None:
+                        self.entries[teacher][day].append((section, position, class_key, time, subject))
+    
+    def days(self, teacher_name):
+        return self.entries.get(teacher_name, {})
+    
+    def move(self, class_key, day, position, old_teacher, new_teacher, time, subject):
+        """Reflect a manual change of one period's teacher or subject"""
+        section = self.timetables.section_index[class_key]
+        if old_teacher is not None:
+            day_entries = self.entries[old_teacher][day]
+            day_entries[:] = [entry for entry in day_entries if entry[:2] != (section, position)]
+        if new_teacher is not None:
+            bisect.insort(self.entries[new_teacher][day], (section, position, class_key, time, subject))
+
+class TimetableProject:
+    def __init__(self):
+        # Data storage
+        self.school_data = {}
+        self.classes_data = []
+        self.teachers_data = []
+        self.teacher_index = TeacherIndex()
+        self.subjects_data = {}
+        self.timetables = {}
+        self.stream_data = {}  # Store stream information for classes 11-12
+        self.eca_data = {}
+        self.lab_data = {}
+        self.teacher_occupancy = defaultdict(int)  # Teacher name -> bitmask of busy minutes in the week
+        self.rng = random.Random()
+        self.timetables_fingerprint = None  # Input fingerprint the current timetables were generated from
+        self._workload_report = None  # (timetables, working days, WorkloadReport) of the last analysis
+        self._schedule_index = None  # ScheduleIndex of the current timetables
+        
+        # Board curricula with stream-based subjects for 11-12
+        self.board_subjects = {
+            "CBSE": {
+                1: ["English", "Hindi", "Mathematics", "EVS", "Art", "Physical Education", "REGIONAL_LANGUAGE"],
+                2: ["English", "Hindi", "Mathematics", "EVS", "Art", "Physical Education", "REGIONAL_LANGUAGE"],
+                3: ["English", "Hindi", "Mathematics", "EVS", "Art", "Physical Education", "REGIONAL_LANGUAGE"],
+                4: ["English", "Hindi", "Mathematics", "EVS", "Art", "Physical Education", "REGIONAL_LANGUAGE"],
+                5: ["English", "Hindi", "Mathematics", "EVS", "Art", "Physical Education", "REGIONAL_LANGUAGE"],
+                6: ["English", "Hindi", "Mathematics", "Science", "Social Science", "Art", "Physical Education", "REGIONAL_LANGUAGE"],
+                7: ["English", "Hindi", "Mathematics", "Science", "Social Science", "Art", "Physical Education", "REGIONAL_LANGUAGE"],
+                8: ["English", "Hindi", "Mathematics", "Science", "Social Science", "Art", "Physical Education", "REGIONAL_LANGUAGE"],
+                9: ["English", "Hindi", "Mathematics", "Science", "Social Science", "Physical Education", "Computer Science", "REGIONAL_LANGUAGE"],
+                10: ["English", "Hindi", "Mathematics", "Science", "Social Science", "Physical Education", "Computer Science", "REGIONAL_LANGUAGE"],
+            },
+            "ICSE": {
+                1: ["English", "Hindi", "Mathematics", "EVS", "Art", "Physical Education", "REGIONAL_LANGUAGE"],
+                2: ["English", "Hindi", "Mathematics", "EVS", "Art", "Physical Education", "REGIONAL_LANGUAGE"],
+                3: ["English", "Hindi", "Mathematics", "EVS", "Art", "Physical Education", "REGIONAL_LANGUAGE"],
+                4: ["English", "Hindi", "Mathematics", "EVS", "Art", "Physical Education", "REGIONAL_LANGUAGE"],
+                5: ["English", "Hindi", "Mathematics", "EVS", "Art", "Physical Education", "REGIONAL_LANGUAGE"],
+                6: ["English", "Hindi", "Mathematics", "Science", "History", "Geography", "Art", "Physical Education", "REGIONAL_LANGUAGE"],
+                7: ["English", "Hindi", "Mathematics", "Science", "History", "Geography", "Art", "Physical Education", "REGIONAL_LANGUAGE"],
+                8: ["English", "Hindi", "Mathematics", "Science", "History", "Geography", "Art", "Physical Education", "REGIONAL_LANGUAGE"],
+                9: ["English", "Hindi", "Mathematics", "Physics", "Chemistry", "Biology", "History", "Geography", "Computer Applications", "REGIONAL_LANGUAGE"],
+                10: ["English", "Hindi", "Mathematics", "Physics", "Chemistry", "Biology", "History", "Geography", "Computer Applications", "REGIONAL_LANGUAGE"],
+            },
+            "State Board": {
+                1: ["English", "Regional Language", "Mathematics", "EVS", "Art", "Physical Education", "REGIONAL_LANGUAGE"],
+                2: ["English", "Regional Language", "Mathematics", "EVS", "Art", "Physical Education", "REGIONAL_LANGUAGE"],
+                3: ["English", "Regional Language", "Mathematics", "EVS", "Art", "Physical Education", "REGIONAL_LANGUAGE"],
+                4: ["English", "Regional Language", "Mathematics", "EVS", "Art", "Physical Education", "REGIONAL_LANGUAGE"],
+                5: ["English", "Regional Language", "Mathematics", "EVS", "Art", "Physical Education", "REGIONAL_LANGUAGE"],
+                6: ["English", "Regional Language", "Mathematics", "Science", "Social Science", "Art", "Physical Education", "REGIONAL_LANGUAGE"],
+                7: ["English", "Regional Language", "Mathematics", "Science", "Social Science", "Art", "Physical Education", "REGIONAL_LANGUAGE"],
+                8: ["English", "Regional Language", "Mathematics", "Science", "Social Science", "Art", "Physical Education", "REGIONAL_LANGUAGE"],
+                9: ["English", "Regional Language", "Mathematics", "Science", "Social Science", "Physical Education", "REGIONAL_LANGUAGE"],
+                10: ["English", "Regional Language", "Mathematics", "Science", "Social Science", "Physical Education", "REGIONAL_LANGUAGE"],
+            }
+        }
+        
+        # Stream-based subjects for classes 11-12
+        self.stream_subjects = {
+            "Science": {
+                "core": ["English", "Physics", "Chemistry", "Mathematics", "REGIONAL_LANGUAGE"],
+                "optional": ["Biology", "Computer Science", "Physical Education"],
+                "labs": ["Physics Lab", "Chemistry Lab", "Biology Lab", "Computer Lab"]
+            },
+            "Commerce": {
+                "core": ["English", "Accountancy", "Business Studies", "Economics", "REGIONAL_LANGUAGE"],
+                "optional": ["Mathematics", "Computer Science", "Physical Education", "Entrepreneurship"],
+                "labs": ["Computer Lab", "Business Lab"]
+            },
+            "Arts/Humanities": {
+                "core": ["English", "History", "Political Science", "Geography", "REGIONAL_LANGUAGE"],
+                "optional": ["Psychology", "Sociology", "Economics", "Philosophy", "Physical Education"],
+                "labs": ["Computer Lab", "Geography Lab"]
+            }
+        }
+    
+    def project_data(self):
+        """Everything a project file stores"""
+        return {
+            'school_data': self.school_data,
+            'classes_data': self.classes_data,
+            'teachers_data': self.teachers_data,
+            'subjects_data': self.subjects_data,
+            'stream_data': self.stream_data,
+            'eca_data': self.eca_data,
+            'lab_data': self.lab_data,
+            'timetables': self.timetables,
+            'timetables_fingerprint': self.timetables_fingerprint
+        }
+    
+    def load_project_data(self, project_data):
+        self.school_data = project_data.get('school_data', {})
+        self.classes_data = project_data.get('classes_data', [])
+        self.teachers_data = project_data.get('teachers_data', [])
+        self.teacher_index = TeacherIndex(self.teachers_data)
+        self.subjects_data = project_data.get('subjects_data', {})
+        self.stream_data = project_data.get('stream_data', {})
+        self.eca_data = project_data.get('eca_data', {})
+        self.lab_data = project_data.get('lab_data', {})
+        self.timetables = project_data['timetables']
+        self.timetables_fingerprint = project_data.get('timetables_fingerprint')
+    
+    def save(self, filename):
+        ttg_format.write_project(filename, self.project_data())
+    
+    def load(self, filename):
+        # Reads the mapped v2 format and older pickled projects
+        self.load_project_data(ttg_format.read_project(filename))
+    
+    def export_jobs(self, export_dir, export_format, class_keys=None):
+        """timetable_export jobs for the given classes (all by default)"""
+        return [{
+            'class_key': class_key,
+            'timetable': self.timetables[class_key],
+            'stream': self.class_stream(class_key),
+            'school_name': self.school_data.get('name', 'N/A'),
+            'board': self.school_data.get('board', 'N/A'),
+            'export_dir': export_dir,
+            'export_format': export_format
+        } for class_key in (class_keys if class_keys is not None else self.timetables)]
+    
+    def input_fingerprint(self):
+        """Hash of every input that shapes the timetables"""
+        inputs = {
+            'school': self.school_data,
+            'classes': self.classes_data,
+            'teachers': self.teachers_data,
+            'subjects': self.subjects_data,
+            'streams': self.stream_data,
+            'eca': self.eca_data,
+            'lab': self.lab_data
+        }
+        encoded = json.dumps(inputs, sort_keys=True, default=str)
+        return hashlib.sha256(encoded.encode()).hexdigest()
+    
+    def generation_plan(self):
+        """(class key, class number, timings) of every timetable to generate, in order"""
+        plan = []
+        for class_data in self.classes_data:
+            class_num = class_data['class']
+            
+            # Determine if primary, secondary, or senior secondary
+            if class_num <= 5:
+                timings = self.school_data.get('primary_timings', {})
+            elif class_num <= 10:
+                timings = self.school_data.get('secondary_timings', {})
+            else:  # 11-12
+                timings = self.school_data.get('senior_secondary_timings', {})
+            
+            if not class_data['sections']:
+                plan.append((f"Class {class_num}", class_num, timings))
+            else:
+                for section in class_data['sections']:
+                    plan.append((f"Class {class_num}-{section}", class_num, timings))
+        return plan
+    
+    def generate_timetables(self, progress=None, cancel=None, force=False):
+        """Generate varied timetables for all classes with limited PE periods
+        
+        progress(done, total, class_key) is called after each class. Setting the
+        cancel event stops before the next class and keeps the previous
+        timetables. Returns False if cancelled. force makes a new variant with a
+        fresh seed even when the inputs are unchanged.
+        """
+        # Unchanged inputs give the same timetables, so keep the ones we have
+        fingerprint = self.input_fingerprint()
+        if not force and self.timetables and fingerprint == self.timetables_fingerprint:
+            return True
+        self.rng = random.Random() if force else random.Random(int(fingerprint[:16], 16))
+        timetables = {}
+        previous_occupancy = self.teacher_occupancy
+        self.teacher_occupancy = defaultdict(int)
+        working_days = self.school_data.get('working_days', ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday'])
+        
+        plan = self.generation_plan()
+        for done, (class_key, class_num, timings) in enumerate(plan, 1):
+            if cancel is not None and cancel.is_set():
+                self.teacher_occupancy = previous_occupancy
+                return False
+            timetables[class_key] = self.create_class_timetable(class_key, class_num, timings, working_days)
+            if progress:
+                progress(done, len(plan), class_key)
+        
+        # Keep the arrays only; screens read classes back through the dict adapter
+        self.timetables = CompactTimetable.from_dicts(timetables)
+        self.timetables_fingerprint = fingerprint
+        return True
+    
+    def create_class_timetable(self, class_key, class_num, timings, working_days):
+        """Create varied timetable for a specific class with limited PE periods"""
+        # Get subjects for this class
+        subjects = self.subjects_data.get(class_num, [])
+        
+        # Remove special subjects from regular rotation
+        regular_subjects = [s for s in subjects if s not in ['ECA', 'LAB']]
+        
+        # Get teachers for this class
+        class_teachers = {}
+        for teacher in self.teachers_data:
+            if class_key in teacher['classes']:
+                for subject in teacher['subjects']:
+                    if subject in regular_subjects:
+                        class_teachers[subject] = teacher['name']
+        
+        if not class_teachers:
+            return {}
+        
+        # Classes with the same timings share one slot template, interned in the backend's label table
+        time_slots = slot_template(timings).slots
+        
+        # Create subject distribution for varied daily schedules with PE limitation
+        period_slots = [slot for slot in time_slots if slot[1] == 'period']
+        subject_list = list(class_teachers.keys())
+        
+        # Separate PE from other subjects
+        pe_subject = 'Physical Education'
+        other_subjects = [s for s in subject_list if s != pe_subject]
+        
+        # Generate different timetable for each day
+        timetable = {}
+        pe_periods_assigned = 0  # Track PE periods across the week
+        
+        for day_idx, day in enumerate(working_days):
+            timetable[day] = []
+            
+            # Create a shuffled subject list for this day to ensure variety
+            daily_subjects = other_subjects.copy()
+            self.rng.shuffle(daily_subjects)
+            
+            # Add PE only if we haven't reached the limit of 2 periods per week
+            # Assign PE to specific days (e.g., Tuesday and Thursday)
+            if pe_subject in class_teachers and pe_periods_assigned < 2:
+                if day in ['Tuesday', 'Thursday'] or (pe_periods_assigned == 0 and day_idx >= len(working_days) - 2):
+                    # Insert PE at a random position (not first or last period)
+                    if len(period_slots) > 2:
+                        pe_position = self.rng.randint(1, min(len(period_slots) - 2, 4))
+                        daily_subjects.insert(pe_position, pe_subject)
+                        pe_periods_assigned += 1
+            
+            # Extend the list to cover all periods
+            while len(daily_subjects) < len(period_slots):
+                daily_subjects.extend(other_subjects)
+            
+            subject_index = 0
+            
+            for slot_id, slot_type, slot_name in time_slots:
+                slot_time = slot_labels.label(slot_id)
+                if slot_type == 'break':
+                    timetable[day].append({
+                        'time': slot_time,
+                        'subject': slot_name,
+                        'type': 'break'
+                    })
+                else:
+                    # Pull forward the first subject whose teacher is free in this slot
+                    slot_mask = self.slot_mask(day_idx, slot_id)
+                    for idx in range(subject_index, len(daily_subjects)):
+                        if not self.teacher_occupancy[class_teachers.get(daily_subjects[idx], 'TBD')] & slot_mask:
+                            daily_subjects.insert(subject_index, daily_subjects.pop(idx))
+                            break
+                    else:
+                        daily_subjects.insert(subject_index, 'Free Period')
+                    
+                    if subject_index < len(daily_subjects) and daily_subjects[subject_index] != 'Free Period':
+                        subject = daily_subjects[subject_index]
+                        teacher = class_teachers.get(subject, 'TBD')
+                        self.teacher_occupancy[teacher] |= slot_mask
+                        timetable[day].append({
+                            'time': slot_time,
+                            'subject': subject,
+                            'teacher': teacher,
+                            'type': 'period'
+                        })
+                        subject_index += 1
+                    else:
+                        timetable[day].append({
+                            'time': slot_time,
+                            'subject': 'Free Period',
+                            'type': 'period'
+                        })
+                        subject_index += 1
+        
+        # Handle ECA if present
+        if class_num in self.eca_data:
+            eca_info = self.eca_data[class_num]
+            eca_day = eca_info['day']
+            eca_time = eca_info['time']
+            
+            if eca_day in timetable:
+                timetable[eca_day].append({
+                    'time': eca_time,
+                    'subject': 'ECA',
+                    'type': 'eca'
+                })
+        
+        # Handle Lab Activities for higher secondary classes
+        if class_num in self.lab_data:
+            lab_info = self.lab_data[class_num]
+            lab_days = lab_info['days']
+            lab_time = lab_info['time']
+            
+            # Get stream-specific lab subjects
+            stream = self.stream_data.get(class_num, 'Science')
+            lab_subjects = self.stream_subjects.get(stream, {}).get('labs', ['Lab'])
+            
+            for day in lab_days:
+                if day in timetable:
+                    # Randomly assign a lab subject for this day
+                    lab_subject = self.rng.choice(lab_subjects)
+                    timetable[day].append({
+                        'time': lab_time,
+                        'subject': lab_subject,
+                        'type': 'lab'
+                    })
+        
+        # Handle extra class for senior secondary (classes 11-12)
+        if class_num >= 11 and self.school_data.get('extra_class_enabled', False):
+            extra_class_timing = self.school_data.get('extra_class_timing', '')
+            if extra_class_timing:
+                # Add extra class to all working days
+                for day in working_days:
+                    timetable[day].append({
+                        'time': extra_class_timing,
+                        'subject': 'Extra Class',
+                        'type': 'extra_class'
+                    })
+        
+        return timetable
+    
+    def slot_mask(self, day_idx, slot_id):
+        """Occupancy bits for a slot: one bit per minute of the week"""
+        start, end = slot_labels.window(slot_id)
+        length = max(end - start, 0)
+        return ((1 << length) - 1) << (day_idx * 24 * 60 + start)
+    
+    def generate_teacher_schedule(self, teacher):
+        """Generate consolidated schedule for a specific teacher"""
+        teacher_schedule = {}
+        working_days = self.school_data.get('working_days', ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday'])
+        
+        # Read the teacher's periods from the schedule index, keeping the assigned classes and subjects
+        teacher_days = self.schedule_index().days(teacher['name'])
+        for day in working_days:
+            teacher_schedule[day] = [{
+                'time': time,
+                'subject': subject,
+                'class': class_key,
+                'type': 'teaching'
+            } for _, _, class_key, time, subject in teacher_days.get(day, ())
+                if class_key in teacher['classes'] and subject in teacher['subjects']]
+        
+        return teacher_schedule
+    
+    def schedule_index(self):
+        """Teacher schedule index of the current timetables, built once per generated or loaded timetables"""
+        if self._schedule_index is None or self._schedule_index.timetables is not self.timetables:
+            self._schedule_index = ScheduleIndex(self.timetables)
+        return self._schedule_index
+    
+    def apply_manual_edit(self, class_key, day, position, text):
+        """Store an edited "Subject\n(Teacher)" cell and update the indexes that depend on it"""
+        lines = [line.strip() for line in text.strip().split('\n') if line.strip()]
+        if not lines:
+            return
+        subject = lines[0]
+        teacher = lines[1].strip('()').strip() if len(lines) > 1 else None
+        if teacher == 'TBD':  # Shown for periods without a teacher
+            teacher = None
+        
+        time, old_subject, old_teacher, _ = list(self.timetables.cells(class_key, day))[position]
+        if (subject, teacher) == (old_subject, old_teacher):
+            return
+        
+        index = self.schedule_index()
+        self.timetables.set_cell(class_key, day, position, subject, teacher)
+        index.move(class_key, day, position, old_teacher, teacher, time, subject)
+        self._workload_report = None
+    
+    def calculate_teacher_workload(self, teacher):
+        """Calculate workload analysis for a teacher"""
+        if not self.timetables:
+            return {
+                'avg_periods': 0,
+                'total_periods': 0,
+                'status': 'No Data',
+                'daily_breakdown': {},
+                'double_bookings': 0,
+                'free_periods': {}
+            }
+        
+        # Every teacher's loads come from one analysis of the timetable arrays
+        report = self.workload_report()
+        row = report.teacher(teacher['name'])
+        if row is None:
+            return {
+                'avg_periods': 0.0,
+                'total_periods': 0,
+                'status': 'Light',
+                'daily_breakdown': {day: 0 for day in report.days},
+                'double_bookings': 0,
+                'free_periods': report.free_breakdown(None)
+            }
+        
+        return {
+            'avg_periods': float(report.averages[row]),
+            'total_periods': int(report.totals[row]),
+            'status': report.statuses[row],
+            'daily_breakdown': report.daily_breakdown(row),
+            'double_bookings': int(report.double_bookings[row]),
+            'free_periods': report.free_breakdown(row)
+        }
+    
+    def workload_report(self):
+        """Workload analysis of all teachers, recomputed only when the timetables or working days change"""
+        working_days = self.school_data.get('working_days', ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday'])
+        cached = self._workload_report
+        if cached is None or cached[0] is not self.timetables or cached[1] != working_days:
+            cached = (self.timetables, list(working_days), WorkloadReport(self.timetables, working_days))
+            self._workload_report = cached
+        return cached[2]
+    
+    def class_stream(self, class_key):
+        """Stream of a class 11-12 timetable key, None for other classes"""
+        class_num = int(class_key.split('-')[0].replace('Class ', ''))
+        if class_num >= 11 and class_num in self.stream_data:
+            return self.stream_data[class_num]
+        return None
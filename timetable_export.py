@@ -0,0 +1,186 @@
+"""Rendering and writing exported timetables
+
+Everything here is plain functions of plain data so it can run in worker
+processes: the desktop app submits one export job per class to a process
+pool and each worker writes its file as soon as it is rendered. Fonts and
+the static part of the image (school line, headers and the empty grid) are
+built once per process and layout and reused for every class.
+"""
+import csv
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+import multiprocessing
+
+from PIL import Image, ImageDraw, ImageFont
+
+IMAGE_WIDTH = 1200
+IMAGE_HEIGHT = 800
+TABLE_START_Y = 130
+START_X = 50
+PE_NOTICE = "Note: Physical Education limited to 2 periods per week"
+
+SLOT_COLORS = {
+    'break': 'lightblue',
+    'eca': 'lightgreen',
+    'lab': 'lightyellow',
+    'extra_class': 'lightcoral'
+}
+
+@lru_cache(maxsize=None)
+def get_font(size):
+    """Load a font once per process, falling back to PIL's default"""
+    try:
+        return ImageFont.truetype("arial.ttf", size)
+    except OSError:
+        return ImageFont.load_default()
+
+def timetable_title(class_key, stream=None):
+    title_text = f"TIMETABLE FOR {class_key}"
+    if stream:
+        title_text += f" ({stream} Stream)"
+    return title_text
+
+def export_filename(class_key, export_format):
+    return f"{class_key.replace(' ', '_').replace('-', '_')}_timetable.{export_format.lower()}"
+
+def _grid_size(num_days, max_slots):
+    table_width = IMAGE_WIDTH - 100
+    table_height = IMAGE_HEIGHT - TABLE_START_Y - 50
+    return table_width // (num_days + 1), table_height // (max_slots + 1)
+
+@lru_cache(maxsize=32)
+def grid_template(days, max_slots, school_info):
+    """The parts of a timetable image shared by every class with this layout"""
+    img = Image.new('RGB', (IMAGE_WIDTH, IMAGE_HEIGHT), 'white')
+    draw = ImageDraw.Draw(img)
+    header_font, cell_font = get_font(16), get_font(12)
+
+    # School info and PE notice
+    for text, y, fill, font in ((school_info, 60, 'gray', header_font), (PE_NOTICE, 90, 'blue', cell_font)):
+        bbox = draw.textbbox((0, 0), text, font=font)
+        draw.text(((IMAGE_WIDTH - (bbox[2] - bbox[0])) // 2, y), text, fill=fill, font=font)
+
+    cell_width, cell_height = _grid_size(len(days), max_slots)
+
+    # Header row: time column, then one column per day
+    for col, header in enumerate(("Time",) + days):
+        x = START_X + col * cell_width
+        draw.rectangle([x, TABLE_START_Y, x + cell_width, TABLE_START_Y + cell_height],
+                      outline='black', fill='lightgray')
+        draw.text((x + 10, TABLE_START_Y + 10), header, fill='black', font=header_font)
+
+    # Empty cells
+    for row in range(1, max_slots + 1):
+        y = TABLE_START_Y + row * cell_height
+        for col in range(len(days) + 1):
+            x = START_X + col * cell_width
+            draw.rectangle([x, y, x + cell_width, y + cell_height], outline='black', fill='white')
+    return img
+
+def render_timetable_image(class_key, timetable, stream=None, school_name='N/A', board='N/A'):
+    """Render one class's {day: [slot dict]} timetable to a PIL image, or None if it has no days"""
+    days = tuple(timetable.keys())
+    if not days:
+        return None
+    max_slots = max(len(timetable[day]) for day in days)
+    school_info = f"School: {school_name} | Board: {board}"
+
+    img = grid_template(days, max_slots, school_info).copy()
+    draw = ImageDraw.Draw(img)
+    title_font, cell_font = get_font(24), get_font(12)
+
+    title_text = timetable_title(class_key, stream)
+    title_bbox = draw.textbbox((0, 0), title_text, font=title_font)
+    draw.text(((IMAGE_WIDTH - (title_bbox[2] - title_bbox[0])) // 2, 20), title_text, fill='black', font=title_font)
+
+    cell_width, cell_height = _grid_size(len(days), max_slots)
+    first_day = timetable[days[0]]
+    for row in range(max_slots):
+        y = TABLE_START_Y + (row + 1) * cell_height
+        if row < len(first_day):
+            draw.text((START_X + 5, y + 5), first_day[row]['time'], fill='black', font=cell_font)
+
+        for col, day in enumerate(days, 1):
+            if row >= len(timetable[day]):
+                continue
+            x = START_X + col * cell_width
+            day_slot = timetable[day][row]
+
+            # Determine cell color and text; white cells are already in the template
+            if day_slot['type'] in SLOT_COLORS:
+                fill_color = SLOT_COLORS[day_slot['type']]
+                text = day_slot['subject']
+            else:
+                fill_color = 'lightpink' if day_slot['subject'] == 'Physical Education' else 'white'
+                text = f"{day_slot['subject']}\n({day_slot.get('teacher', 'TBD')})"
+            if fill_color != 'white':
+                draw.rectangle([x, y, x + cell_width, y + cell_height], outline='black', fill=fill_color)
+
+            for i, line in enumerate(text.split('\n')[:2]):  # Max 2 lines
+                if len(line) > 15:  # Truncate long lines
+                    line = line[:12] + "..."
+                draw.text((x + 5, y + 5 + i * 15), line, fill='black', font=cell_font)
+    return img
+
+def timetable_text(class_key, timetable, stream=None, school_name='N/A', board='N/A'):
+    """The plain text export of one class's timetable"""
+    lines = [f"TIMETABLE FOR {class_key}"]
+    if stream:
+        lines.append(f"Stream: {stream}")
+    lines += [f"School: {school_name}", f"Board: {board}", PE_NOTICE, "=" * 80, ""]
+
+    for day, slots in timetable.items():
+        lines += [day.upper(), "-" * 40]
+        for slot in slots:
+            if slot['type'] in SLOT_COLORS:
+                lines.append(f"{slot['time']}: {slot['subject']}")
+            else:
+                teacher_info = f" - {slot.get('teacher', 'TBD')}" if slot.get('teacher') else ""
+                lines.append(f"{slot['time']}: {slot['subject']}{teacher_info}")
+        lines.append("")
+    return "\n".join(lines) + "\n"
+
+def timetable_csv(timetable):
+    """One row per slot: Day, Time, Subject, Teacher, Type"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(["Day", "Time", "Subject", "Teacher", "Type"])
+    for day, slots in timetable.items():
+        for slot in slots:
+            writer.writerow([day, slot['time'], slot['subject'], slot.get('teacher', ''), slot['type']])
+    return buffer.getvalue()
+
+def export_timetable(job):
+    """Write one export job to disk and return (class_key, filename)
+
+    A job is a dict with class_key, timetable, stream, school_name, board,
+    export_dir and export_format (PNG, JPG, TXT or CSV).
+    """
+    export_format = job['export_format']
+    filename = os.path.join(job['export_dir'], export_filename(job['class_key'], export_format))
+    details = (job['class_key'], job['timetable'], job.get('stream'),
+               job.get('school_name', 'N/A'), job.get('board', 'N/A'))
+
+    if export_format in ("PNG", "JPG"):
+        img = render_timetable_image(*details)
+        if img is None:
+            return job['class_key'], None
+        img.save(filename)
+    elif export_format == "CSV":
+        with open(filename, 'w', encoding='utf-8', newline='') as f:
+            f.write(timetable_csv(job['timetable']))
+    else:
+        with open(filename, 'w', encoding='utf-8') as f:
+            f.write(timetable_text(*details))
+    return job['class_key'], filename
+
+def export_pool(max_workers=None):
+    """Process pool for export jobs
+
+    Workers are spawned rather than forked so they never inherit the GUI's
+    interpreter state; they only import this module.
+    """
+    max_workers = max_workers or max(1, min(4, os.cpu_count() or 1))
+    return ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context('spawn'))
@@ -0,0 +1,28 @@
+"""The backend's timetable modules, shared with the desktop app and CLI
+
+compact, analytics and time_slots in backend/app/services need neither the
+web framework nor the database. They are loaded from there under a private
+package name, so the desktop side never puts a package called "app" on
+sys.path where it could shadow another one.
+"""
+import importlib
+import importlib.util
+import os
+import sys
+
+PACKAGE = '_timetable_services'
+SERVICES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend', 'app', 'services')
+
+def _load_package():
+    if PACKAGE not in sys.modules:
+        spec = importlib.util.spec_from_file_location(PACKAGE, os.path.join(SERVICES_DIR, '__init__.py'),
+                                                      submodule_search_locations=[SERVICES_DIR])
+        package = importlib.util.module_from_spec(spec)
+        sys.modules[PACKAGE] = package
+        spec.loader.exec_module(package)
+    return sys.modules[PACKAGE]
+
+_load_package()
+compact = importlib.import_module(f'{PACKAGE}.compact')
+analytics = importlib.import_module(f'{PACKAGE}.analytics')
+time_slots = importlib.import_module(f'{PACKAGE}.time_slots')
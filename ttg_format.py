@@ -0,0 +1,181 @@
+"""Reading and writing .ttg project files
+
+A version 2 file is laid out as:
+
+    b"TTG2"                      magic
+    uint32 (little endian)       header length in bytes
+    header                       UTF-8 JSON: project data, section table, array table
+    arrays                       raw C-order timetable arrays, each 64-byte aligned
+
+The header holds everything except the timetable arrays. The array table
+gives the offset, dtype and shape of each array, so a loaded project maps
+them straight from the file and a class's cells are only read once that
+class is displayed. Older files are pickles of the whole project dict.
+They are still read, but only through an unpickler that refuses anything
+other than plain data.
+"""
+import json
+import mmap
+import os
+import pickle
+import struct
+import tempfile
+
+import numpy as np
+
+from timetable_shared import compact
+
+CompactTimetable = compact.CompactTimetable
+ARRAY_FIELDS = compact.ARRAY_FIELDS
+
+MAGIC = b"TTG2"
+VERSION = 2
+ALIGNMENT = 64
+
+PROJECT_KEYS = ['school_data', 'classes_data', 'teachers_data', 'subjects_data',
+                'stream_data', 'eca_data', 'lab_data']
+
+def write_project(filename, project_data):
+    """Write project_data (the keys above plus 'timetables' and 'timetables_fingerprint') as a v2 file"""
+    timetables = project_data.get('timetables') or {}
+    if not isinstance(timetables, CompactTimetable):
+        timetables = CompactTimetable.from_dicts(timetables)
+    # A file that is still mapped cannot be replaced on Windows, so saving over
+    # the file a project was loaded from first moves its cells into memory
+    for field, array in timetables.arrays().items():
+        if _is_mapped(array):
+            setattr(timetables, field, array.copy())
+
+    arrays = {}
+    offset = 0
+    for field, array in timetables.arrays().items():
+        arrays[field] = {'offset': offset, 'dtype': array.dtype.str, 'shape': list(array.shape)}
+        offset = _aligned(offset + array.nbytes)
+
+    header = {
+        'version': VERSION,
+        'project': {key: _encode_keys(project_data.get(key)) for key in PROJECT_KEYS},
+        'timetables_fingerprint': project_data.get('timetables_fingerprint'),
+        'sections': timetables.sections,
+        'days': timetables.days,
+        'labels': timetables.labels,
+        'names': timetables.names,
+        'teacher_names': timetables.teacher_names,
+        'slot_types': timetables.slot_types,
+        'extras': [[*cell, _encode_keys(extra)] for cell, extra in timetables.extras.items()],
+        'arrays': arrays
+    }
+    header_bytes = json.dumps(header).encode('utf-8')
+    data_start = _aligned(len(MAGIC) + 4 + len(header_bytes))
+
+    # Write next to the target and swap it in, so a failed save leaves the old file intact
+    directory = os.path.dirname(os.path.abspath(filename))
+    fd, temp_name = tempfile.mkstemp(dir=directory, suffix='.ttg.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(MAGIC)
+            f.write(struct.pack('<I', len(header_bytes)))
+            f.write(header_bytes)
+            for field, array in timetables.arrays().items():
+                f.seek(data_start + arrays[field]['offset'])
+                f.write(np.ascontiguousarray(array).tobytes())
+            f.truncate(data_start + offset)
+        os.replace(temp_name, filename)
+    except BaseException:
+        if os.path.exists(temp_name):
+            os.remove(temp_name)
+        raise
+
+def read_project(filename):
+    """Read a v2 or legacy pickle project file into a project dict with CompactTimetable timetables"""
+    with open(filename, 'rb') as f:
+        magic = f.read(len(MAGIC))
+        if magic != MAGIC:
+            f.seek(0)
+            return _read_legacy(f)
+
+        header_length, = struct.unpack('<I', f.read(4))
+        header = json.loads(f.read(header_length).decode('utf-8'))
+        if header.get('version') != VERSION:
+            raise ValueError(f"Unsupported project file version: {header.get('version')}")
+        data_start = _aligned(len(MAGIC) + 4 + header_length)
+
+        # Copy-on-write mapping: cells load on first access and edits never reach the file
+        size = os.fstat(f.fileno()).st_size
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY) if size > data_start else b''
+
+    arrays = {}
+    for field in ARRAY_FIELDS:
+        spec = header['arrays'][field]
+        dtype = np.dtype(spec['dtype'])
+        count = int(np.prod(spec['shape']))
+        if count:
+            array = np.frombuffer(buffer, dtype=dtype, count=count, offset=data_start + spec['offset'])
+        else:
+            array = np.zeros(0, dtype=dtype)
+        arrays[field] = array.reshape(spec['shape'])
+
+    project_data = {key: _decode_keys(value) for key, value in header['project'].items()}
+    extras = {(section, day, position): _decode_keys(extra) for section, day, position, extra in header['extras']}
+    project_data['timetables'] = CompactTimetable.from_arrays(
+        header['sections'], header['days'], header['labels'], header['names'], header['teacher_names'],
+        arrays, header['slot_types'], extras
+    )
+    project_data['timetables_fingerprint'] = header.get('timetables_fingerprint')
+    return project_data
+
+def _is_mapped(array):
+    base = array
+    while isinstance(base, np.ndarray):
+        base = base.base
+    return isinstance(base, memoryview) and isinstance(base.obj, mmap.mmap)
+
+def _aligned(offset):
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+def _encode_keys(value):
+    """JSON only has string keys: store dicts keyed by class numbers as key/value pairs"""
+    if isinstance(value, dict):
+        if all(isinstance(key, str) for key in value):
+            return {key: _encode_keys(item) for key, item in value.items()}
+        return {'__pairs__': [[key, _encode_keys(item)] for key, item in value.items()]}
+    if isinstance(value, (list, tuple)):
+        return [_encode_keys(item) for item in value]
+    return value
+
+def _decode_keys(value):
+    if isinstance(value, dict):
+        if set(value) == {'__pairs__'}:
+            return {key: _decode_keys(item) for key, item in value['__pairs__']}
+        return {key: _decode_keys(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_decode_keys(item) for item in value]
+    return value
+
+class _ProjectUnpickler(pickle.Unpickler):
+    """Unpickler for old project files that only rebuilds plain data and compact timetables"""
+
+    ALLOWED = {
+        ('builtins', 'set'), ('builtins', 'frozenset'), ('builtins', 'bytearray'),
+        ('collections', 'OrderedDict'), ('collections', 'defaultdict'), ('builtins', 'int'),
+        ('numpy', 'dtype'), ('numpy', 'ndarray'),
+        ('numpy.core.multiarray', '_reconstruct'), ('numpy._core.multiarray', '_reconstruct'),
+        ('numpy.core.multiarray', 'scalar'), ('numpy._core.multiarray', 'scalar'),
+        ('app.services.compact', 'CompactTimetable'), (compact.__name__, 'CompactTimetable'),
+    }
+
+    def find_class(self, module, name):
+        if (module, name) not in self.ALLOWED:
+            raise pickle.UnpicklingError(f"Project file refers to {module}.{name}, which is not allowed")
+        if name == 'CompactTimetable':
+            return CompactTimetable  # May be saved under the backend's module name
+        return super().find_class(module, name)
+
+def _read_legacy(f):
+    project_data = _ProjectUnpickler(f).load()
+    if not isinstance(project_data, dict):
+        raise ValueError("Not a timetable project file")
+    timetables = project_data.get('timetables') or {}
+    if not isinstance(timetables, CompactTimetable):
+        project_data['timetables'] = CompactTimetable.from_dicts(timetables)
+    return project_data